@@ -0,0 +1,10 @@
+"""
+# Benchmarks
+
+Scaling benchmarks of the default experiment, and micro-benchmarks of model components,
+stored as JSON so that regressions can be compared between commits:
+
+    python -m benchmarks.run                     # writes benchmarks/results/<commit>.json
+    python -m benchmarks.run --quick             # smaller cases, e.g. for a quick check
+    python -m benchmarks.compare old.json new.json
+"""
@@ -0,0 +1,50 @@
+"""
+Compare two benchmark results JSON files, and report regressions
+"""
+
+import sys
+import json
+import argparse
+
+
+def _scaling_key(case):
+    return f"scaling timesteps={case['timesteps']} runs={case['runs']} subsets={case['subsets']} backend={case['backend']}"
+
+
+def timings(results) -> dict:
+    """Flatten results into a time in seconds per benchmark"""
+    _timings = {}
+    for case in results.get("scaling", []):
+        if "duration" in case:
+            _timings[_scaling_key(case)] = case["duration"]
+    for (name, result) in results.get("micro", {}).items():
+        _timings[f"micro {name}"] = result["median"]
+    return _timings
+
+
+def compare(baseline, candidate, threshold=0.1) -> list:
+    """Compare the timings of two results, returning the benchmarks that are slower by more than the threshold ratio"""
+    baseline_timings = timings(baseline)
+    candidate_timings = timings(candidate)
+    regressions = []
+    for (name, candidate_time) in candidate_timings.items():
+        if name not in baseline_timings:
+            continue
+        ratio = candidate_time / baseline_timings[name]
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{ratio:7.2f}x  {baseline_timings[name]:10.4g}s -> {candidate_time:10.4g}s  {name} {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline) as baseline, open(args.candidate) as candidate:
+        regressions = compare(json.load(baseline), json.load(candidate), args.threshold)
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,83 @@
+"""
+Micro-benchmarks of LBP system Policies, stochastic process generators, and post-processing
+"""
+
+import copy
+import numpy as np
+import pandas as pd
+
+from benchmarks.utils import time_function
+
+
+def lbp_policy_benchmarks() -> dict:
+    """Time each LBP system Policy for a single substep in the LBP stage"""
+    from radcad.core import generate_parameter_sweep
+    import model.parts.lbp_system as lbp_system
+    from model.system_parameters import parameters
+    from model.state_variables import initial_state
+    from model.types import Stage
+
+    params = generate_parameter_sweep(parameters)[0]
+    state = {
+        **copy.deepcopy(initial_state),
+        "simulation": 0, "subset": 0, "run": 1, "substep": 1, "timestep": 10,
+        "stage": Stage.LBP, "weight_x": 0.9, "lbp_supply_x": 100.0, "lbp_supply_y": 10_000.0,
+    }
+    policies = [
+        lbp_system.policy_upgrade_stages,
+        lbp_system.policy_adjust_weight,
+        lbp_system.policy_add_liquidity,
+        lbp_system.policy_calc_pricing,
+        lbp_system.policy_swap,
+    ]
+    return {
+        f"lbp_system.{policy.__name__}": time_function(lambda: policy(params, 0, [], state))
+        for policy in policies
+    }
+
+
+def stochastic_process_benchmarks(runs=1_000) -> dict:
+    """Time each batch generator of `runs` realizations over the default simulation horizon"""
+    import model.stochastic_processes as processes
+
+    samples = processes.sample_count()
+    rng = np.random.default_rng(1)
+    generators = {
+        "brownian_excursion_paths": lambda: processes.brownian_excursion_paths(runs, samples, rng=rng),
+        "geometric_brownian_motion_paths": lambda: processes.geometric_brownian_motion_paths(runs, samples, rng=rng),
+        "jump_diffusion_paths": lambda: processes.jump_diffusion_paths(runs, samples, rng=rng),
+        "mean_reverting_paths": lambda: processes.mean_reverting_paths(runs, samples, rng=rng),
+        "create_historical_eth_price_paths": lambda: processes.create_historical_eth_price_paths(runs, rng=rng),
+    }
+    return {
+        f"stochastic_processes.{name}[runs={runs}]": time_function(generator, repeat=3, min_time=0.1)
+        for (name, generator) in generators.items()
+    }
+
+
+def post_process_benchmarks(subsets=100) -> dict:
+    """Time post-processing the default experiment results, replicated for a number of subsets"""
+    from experiments.default_experiment import experiment
+    from experiments.post_processing import post_process
+
+    experiment = copy.deepcopy(experiment)
+    experiment.run()
+    df = pd.DataFrame(experiment.results)
+    df = pd.concat([df.assign(subset=subset) for subset in range(subsets)], ignore_index=True)
+
+    # Includes copying the DataFrame, as post-processing assigns parameters in place
+    return {
+        f"post_processing.post_process[rows={len(df)}]": time_function(
+            lambda: post_process(df.copy(), parameters=experiment.simulations[0].model.params), repeat=3
+        ),
+    }
+
+
+def run_micro_benchmarks(quick=False) -> dict:
+    results = {}
+    results.update(lbp_policy_benchmarks())
+    results.update(stochastic_process_benchmarks(runs=(100 if quick else 1_000)))
+    results.update(post_process_benchmarks(subsets=(10 if quick else 100)))
+    for (name, result) in results.items():
+        print(f"micro {name}: {result['median']:.3g}s")
+    return results
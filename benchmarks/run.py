@@ -0,0 +1,44 @@
+"""
+Run the benchmark suite, and store the results as JSON
+"""
+
+import os
+import sys
+import json
+import argparse
+
+from benchmarks.utils import environment
+from benchmarks.scaling import run_scaling_benchmarks, DIMENSIONS, QUICK_DIMENSIONS
+from benchmarks.micro import run_micro_benchmarks
+
+
+results_directory = os.path.join(os.path.dirname(__file__), "results")
+
+
+def run(quick=False, scaling=True, micro=True) -> dict:
+    results = {"environment": environment(), "quick": quick}
+    if scaling:
+        results["scaling"] = run_scaling_benchmarks(QUICK_DIMENSIONS if quick else DIMENSIONS)
+    if micro:
+        results["micro"] = run_micro_benchmarks(quick)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quick", action="store_true", help="Run smaller cases")
+    parser.add_argument("--no-scaling", action="store_true", help="Skip the scaling benchmarks")
+    parser.add_argument("--no-micro", action="store_true", help="Skip the micro-benchmarks")
+    parser.add_argument("--output", help="Path of the JSON results, defaults to benchmarks/results/<commit>.json")
+    args = parser.parse_args()
+
+    # Benchmarks should not depend on external API latency
+    os.environ.setdefault("MODEL_OFFLINE", "1")
+
+    results = run(quick=args.quick, scaling=not args.no_scaling, micro=not args.no_micro)
+
+    output = args.output or os.path.join(results_directory, f"{results['environment']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
@@ -0,0 +1,85 @@
+"""
+Scaling benchmarks of the default experiment across timesteps, Monte Carlo runs, sweep width and radCAD backends
+
+Each case is run in a fresh process, so that the peak resident set size (RSS) of one case doesn't include another.
+"""
+
+import time
+import concurrent.futures
+import multiprocessing
+
+from benchmarks.utils import peak_rss
+
+
+# The base case each dimension is varied around, one dimension at a time
+BASE_CASE = {"timesteps": 120, "runs": 1, "subsets": 1, "backend": "SINGLE_PROCESS"}
+
+DIMENSIONS = {
+    "timesteps": [120, 480, 1920],
+    "runs": [1, 4, 16],
+    "subsets": [1, 4, 16],
+    "backend": ["SINGLE_PROCESS", "MULTIPROCESSING", "PATHOS"],
+}
+
+QUICK_DIMENSIONS = {
+    "timesteps": [120, 480],
+    "runs": [1, 4],
+    "subsets": [1, 4],
+    "backend": ["SINGLE_PROCESS", "PATHOS"],
+}
+
+
+def cases(dimensions=DIMENSIONS) -> list:
+    """Vary each dimension around the base case, with the backends compared on a case with multiple runs and subsets"""
+    _cases = []
+    for (key, values) in dimensions.items():
+        for value in values:
+            case = {**BASE_CASE, key: value}
+            if key == "backend":
+                case.update({"runs": 4, "subsets": 4})
+            if case not in _cases:
+                _cases.append(case)
+    return _cases
+
+
+def run_case(timesteps, runs, subsets, backend) -> dict:
+    """Run the default experiment for a case, sweeping `lbp_length` over `subsets` values"""
+    import pandas as pd
+    from radcad import Backend
+    from experiments.default_experiment import experiment
+
+    simulation = experiment.simulations[0]
+    simulation.timesteps = timesteps
+    simulation.runs = runs
+    simulation.model.params.update({"lbp_length": [100 + subset for subset in range(subsets)]})
+    # Same engine configuration as the default experiment, other than the backend
+    experiment.engine = type(experiment.engine)(backend=Backend[backend], deepcopy=False, drop_substeps=True)
+    simulation.engine = experiment.engine
+
+    start = time.perf_counter()
+    experiment.run()
+    duration = time.perf_counter() - start
+
+    df = pd.DataFrame(experiment.results)
+    return {
+        "duration": duration,
+        "time_per_timestep": duration / (timesteps * runs * subsets),
+        "peak_rss": peak_rss(),
+        "peak_rss_workers": peak_rss(__import__("resource").RUSAGE_CHILDREN),
+        "rows": len(df),
+        "results_bytes": int(df.memory_usage(deep=True).sum()),
+    }
+
+
+def run_scaling_benchmarks(dimensions=DIMENSIONS) -> list:
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for case in cases(dimensions):
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                result = executor.submit(run_case, **case).result()
+            except Exception as error:
+                result = {"error": f"{type(error).__name__}: {error}"}
+        print(f"scaling {case}: {result.get('duration', result.get('error'))}")
+        results.append({**case, **result})
+    return results
@@ -0,0 +1,63 @@
+"""
+Benchmark helpers for timing, memory measurement and environment metadata
+"""
+
+import os
+import sys
+import time
+import timeit
+import platform
+import resource
+import subprocess
+import statistics
+
+
+def peak_rss(who=resource.RUSAGE_SELF) -> int:
+    """Peak resident set size in bytes of the current process, or of its terminated child processes"""
+    maxrss = resource.getrusage(who).ru_maxrss
+    # Reported in kilobytes on Linux, and bytes on macOS
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def time_function(function, repeat=5, min_time=0.2) -> dict:
+    """Time a function call, repeated in batches of calls that take at least `min_time` seconds
+
+    Returns:
+        dict: The number of calls per batch, and the minimum and median time per call in seconds
+    """
+    timer = timeit.Timer(function)
+    number = 1
+    while True:
+        duration = timer.timeit(number)
+        if duration >= min_time or number >= 1_000_000:
+            break
+        number *= 10
+    timings = [duration / number] + [time_per_batch / number for time_per_batch in timer.repeat(repeat - 1, number)]
+    return {
+        "number": number,
+        "min": min(timings),
+        "median": statistics.median(timings),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(__file__),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def environment() -> dict:
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
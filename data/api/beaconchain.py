@@ -1,24 +1,46 @@
+import os
+import typing
 import requests
-import diskcache
 import logging
 
 from model.types import Gwei
+from data.api.client import APIClient, run_sync
 
 
-cache = diskcache.Cache('.beaconchain_api.cache')
+client = APIClient(os.environ.get("BEACONCHAIN_API_URL", "https://beaconcha.in"))
+
+
+async def fetch_epoch_data(epoch="latest") -> dict:
+    data = await client.get_json(f"/api/v1/epoch/{epoch}")
+    return data["data"]
+
+
+async def fetch_epochs_data(epochs: typing.Iterable) -> typing.List[dict]:
+    """Fetch the data of many epochs concurrently, with an empty dict for each epoch that failed"""
+    responses = await client.get_many([f"/api/v1/epoch/{epoch}" for epoch in epochs], return_exceptions=True)
+    results = []
+    for response in responses:
+        if isinstance(response, Exception):
+            logging.error(response)
+            results.append({})
+        else:
+            results.append(response["data"])
+    return results
 
 
-@cache.memoize(expire=(6 * 60 * 60))  # cached for 6 hours
 def get_epoch_data(epoch="latest"):
     try:
-        req = requests.get(f"https://beaconcha.in/api/v1/epoch/{epoch}", headers={"accept":"application/json"})
-        req.raise_for_status()
-        return req.json()["data"]
-    except requests.exceptions.HTTPError as err:
+        return run_sync(fetch_epoch_data(epoch))
+    except requests.exceptions.RequestException as err:
         logging.error(err)
         return {}
 
 
+def get_epochs_data(epochs: typing.Iterable) -> typing.List[dict]:
+    """Get the data of a range of epochs in one batch, e.g. `get_epochs_data(range(1000, 2000))`"""
+    return run_sync(fetch_epochs_data(epochs))
+
+
 def get_total_validator_balance(default=None) -> Gwei:
     data = get_epoch_data()
     result = int(data.get("totalvalidatorbalance", default))
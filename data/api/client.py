@@ -0,0 +1,192 @@
+"""
+Asynchronous pooled HTTP client shared by the API modules
+
+Requests are made with `requests` on daemon threads, at most `max_concurrency` at a time, so that an asyncio event loop
+can issue many requests concurrently while reusing pooled connections, with retries and exponential backoff
+for transient failures. Daemon threads never delay interpreter exit, e.g. while a request to an unreachable API retries.
+Successful responses are stored in one `diskcache` cache shared by all API clients.
+
+The base URL of each API is configurable, e.g. to point the API modules at a local stub HTTP server:
+
+    client = APIClient("http://localhost:8000")
+    epochs = run_sync(client.get_many([f"/api/v1/epoch/{epoch}" for epoch in range(100)]))
+"""
+
+import asyncio
+import logging
+import threading
+import typing
+import time
+import weakref
+import concurrent.futures
+from urllib.parse import urlencode
+
+import requests
+import diskcache
+from requests.adapters import HTTPAdapter
+
+
+cache_directory = ".api.cache"
+_cache = None
+
+# HTTP status codes worth retrying: rate limiting and server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class APIError(requests.exceptions.RequestException):
+    """An API-level failure reported in a successful HTTP response, e.g. an invalid API key, which is not retried"""
+
+
+def get_cache() -> diskcache.Cache:
+    """The API response cache shared by all clients, created on first use"""
+    global _cache
+    if _cache is None:
+        _cache = diskcache.Cache(cache_directory)
+    return _cache
+
+
+def run_sync(coroutine):
+    """Run a coroutine to completion from synchronous code, including from within a running event loop e.g. Jupyter"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+class APIClient:
+    """An asyncio HTTP JSON API client with connection pooling, bounded concurrency, retries and a shared cache
+
+    Args:
+        base_url (str): Base URL requests are made relative to
+        max_concurrency (int): Maximum number of concurrent requests, and size of the connection pool
+        timeout (float): Default timeout in seconds of each request
+        retries (int): Default number of retries of failed requests, after the first attempt
+        backoff (float): Delay in seconds before the first retry, doubled for each further retry
+        expire (float): Time in seconds responses are cached for, or None to disable caching
+    """
+
+    def __init__(
+        self,
+        base_url,
+        max_concurrency=8,
+        timeout=10,
+        retries=3,
+        backoff=0.5,
+        expire=(6 * 60 * 60),  # cached for 6 hours
+        headers={"accept": "application/json"},
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.expire = expire
+        self.headers = dict(headers)
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self._sessions = threading.local()
+        # A semaphore bounding concurrent requests per event loop, as `run_sync` runs each coroutine in a new loop
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def url(self, path, params=None) -> str:
+        url = self.base_url + "/" + path.lstrip("/")
+        return f"{url}?{urlencode(sorted(params.items()))}" if params else url
+
+    def _session(self) -> requests.Session:
+        # One session per thread, all sharing the same connection pool
+        session = getattr(self._sessions, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+            self._sessions.session = session
+        return session
+
+    def _get(self, url, validate=None, timeout=None, retries=None):
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            try:
+                response = self._session().get(url, timeout=timeout)
+                response.raise_for_status()
+                data = response.json()
+                if validate is not None:
+                    validate(data)
+                return data
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.HTTPError) as err:
+                # Only connection failures, timeouts, rate limiting and server errors are retried
+                retryable = not isinstance(err, requests.exceptions.HTTPError) or (
+                    err.response is not None and err.response.status_code in RETRY_STATUS_CODES
+                )
+                if not retryable or attempt == retries:
+                    raise
+                logging.warning(f"Retrying request after error: {err}")
+                time.sleep(self.backoff * 2**attempt)
+
+    async def _run_in_thread(self, function, *args):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        async with semaphore:
+            future = loop.create_future()
+
+            def set_result(result, exception):
+                if future.done():
+                    return
+                if exception is not None:
+                    future.set_exception(exception)
+                else:
+                    future.set_result(result)
+
+            def target():
+                (result, exception) = (None, None)
+                try:
+                    result = function(*args)
+                except Exception as err:
+                    exception = err
+                try:
+                    loop.call_soon_threadsafe(set_result, result, exception)
+                except RuntimeError:
+                    # The event loop was closed while the request was in flight
+                    pass
+
+            threading.Thread(target=target, name="api-client", daemon=True).start()
+            return await future
+
+    async def get_json(
+        self, path, params=None, validate: typing.Callable[[typing.Any], None] = None, timeout=None, retries=None
+    ):
+        """Get a JSON response, from the shared cache if available
+
+        Args:
+            validate (Callable): Raises an exception if the response data is invalid, in which case it is not cached,
+                e.g. an `APIError`, which is not retried
+            timeout (float): Timeout in seconds of each request, overriding the client's default
+            retries (int): Number of retries of failed requests, overriding the client's default
+        """
+        url = self.url(path, params)
+        if self.expire is not None:
+            data = get_cache().get(url)
+            if data is not None:
+                return data
+
+        data = await self._run_in_thread(self._get, url, validate, timeout, retries)
+
+        if self.expire is not None:
+            get_cache().set(url, data, expire=self.expire)
+        return data
+
+    async def get_many(
+        self, paths, params=None, validate=None, return_exceptions=False, timeout=None, retries=None
+    ) -> list:
+        """Get JSON responses for many paths concurrently, in the order of `paths`"""
+        return await asyncio.gather(
+            *[self.get_json(path, params, validate, timeout, retries) for path in paths],
+            return_exceptions=return_exceptions,
+        )
+
+    def close(self):
+        self._adapter.close()
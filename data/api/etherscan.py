@@ -1,25 +1,32 @@
+import os
 import requests
-import diskcache
 import logging
 
 from model.types import Wei
+from data.api.client import APIClient, APIError, run_sync
 
 
-cache = diskcache.Cache('.etherscan_api.cache')
+client = APIClient(os.environ.get("ETHERSCAN_API_URL", "https://api.etherscan.io"))
 
 
-@cache.memoize(expire=(6 * 60 * 60))  # cached for 6 hours
-def get_eth_supply(default=None) -> Wei:
+def _validate(data):
+    # Etherscan returns a JSON object with "status" 0 for failure,
+    # "status" key does not exist for normal response!
+    # Normal HTTP status is ignored.
+    if not int(data.get("status", 1)):
+        raise APIError(data.get("result"))
+
+
+async def fetch_eth_supply(timeout=None, retries=None) -> Wei:
+    data = await client.get_json(
+        "/api", {"module": "stats", "action": "ethsupply"}, validate=_validate, timeout=timeout, retries=retries
+    )
+    return int(data["result"])
+
+
+def get_eth_supply(default=None, timeout=None, retries=None) -> Wei:
     try:
-        req = requests.get("https://api.etherscan.io/api?module=stats&action=ethsupply", headers={"accept": "application/json"})
-        req.raise_for_status()
-        # Etherscan returns a JSON object with "status" 0 for failure,
-        # "status" key does not exist for normal response!
-        # Normal HTTP status is ignored.
-        if not int(req.json().get("status", 1)):
-            raise requests.exceptions.HTTPError
-        else:
-            return int(req.json()["result"])
-    except requests.exceptions.HTTPError as err:
+        return run_sync(fetch_eth_supply(timeout, retries))
+    except requests.exceptions.RequestException as err:
         logging.error(err)
         return default
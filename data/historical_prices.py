@@ -0,0 +1,90 @@
+"""
+Historical hourly ETH price series
+
+The hourly ETH/USD dataset `ETH_1H.csv.zip` is parsed once into a binary `.npz` cache, indexed by hour on a regular grid,
+so that the price at any timestamp or hour is an O(1) array lookup. The cache is rebuilt whenever the source file changes.
+"""
+
+import os
+import typing
+import tempfile
+import numpy as np
+from functools import lru_cache
+
+
+# Fetch CSV file relative to current file path
+file_eth_hourly_csv = os.path.join(os.path.dirname(__file__), "ETH_1H.csv.zip")
+
+# Binary cache directory, relative to the working directory like the API caches
+cache_directory = ".historical_data.cache"
+
+hour = np.timedelta64(1, "h")
+
+
+def cached_arrays(source_path, parse: typing.Callable[[str], dict], directory=cache_directory) -> dict:
+    """Load the arrays parsed from a source file, parsing and caching them as `.npz` if missing or outdated
+
+    The cache is keyed by the source file name, and invalidated by the source file's modification time and size.
+    """
+    stat = os.stat(source_path)
+    version = np.array([stat.st_mtime_ns, stat.st_size])
+    path = os.path.join(directory, os.path.basename(source_path) + ".npz")
+
+    try:
+        with np.load(path) as cached:
+            if np.array_equal(cached["_version"], version):
+                return {key: cached[key] for key in cached.files if key != "_version"}
+    except (FileNotFoundError, KeyError, ValueError, OSError):
+        pass
+
+    arrays = parse(source_path)
+    os.makedirs(directory, exist_ok=True)
+    # Write under a temporary name and rename, so concurrent readers never load a partial file
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(descriptor, "wb") as file:
+        np.savez(file, _version=version, **arrays)
+    os.replace(temporary_path, path)
+
+    return arrays
+
+
+def parse_eth_hourly_prices(path=file_eth_hourly_csv) -> dict:
+    """Parse hourly ETH close prices onto a regular hourly grid, forward-filling missing hours
+
+    The "Unix Timestamp" column mixes seconds and milliseconds, so the "Date" column is used instead.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(path, usecols=["Date", "Close"])
+    df["Date"] = pd.to_datetime(df["Date"], format="%Y-%m-%d %H:%M:%S")
+    df = df.drop_duplicates("Date").set_index("Date").sort_index()
+    df = df.resample("1H").last().ffill()
+
+    return {
+        "start": np.datetime64(df.index[0].to_datetime64(), "s"),
+        "close": df["Close"].to_numpy(dtype=np.float64),
+    }
+
+
+class HourlySeries(typing.NamedTuple):
+    """An hourly price series starting at `start`, where `close[i]` is the close price of hour `start + i`"""
+
+    start: np.datetime64
+    close: np.ndarray
+
+    def index(self, timestamp):
+        """The hour index of one or more timestamps"""
+        return (np.asarray(timestamp, dtype="datetime64[s]") - self.start) // hour
+
+    def price_at(self, timestamp):
+        """The close price of the hour containing one or more timestamps"""
+        return self.close[self.index(timestamp)]
+
+
+@lru_cache(maxsize=None)
+def load_eth_hourly_prices() -> HourlySeries:
+    """Load the historical hourly ETH/USD close prices as a read-only series"""
+    arrays = cached_arrays(file_eth_hourly_csv, parse_eth_hourly_prices)
+    close = arrays["close"]
+    close.setflags(write=False)
+    return HourlySeries(start=arrays["start"][()], close=close)
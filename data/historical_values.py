@@ -1,13 +1,26 @@
+"""
+Historical values from Etherscan datasets
+
+Datasets are loaded lazily: each CSV is parsed on first access, and the parsed series are stored in a binary `.npz` cache
+that is invalidated when the source file changes (see `data.historical_prices.cached_arrays(...)`).
+Derived statistics are computed on first access, using the typed accessors below or the module attributes
+`eth_price_mean`, `eth_price_min`, `eth_price_max`, `eth_gas_price_median`, `eth_block_rewards_mean`,
+and the DataFrames `df_ether_price`, `df_gas_price`, `df_block_rewards` and `df_ether_supply`.
+"""
+
 import os
-import pandas as pd
+import typing
+import numpy as np
+from functools import lru_cache
+
 import model.constants as constants
-from experiments.simulation_configuration import DELTA_TIME
-from model.types import  Gwei_per_Gas
+from model.types import Gwei_per_Gas, USD_per_ETH, ETH
+from data.historical_prices import cached_arrays
 
 
 # Set 12 month window
-window_start = '7/3/2020'
-window_end = '7/3/2021'
+window_start = np.datetime64("2020-07-03")
+window_end = np.datetime64("2021-07-03")
 
 # Fetch CSV file relative to current file path
 file_ether_price_csv = os.path.join(os.path.dirname(__file__), "ether_price.csv")
@@ -15,35 +28,131 @@ file_ether_supply_csv = os.path.join(os.path.dirname(__file__), "ether_supply.cs
 file_ether_avg_gas_price = os.path.join(os.path.dirname(__file__), "ether_avg_gas_price.csv")
 file_ether_block_rewards = os.path.join(os.path.dirname(__file__), "ether_block_rewards.csv")
 
+
+class DailySeries(typing.NamedTuple):
+    """A daily Etherscan series, where `values[i]` is the value on day `dates[i]`"""
+
+    dates: np.ndarray
+    values: np.ndarray
+
+    def window(self, start=window_start, end=window_end) -> "DailySeries":
+        """The values from the start date to the end date inclusive"""
+        selected = (self.dates >= start) & (self.dates <= end)
+        return DailySeries(self.dates[selected], self.values[selected])
+
+
+def parse_etherscan_csv(path, column="Value") -> dict:
+    """Parse the "UnixTimeStamp" and value column of an Etherscan chart CSV"""
+    import pandas as pd
+
+    df = pd.read_csv(path, usecols=["UnixTimeStamp", column])
+    return {
+        "dates": df["UnixTimeStamp"].to_numpy().astype("datetime64[s]").astype("datetime64[D]"),
+        "values": df[column].to_numpy(dtype=np.float64),
+    }
+
+
+@lru_cache(maxsize=None)
+def load_daily_series(path, column="Value") -> DailySeries:
+    """Load a daily Etherscan series as read-only arrays"""
+    arrays = cached_arrays(path, lambda source: parse_etherscan_csv(source, column))
+    for array in arrays.values():
+        array.setflags(write=False)
+    return DailySeries(**arrays)
+
+
+def ether_price() -> DailySeries:
+    """Daily ETH price in USD"""
+    return load_daily_series(file_ether_price_csv)
+
+
+def ether_avg_gas_price() -> DailySeries:
+    """Daily Ethereum average gas price in Wei"""
+    return load_daily_series(file_ether_avg_gas_price, "Value (Wei)")
+
+
+def ether_block_rewards() -> DailySeries:
+    """Daily Ethereum block rewards in ETH"""
+    return load_daily_series(file_ether_block_rewards)
+
+
+def ether_supply() -> DailySeries:
+    """Daily Ether supply"""
+    return load_daily_series(file_ether_supply_csv)
+
+
 # Calculate mean, min, max ETH price over last 12 months from Etherscan
-df_ether_price = pd.read_csv(file_ether_price_csv)
-df_ether_price = df_ether_price.set_index(['Date(UTC)'], drop=False)
-df_ether_price = df_ether_price.loc[window_start:window_end]
-eth_price_mean = df_ether_price.Value.mean()
-eth_price_min = df_ether_price.Value.min()
-eth_price_max = df_ether_price.Value.max()
+@lru_cache(maxsize=None)
+def get_eth_price_mean() -> USD_per_ETH:
+    return float(ether_price().window().values.mean())
+
+
+@lru_cache(maxsize=None)
+def get_eth_price_min() -> USD_per_ETH:
+    return float(ether_price().window().values.min())
+
+
+@lru_cache(maxsize=None)
+def get_eth_price_max() -> USD_per_ETH:
+    return float(ether_price().window().values.max())
+
 
 # Calculate Ethereum average gas price over last 12 months from Etherscan
-df_gas_price = pd.read_csv(file_ether_avg_gas_price)
-df_gas_price = df_gas_price.set_index(['Date(UTC)'], drop=False)
-df_gas_price = df_gas_price.loc[window_start:window_end]
-eth_gas_price_median: Gwei_per_Gas = df_gas_price['Value (Wei)'].median() / constants.gwei
+@lru_cache(maxsize=None)
+def get_eth_gas_price_median() -> Gwei_per_Gas:
+    return float(np.median(ether_avg_gas_price().window().values)) / constants.gwei
+
 
 # Calculate Ethereum average block rewards over last 12 months from Etherscan
-df_block_rewards = pd.read_csv(file_ether_block_rewards)
-df_block_rewards = df_block_rewards.set_index(['Date(UTC)'], drop=False)
-df_block_rewards = df_block_rewards.loc[window_start:window_end]
-eth_block_rewards_mean = df_block_rewards['Value'].mean()
-
-# Calculate historical Ether supply inflation
-df_ether_supply = pd.read_csv(file_ether_supply_csv)
-df_ether_supply['timestamp'] = pd.to_datetime(df_ether_supply['UnixTimeStamp'], unit='s')
-df_ether_supply = df_ether_supply.rename(columns={"Value": "eth_supply"})
-df_ether_supply = df_ether_supply[['timestamp','eth_supply']]
-df_ether_supply = df_ether_supply.set_index('timestamp', drop=False)
-df_ether_supply['supply_inflation'] = \
-    constants.epochs_per_year * (df_ether_supply['eth_supply'].shift(-1) - df_ether_supply['eth_supply']) \
-    / (df_ether_supply['eth_supply'] * DELTA_TIME)
-df_ether_supply['supply_inflation_pct'] = df_ether_supply['supply_inflation'] * 100
-df_ether_supply['supply_inflation_pct_rolling'] = df_ether_supply['supply_inflation_pct'].rolling(14).mean()
-df_ether_supply = df_ether_supply.fillna(method='bfill')
+@lru_cache(maxsize=None)
+def get_eth_block_rewards_mean() -> ETH:
+    return float(ether_block_rewards().window().values.mean())
+
+
+def _daily_dataframe(series: DailySeries):
+    import pandas as pd
+
+    # Match the Etherscan "Date(UTC)" index, e.g. "7/3/2020"
+    dates = pd.to_datetime(series.dates)
+    labels = [f"{date.month}/{date.day}/{date.year}" for date in dates]
+    df = pd.DataFrame({"Date(UTC)": labels, "UnixTimeStamp": dates.astype("int64") // 10**9, "Value": series.values})
+    return df.set_index(["Date(UTC)"], drop=False)
+
+
+def get_df_ether_supply():
+    """Calculate historical Ether supply inflation"""
+    import pandas as pd
+    from experiments.simulation_configuration import DELTA_TIME
+
+    series = ether_supply()
+    df_ether_supply = pd.DataFrame({"timestamp": pd.to_datetime(series.dates), "eth_supply": series.values})
+    df_ether_supply = df_ether_supply.set_index('timestamp', drop=False)
+    df_ether_supply['supply_inflation'] = \
+        constants.epochs_per_year * (df_ether_supply['eth_supply'].shift(-1) - df_ether_supply['eth_supply']) \
+        / (df_ether_supply['eth_supply'] * DELTA_TIME)
+    df_ether_supply['supply_inflation_pct'] = df_ether_supply['supply_inflation'] * 100
+    df_ether_supply['supply_inflation_pct_rolling'] = df_ether_supply['supply_inflation_pct'].rolling(14).mean()
+    df_ether_supply = df_ether_supply.fillna(method='bfill')
+    return df_ether_supply
+
+
+# Module attributes computed on first access
+_lazy_attributes = {
+    "eth_price_mean": get_eth_price_mean,
+    "eth_price_min": get_eth_price_min,
+    "eth_price_max": get_eth_price_max,
+    "eth_gas_price_median": get_eth_gas_price_median,
+    "eth_block_rewards_mean": get_eth_block_rewards_mean,
+    "df_ether_price": lambda: _daily_dataframe(ether_price().window()),
+    "df_gas_price": lambda: _daily_dataframe(ether_avg_gas_price().window()).rename(columns={"Value": "Value (Wei)"}),
+    "df_block_rewards": lambda: _daily_dataframe(ether_block_rewards().window()),
+    "df_ether_supply": get_df_ether_supply,
+}
+
+
+def __getattr__(name):
+    if name in _lazy_attributes:
+        value = _lazy_attributes[name]()
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__} has no attribute {name}")
@@ -0,0 +1,111 @@
+"""
+Offline-first provider of initial state values from external data sources
+
+External values such as the ETH supply are only fetched when first accessed, so importing the model performs
+no network I/O, and are resolved in a background thread so that the access waits at most `timeout` seconds.
+Each value falls back to the bundled snapshot `initial_state_snapshot.json` when:
+* the value is not resolved within the timeout,
+* the request fails,
+* the provider is used in a simulation worker process, where no network I/O is performed,
+* or the `MODEL_OFFLINE` environment variable is set.
+"""
+
+import os
+import json
+import time
+import typing
+import logging
+import threading
+import multiprocessing
+
+
+# Fetch snapshot file relative to current file path
+file_initial_state_snapshot = os.path.join(os.path.dirname(__file__), "initial_state_snapshot.json")
+
+# Maximum time in seconds to wait for external values, from when the provider is started
+timeout = float(os.environ.get("MODEL_NETWORK_TIMEOUT", 2.0))
+
+
+def is_worker_process() -> bool:
+    """Whether the current process is a child process, such as a radCAD multiprocessing worker"""
+    if multiprocessing.parent_process() is not None:
+        return True
+    try:
+        # radCAD's default backend uses pathos, which is based on the `multiprocess` fork of `multiprocessing`
+        import multiprocess
+        return multiprocess.parent_process() is not None
+    except ImportError:
+        return False
+
+
+def is_offline() -> bool:
+    return bool(os.environ.get("MODEL_OFFLINE")) or is_worker_process()
+
+
+def _get_eth_supply():
+    import data.api.etherscan as etherscan
+    # A single attempt, so that the request fails within the provider's timeout rather than retrying past it
+    return etherscan.get_eth_supply(timeout=timeout, retries=0)
+
+
+class InitialStateProvider:
+    """Resolves external values in a background thread on first access, with a snapshot fallback
+
+    Args:
+        fetchers (Dict[str, Callable]): A function for each value returning the value, or None on failure
+        snapshot_path (str): Path of the JSON snapshot of fallback values
+        timeout (float): Maximum time in seconds to wait for external values, from when the provider is started
+    """
+
+    def __init__(self, fetchers: typing.Dict[str, typing.Callable], snapshot_path=file_initial_state_snapshot, timeout=timeout):
+        self.fetchers = fetchers
+        self.snapshot_path = snapshot_path
+        self.timeout = timeout
+        self.values = {}
+        self._resolved = threading.Event()
+        self._thread = None
+        self._deadline = None
+        self._pid = None
+
+    def start(self):
+        """Start resolving external values in the background, unless offline or already started
+
+        Called on first access by `get(...)`, or earlier to prefetch the values.
+        """
+        if self._thread is not None or is_offline():
+            return self
+        self._pid = os.getpid()
+        self._deadline = time.monotonic() + self.timeout
+        self._thread = threading.Thread(target=self._resolve, name="initial-state-provider", daemon=True)
+        self._thread.start()
+        return self
+
+    def _resolve(self):
+        for key, fetcher in self.fetchers.items():
+            try:
+                value = fetcher()
+            except Exception as err:
+                logging.error(err)
+                value = None
+            if value is not None:
+                self.values[key] = value
+        self._resolved.set()
+
+    def get(self, key):
+        """Get an external value, waiting at most until the timeout, otherwise falling back to the snapshot"""
+        self.start()
+        # A forked worker inherits the resolved values, but not the background thread
+        if self._thread is not None and self._pid == os.getpid():
+            self._resolved.wait(max(self._deadline - time.monotonic(), 0))
+        if key in self.values:
+            return self.values[key]
+        return self.snapshot()[key]
+
+    def snapshot(self) -> dict:
+        with open(self.snapshot_path) as file:
+            return json.load(file)
+
+
+initial_state_provider = InitialStateProvider({
+    "eth_supply": _get_eth_supply,
+})
@@ -0,0 +1,182 @@
+"""
+Adaptive Monte Carlo run counts
+
+Rather than a fixed number of Monte Carlo runs, runs are executed in batches, and each parameter subset is stopped
+independently once the confidence intervals of the chosen output metrics reach the target precision:
+
+    df, exceptions, summary = run_adaptive(
+        simulation,
+        metrics={"final_lbp_y_usd_price": final_lbp_y_usd_price, "eth_raised": eth_raised},
+        rule=StoppingRule(relative_precision=0.02, max_runs=1_000),
+    )
+
+Each batch only includes the subsets that have not converged, so the engine's workers are only used for noisy subsets.
+Batches are numbered consecutively, i.e. the runs of a subset are numbered 1, 2, ... across batches,
+so processes indexed by run (e.g. `create_sampled_process(...)` realizations) must cover `max_runs` runs.
+"""
+
+import math
+import typing
+import logging
+import statistics
+import numpy as np
+import pandas as pd
+from radcad import Model, Simulation, Engine
+from radcad.core import generate_parameter_sweep
+
+
+class StoppingRule(typing.NamedTuple):
+    """When to stop running a parameter subset
+
+    A subset is stopped once, for every metric, the half-width of the normal-approximation confidence interval
+    of the mean is within `absolute_precision` or `relative_precision` of the mean, or after `max_runs` runs.
+
+    Args:
+        relative_precision (float): Target half-width relative to the absolute mean
+        absolute_precision (float): Target half-width in the units of the metric
+        confidence (float): Confidence level of the interval
+        min_runs (int): Number of runs of the first batch, before convergence is checked
+        batch_size (int): Number of runs of each further batch
+        max_runs (int): Maximum number of runs of each subset
+    """
+
+    relative_precision: float = 0.05
+    absolute_precision: float = 0.0
+    confidence: float = 0.95
+    min_runs: int = 10
+    batch_size: int = 10
+    max_runs: int = 1_000
+
+    def half_width(self, values: np.ndarray) -> float:
+        if len(values) < 2:
+            return math.inf
+        z = statistics.NormalDist().inv_cdf((1 + self.confidence) / 2)
+        return z * np.std(values, ddof=1) / math.sqrt(len(values))
+
+    def converged(self, values: np.ndarray) -> bool:
+        if len(values) < min(self.min_runs, self.max_runs):
+            return False
+        target = max(self.absolute_precision, self.relative_precision * abs(np.mean(values)))
+        return self.half_width(values) <= target
+
+
+def final_lbp_y_usd_price(df: pd.DataFrame, params: dict) -> float:
+    """The USD price of token Y at the end of a run"""
+    return df["lbp_y_usd_price"].iloc[-1]
+
+
+def eth_raised(df: pd.DataFrame, params: dict) -> float:
+    """The ETH (token X) added to the LBP by swaps over a run, net of the initial liquidity"""
+    return df["lbp_supply_x"].iloc[-1] - params["lbp_initial_x"]
+
+
+class BatchEngine(Engine):
+    """A radCAD Engine that numbers runs from an offset, so that consecutive batches continue the run numbering
+
+    Overrides the private `Engine._run_stream(...)` generator, whose run arguments are specific to the radCAD version
+    pinned in `requirements.txt`.
+    """
+
+    def __init__(self, run_offset=0, **kwargs):
+        self.run_offset = run_offset
+        super().__init__(**kwargs)
+
+    def _run_stream(self, configs):
+        for run_args in super()._run_stream(configs):
+            yield run_args._replace(run=run_args.run + self.run_offset)
+
+
+def run_adaptive(
+    simulation, metrics: typing.Dict[str, typing.Callable[[pd.DataFrame, dict], float]], rule=StoppingRule()
+) -> typing.Tuple[pd.DataFrame, list, pd.DataFrame]:
+    """Run each parameter subset of a simulation in batches until its metrics converge, see `StoppingRule`
+
+    Each metric is calculated from the results of a single run, and the parameter subset of the run.
+    Runs that fail are excluded from the metrics.
+
+    Returns:
+        Tuple[pd.DataFrame, list, pd.DataFrame]: The results and exceptions of all runs like the radCAD engine,
+        and a summary with the number of runs, and the mean and confidence interval half-width of each metric per subset
+    """
+    engine = simulation.engine
+    param_sweep = generate_parameter_sweep(simulation.model.params) or [simulation.model.params]
+    samples = {subset: {name: [] for name in metrics} for subset in range(len(param_sweep))}
+    runs = {subset: 0 for subset in range(len(param_sweep))}
+    frames = []
+    exceptions = []
+
+    active = list(range(len(param_sweep)))
+    offset = 0
+    while active:
+        batch = min(rule.min_runs if offset == 0 else rule.batch_size, rule.max_runs - offset)
+        # Simulate the active subsets as one sweep, where each parameter list has the value of each active subset
+        params = {key: [param_sweep[subset][key] for subset in active] for key in param_sweep[0]}
+        sweep = Simulation(
+            model=Model(
+                initial_state=simulation.model.initial_state,
+                state_update_blocks=simulation.model.state_update_blocks,
+                params=params,
+            ),
+            timesteps=simulation.timesteps,
+            runs=batch,
+        )
+        sweep.engine = BatchEngine(
+            run_offset=offset,
+            backend=engine.backend,
+            processes=engine.processes,
+            raise_exceptions=False,
+            deepcopy=engine.deepcopy,
+            drop_substeps=engine.drop_substeps,
+        )
+        sweep.run()
+
+        df = pd.DataFrame(sweep.results)
+        df["subset"] = np.asarray(active)[df["subset"].to_numpy()]
+        frames.append(df)
+        failed = set()
+        for exception in sweep.exceptions:
+            exception = {**exception, "subset": active[exception["subset"]]}
+            exceptions.append(exception)
+            if exception["exception"] is not None:
+                failed.add((exception["subset"], exception["run"] + 1))
+
+        # Every attempted run has an exceptions entry, including failed runs that produced no results
+        for exception in exceptions[len(exceptions) - len(sweep.exceptions):]:
+            runs[exception["subset"]] += 1
+        for ((subset, run), run_df) in df.groupby(["subset", "run"], sort=False):
+            if (subset, run) in failed:
+                continue
+            for (name, metric) in metrics.items():
+                samples[subset][name].append(metric(run_df, param_sweep[subset]))
+
+        offset += batch
+        converged = [
+            subset for subset in active
+            if all(rule.converged(np.asarray(values)) for values in samples[subset].values())
+        ]
+        logging.info(f"Adaptive runs: {offset} runs, {len(converged)} of {len(active)} active subsets converged")
+        active = [subset for subset in active if subset not in converged and offset < rule.max_runs]
+
+    df = pd.concat(frames, ignore_index=True).assign(simulation=0)
+    # Restore radCAD row order: by run, then subset, then timestep
+    df = df.sort_values(["run", "subset", "timestep", "substep"], kind="stable", ignore_index=True)
+    exceptions.sort(key=lambda exception: (exception["run"], exception["subset"]))
+
+    summary = pd.DataFrame([
+        {
+            "subset": subset,
+            "runs": runs[subset],
+            **{
+                f"{name}_{statistic}": value
+                for (name, values) in samples[subset].items()
+                for (statistic, value) in (
+                    ("mean", np.mean(values) if values else np.nan),
+                    ("half_width", rule.half_width(np.asarray(values))),
+                )
+            },
+            "converged": all(rule.converged(np.asarray(values)) for values in samples[subset].values()),
+        }
+        for subset in samples
+    ]).set_index("subset")
+
+    return df, exceptions, summary
@@ -0,0 +1,252 @@
+"""
+Online aggregation of Monte Carlo runs
+
+Rather than keeping every row of every run, each run is folded into per-(subset, timestep) accumulators as soon as
+it completes, so that memory is independent of the number of runs:
+* mean and variance using Welford's algorithm,
+* quantiles using the P² algorithm (Jain & Chlamtac, 1985), which keeps five markers per quantile,
+* and minimum and maximum.
+
+The aggregation is used with the streaming engine, which returns a compact summary frame with a row per
+simulation, subset and timestep, and columns such as `lbp_y_usd_price_mean` or `weight_x_p95`:
+
+    simulation.runs = 10_000
+    simulation.engine = StreamingEngine(drop_substeps=True, aggregation=OnlineAggregation(["lbp_y_usd_price", "weight_x"]))
+    df, exceptions = run(simulation)
+
+or to aggregate existing results with `aggregate(df, aggregation)`.
+"""
+
+import typing
+import numpy as np
+import pandas as pd
+
+
+class OnlineAggregation(typing.NamedTuple):
+    """Which State Variables are aggregated across runs, and which quantiles are estimated
+
+    Args:
+        variables (List[str]): Numeric State Variables to aggregate
+        quantiles (List[float]): Quantiles to estimate, between 0 and 1
+    """
+
+    variables: typing.Sequence[str] = ("lbp_y_usd_price", "weight_x")
+    quantiles: typing.Sequence[float] = (0.05, 0.5, 0.95)
+
+
+def quantile_label(quantile) -> str:
+    """Column suffix of a quantile, e.g. `p5` for the 0.05 quantile"""
+    return f"p{quantile * 100:g}"
+
+
+def _grow(array, size, fill):
+    if len(array) >= size:
+        return array
+    grown = np.full((size,) + array.shape[1:], fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class Welford:
+    """Running count, mean, variance, minimum and maximum of a vector of independent series, e.g. one per timestep"""
+
+    def __init__(self, size=0):
+        self.count = np.zeros(size, dtype=np.int64)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+
+    def grow(self, size):
+        self.count = _grow(self.count, size, 0)
+        self.mean = _grow(self.mean, size, 0.0)
+        self.m2 = _grow(self.m2, size, 0.0)
+        self.min = _grow(self.min, size, np.inf)
+        self.max = _grow(self.max, size, -np.inf)
+
+    def update(self, index: np.ndarray, values: np.ndarray):
+        """Add one value to each of the series at the (unique) indices"""
+        self.count[index] += 1
+        delta = values - self.mean[index]
+        self.mean[index] += delta / self.count[index]
+        self.m2[index] += delta * (values - self.mean[index])
+        self.min[index] = np.minimum(self.min[index], values)
+        self.max[index] = np.maximum(self.max[index], values)
+
+    def variance(self) -> np.ndarray:
+        """Sample variance, or NaN for series with fewer than two values"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+
+class P2Quantiles:
+    """Running P² estimates of quantiles of a vector of independent series, e.g. one per timestep
+
+    Each quantile of each series is tracked by five markers, whose heights approximate the minimum,
+    the quantile and its midpoints with the extremes, and the maximum. Until a series has five values,
+    the exact quantiles of its values are returned.
+    """
+
+    def __init__(self, quantiles, size=0):
+        self.quantiles = np.asarray(quantiles, dtype=np.float64)
+        p = self.quantiles[:, None]
+        # Desired marker positions after the first five values, and their increments for each further value
+        self.initial_positions = np.hstack([np.zeros_like(p), 2 * p, 4 * p, 2 + 2 * p, np.full_like(p, 4)])
+        self.increments = np.hstack([np.zeros_like(p), p / 2, p, (1 + p) / 2, np.ones_like(p)])
+
+        shape = (size, len(self.quantiles), 5)
+        self.count = np.zeros(size, dtype=np.int64)
+        self.buffer = np.zeros((size, 5))
+        self.heights = np.zeros(shape)
+        self.positions = np.zeros(shape)
+        self.desired = np.zeros(shape)
+
+    def grow(self, size):
+        self.count = _grow(self.count, size, 0)
+        self.buffer = _grow(self.buffer, size, 0.0)
+        self.heights = _grow(self.heights, size, 0.0)
+        self.positions = _grow(self.positions, size, 0.0)
+        self.desired = _grow(self.desired, size, 0.0)
+
+    def update(self, index: np.ndarray, values: np.ndarray):
+        """Add one value to each of the series at the (unique) indices"""
+        count = self.count[index]
+        self.count[index] += 1
+
+        # Buffer the first five values of each series, and initialize the markers from them
+        buffering = count < 5
+        self.buffer[index[buffering], count[buffering]] = values[buffering]
+        initialized = index[buffering & (count == 4)]
+        if len(initialized):
+            self.heights[initialized] = np.sort(self.buffer[initialized], axis=1)[:, None, :]
+            self.positions[initialized] = np.arange(5)
+            self.desired[initialized] = self.initial_positions
+
+        index, values = index[~buffering], values[~buffering]
+        if not len(index):
+            return
+        q = self.heights[index]
+        n = self.positions[index]
+        x = np.broadcast_to(values[:, None], q.shape[:2])
+
+        # Extend the extreme markers, and increment the positions of the markers above the value's cell
+        q[..., 0] = np.minimum(q[..., 0], x)
+        q[..., 4] = np.maximum(q[..., 4], x)
+        cell = np.sum(q[..., 1:4] <= x[..., None], axis=-1)
+        n += np.arange(5) > cell[..., None]
+        desired = self.desired[index] + self.increments
+
+        # Adjust the middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = desired[..., i] - n[..., i]
+            adjust = ((d >= 1) & (n[..., i + 1] - n[..., i] > 1)) | ((d <= -1) & (n[..., i - 1] - n[..., i] < -1))
+            if not adjust.any():
+                continue
+            d = np.sign(d)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                parabolic = q[..., i] + d / (n[..., i + 1] - n[..., i - 1]) * (
+                    (n[..., i] - n[..., i - 1] + d) * (q[..., i + 1] - q[..., i]) / (n[..., i + 1] - n[..., i])
+                    + (n[..., i + 1] - n[..., i] - d) * (q[..., i] - q[..., i - 1]) / (n[..., i] - n[..., i - 1])
+                )
+                neighbour_q = np.where(d > 0, q[..., i + 1], q[..., i - 1])
+                neighbour_n = np.where(d > 0, n[..., i + 1], n[..., i - 1])
+                linear = q[..., i] + d * (neighbour_q - q[..., i]) / (neighbour_n - n[..., i])
+            monotonic = (q[..., i - 1] < parabolic) & (parabolic < q[..., i + 1])
+            q[..., i] = np.where(adjust, np.where(monotonic, parabolic, linear), q[..., i])
+            n[..., i] = np.where(adjust, n[..., i] + d, n[..., i])
+
+        self.heights[index] = q
+        self.positions[index] = n
+        self.desired[index] = desired
+
+    def estimates(self) -> np.ndarray:
+        """Quantile estimates with shape (size, quantiles), or NaN for series without values"""
+        estimates = self.heights[..., 2].copy()
+        for i in np.flatnonzero(self.count < 5):
+            values = self.buffer[i, :self.count[i]]
+            estimates[i] = np.quantile(values, self.quantiles) if len(values) else np.nan
+        return estimates
+
+
+class AggregatingSink:
+    """Folds each run into per-(simulation, subset, timestep) accumulators, see `OnlineAggregation`
+
+    States are appended in radCAD row order like `experiments.streaming.ColumnarSink`, and only the current run is buffered.
+    With substeps, the final substep of each timestep is aggregated.
+    """
+
+    def __init__(self, aggregation: OnlineAggregation):
+        self.aggregation = aggregation
+        self.accumulators = {}
+        self.run = None
+        self.buffer = {}
+
+    def append(self, state: dict):
+        run = (state["simulation"], state["subset"], state["run"])
+        if run != self.run:
+            self.flush()
+            self.run = run
+        self.buffer[state["timestep"]] = [state[variable] for variable in self.aggregation.variables]
+
+    def flush(self):
+        """Fold the buffered run into the accumulators"""
+        if self.run is None or not self.buffer:
+            return
+        (simulation, subset, _run) = self.run
+        timesteps = np.fromiter(self.buffer.keys(), dtype=np.int64, count=len(self.buffer))
+        values = np.array(list(self.buffer.values()), dtype=np.float64).reshape(len(timesteps), -1)
+        self.add_run(simulation, subset, timesteps, values)
+        self.buffer = {}
+
+    def add_run(self, simulation, subset, timesteps: np.ndarray, values: np.ndarray):
+        """Fold one run, with the values of each variable as columns of `values`"""
+        if (simulation, subset) not in self.accumulators:
+            self.accumulators[(simulation, subset)] = [
+                (Welford(), P2Quantiles(self.aggregation.quantiles)) for _variable in self.aggregation.variables
+            ]
+        size = int(timesteps.max()) + 1
+        for (column, (welford, quantiles)) in enumerate(self.accumulators[(simulation, subset)]):
+            welford.grow(size)
+            quantiles.grow(size)
+            # Missing values, e.g. None, are skipped
+            valid = ~np.isnan(values[:, column])
+            welford.update(timesteps[valid], values[valid, column])
+            quantiles.update(timesteps[valid], values[valid, column])
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """The summary frame, with a row per simulation, subset and timestep"""
+        self.flush()
+        frames = []
+        for ((simulation, subset), accumulators) in sorted(self.accumulators.items()):
+            (welford, _quantiles) = accumulators[0]
+            timesteps = np.arange(len(welford.count))
+            columns = {
+                "simulation": simulation,
+                "subset": subset,
+                "timestep": timesteps,
+                "runs": welford.count,
+            }
+            for (variable, (welford, quantiles)) in zip(self.aggregation.variables, accumulators):
+                empty = welford.count == 0
+                columns[f"{variable}_mean"] = np.where(empty, np.nan, welford.mean)
+                columns[f"{variable}_std"] = np.sqrt(welford.variance())
+                columns[f"{variable}_min"] = np.where(empty, np.nan, welford.min)
+                columns[f"{variable}_max"] = np.where(empty, np.nan, welford.max)
+                for (quantile, estimates) in zip(self.aggregation.quantiles, quantiles.estimates().T):
+                    columns[f"{variable}_{quantile_label(quantile)}"] = estimates
+            frame = pd.DataFrame(columns)
+            frames.append(frame[frame["runs"] > 0])
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+
+def aggregate(df: pd.DataFrame, aggregation: OnlineAggregation) -> pd.DataFrame:
+    """Aggregate existing results across runs, e.g. the results of the radCAD engine"""
+    sink = AggregatingSink(aggregation)
+    # The final substep of each timestep of each run
+    df = df.drop_duplicates(["simulation", "subset", "run", "timestep"], keep="last")
+    for ((simulation, subset, _run), run_df) in df.groupby(["simulation", "subset", "run"], sort=False):
+        values = run_df[list(aggregation.variables)].to_numpy(dtype=np.float64)
+        sink.add_run(simulation, subset, run_df["timestep"].to_numpy(), values)
+    return sink.to_dataframe()
@@ -0,0 +1,221 @@
+"""
+On-disk caches of experiment inputs and results
+
+Stochastic process realizations are stored as `.npy` files and memory-mapped read-only on read,
+so that repeated notebook sessions don't regenerate identical samples, and parallel workers mapping
+the same file share its pages rather than each holding a copy of a large scenario set.
+
+    from experiments.cache import get_realizations, get_realization_process
+
+    eth_price_samples = get_realizations("eth_price_samples", runs=10_000, seed=1)
+    params.update({"eth_price_process": [get_realization_process("eth_price_samples", runs=10_000, seed=1)]})
+
+Finished simulation results are stored by a content hash of the experiment (see `experiments.utils.get_executable_hash(...)`),
+so that `experiments.run.run(...)` returns cached results for unchanged experiments, e.g. after a kernel restart,
+or by a content hash of each parameter subset with `run(..., incremental=True)`, which only simulates changed subsets.
+"""
+
+import os
+import glob
+import hashlib
+import tempfile
+import dill
+import numpy as np
+
+import experiments.simulation_configuration as simulation
+from model.random_streams import random_streams
+from model.stochastic_processes import create_stochastic_process_realizations
+
+
+class RealizationCache:
+    """A size-bounded cache of stochastic process realizations, with least-recently-used eviction
+
+    Entries are keyed by the process type, process parameters, number of timesteps, unit of time `dt`,
+    run count, seed and master seed `MASTER_SEED`, and realizations for a missing key are drawn from
+    the deterministic random number stream of the process and seed (see `model.random_streams`).
+    Reading an entry marks it as recently used, and the least recently used entries are evicted
+    once the total size of the cache exceeds `size_limit` bytes.
+    """
+
+    def __init__(self, directory=".realizations.cache", size_limit=2**30):
+        self.directory = directory
+        self.size_limit = size_limit
+
+    def key(self, process, runs, timesteps, dt, seed, **kwargs) -> str:
+        """The cache key of a set of realizations"""
+        description = repr((process, runs, timesteps, dt, seed, random_streams.master_seed, sorted(kwargs.items())))
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def path(self, key) -> str:
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(
+        self,
+        process,
+        runs=simulation.MONTE_CARLO_RUNS,
+        timesteps=simulation.TIMESTEPS,
+        dt=simulation.DELTA_TIME,
+        seed=1,
+        **kwargs,
+    ) -> np.ndarray:
+        """Get realizations of shape (runs, timesteps * dt + 1) as a read-only memory-mapped array, generating them if missing
+
+        See `model.stochastic_processes.create_stochastic_process_realizations(...)` for the available processes and parameters.
+        """
+        return np.load(self.get_path(process, runs, timesteps, dt, seed, **kwargs), mmap_mode="r")
+
+    def get_process(
+        self,
+        process,
+        runs=simulation.MONTE_CARLO_RUNS,
+        timesteps=simulation.TIMESTEPS,
+        dt=simulation.DELTA_TIME,
+        seed=1,
+        **kwargs,
+    ) -> "MappedProcess":
+        """Get realizations as an environmental process System Parameter, see `MappedProcess`"""
+        return MappedProcess(self.get_path(process, runs, timesteps, dt, seed, **kwargs))
+
+    def get_path(self, process, runs, timesteps, dt, seed, **kwargs) -> str:
+        """Get the path of the cached realizations, generating them if missing"""
+        path = self.path(self.key(process, runs, timesteps, dt, seed, **kwargs))
+        if os.path.exists(path):
+            try:
+                # Mark as recently used
+                os.utime(path)
+            except OSError:
+                pass
+            return path
+
+        realizations = create_stochastic_process_realizations(
+            process, timesteps=timesteps, dt=dt, runs=runs, rng=random_streams.generator(process, seed), **kwargs
+        )
+        self.put(path, realizations)
+        return path
+
+    def put(self, path, realizations: np.ndarray):
+        """Write realizations to the cache, and evict least recently used entries if over the size limit
+
+        The file is written under a temporary name and then renamed, so concurrent workers never map a partial file.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                np.save(file, realizations)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the cache is within its size limit, except for the entry `keep`"""
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, "*.npy")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.size_limit:
+                break
+            if path == keep:
+                continue
+            try:
+                # Workers that already mapped the file keep their mapping until released
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+    def size(self) -> int:
+        """The total size of the cache in bytes"""
+        return sum(os.path.getsize(path) for path in glob.glob(os.path.join(self.directory, "*.npy")))
+
+    def clear(self):
+        for path in glob.glob(os.path.join(self.directory, "*.npy")):
+            os.remove(path)
+
+
+class MappedProcess:
+    """An environmental process that samples realizations memory-mapped from a `.npy` file
+
+    Like `model.stochastic_processes.create_sampled_process(...)`, the process is called as `process(run, timestep * dt)`
+    and flagged as `vectorized`. It is pickled and deep-copied by path, so parallel workers map the same file read-only
+    rather than receiving a copy of the realizations.
+    """
+
+    vectorized = True
+
+    def __init__(self, path):
+        self.path = path
+        self.realizations = np.load(path, mmap_mode="r")
+
+    def __call__(self, run, epoch):
+        return self.realizations[np.asarray(run) - 1, np.asarray(epoch).astype(int)]
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+
+class ResultCache:
+    """Finished simulation results and exceptions stored on disk by content hash
+
+    Results are serialized with `dill`, as radCAD exceptions include the System Parameters of the failed run,
+    which may contain functions that can't be pickled, such as lambdas.
+    """
+
+    def __init__(self, directory=".results.cache"):
+        self.directory = directory
+
+    def path(self, key) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def contains(self, key) -> bool:
+        """Whether results are cached for the key, without loading them"""
+        return os.path.exists(self.path(key))
+
+    def get(self, key):
+        """Get the cached `(results, exceptions)` tuple, or None if missing"""
+        try:
+            with open(self.path(key), "rb") as file:
+                return dill.load(file)
+        except (FileNotFoundError, EOFError, dill.UnpicklingError):
+            return None
+
+    def put(self, key, results, exceptions):
+        os.makedirs(self.directory, exist_ok=True)
+        # Write under a temporary name and rename, so concurrent readers never load a partial file
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                dill.dump((results, exceptions), file)
+            os.replace(temporary_path, self.path(key))
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+    def clear(self):
+        for path in glob.glob(os.path.join(self.directory, "*.pkl")):
+            os.remove(path)
+
+
+realization_cache = RealizationCache()
+result_cache = ResultCache()
+
+
+def get_realizations(process, **kwargs) -> np.ndarray:
+    """Get realizations from the default realization cache, see `RealizationCache.get(...)`"""
+    return realization_cache.get(process, **kwargs)
+
+
+def get_realization_process(process, **kwargs) -> MappedProcess:
+    """Get realizations from the default realization cache as an environmental process, see `RealizationCache.get_process(...)`"""
+    return realization_cache.get_process(process, **kwargs)
@@ -4,12 +4,13 @@ The default experiment with default System Parameters, State Variables, and Simu
 The defaults are defined in their respective modules (e.g. `model/system_parameters.py`).
 """
 
-from radcad import Model, Simulation, Experiment, Backend
+from radcad import Model, Simulation, Experiment
 
 from model.system_parameters import parameters
 from model.state_variables import initial_state
 from model.state_update_blocks import state_update_blocks
-from experiments.simulation_configuration import TIMESTEPS, DELTA_TIME, MONTE_CARLO_RUNS
+from experiments.simulation_configuration import TIMESTEPS, DELTA_TIME, MONTE_CARLO_RUNS, BACKEND
+from experiments.shared_memory import SharedMemoryEngine
 
 
 # Create Model
@@ -18,8 +19,7 @@ model = Model(params=parameters, initial_state=initial_state, state_update_block
 simulation = Simulation(model=model, timesteps=TIMESTEPS, runs=MONTE_CARLO_RUNS)
 # Create Experiment of single Simulation
 experiment = Experiment([simulation])
-# Configure Simulation & Experiment engine
+# Configure Simulation & Experiment engine,
+# sharing large System Parameter arrays with parallel workers (see experiments.shared_memory)
+experiment.engine = SharedMemoryEngine(backend=BACKEND, deepcopy=False, drop_substeps=True)
 simulation.engine = experiment.engine
-experiment.engine.backend = Backend.SINGLE_PROCESS
-experiment.engine.deepcopy = False
-experiment.engine.drop_substeps = True
@@ -0,0 +1,142 @@
+"""
+Incremental execution of parameter sweeps
+
+Results are cached per parameter subset (see `experiments.utils.get_subset_hash(...)`), so that when a sweep is edited
+or extended, e.g. by adding a new `lbp_length` value, only the subsets without cached results are simulated:
+
+    df, exceptions = run(simulation, incremental=True)  # simulates all subsets
+    simulation.model.params.update({"lbp_length": [100, 120, 140]})
+    df, exceptions = run(simulation, incremental=True)  # only simulates the subset with `lbp_length` 140
+
+The missing subsets are simulated together as a single sweep using the simulation's engine,
+and the results of all subsets are stitched together with their `subset` index in the requested sweep,
+in radCAD row order. With a streaming engine writing to a Parquet dataset (see `experiments.streaming`),
+the stitched results of all subsets, cached or not, are written to the dataset.
+"""
+
+import copy
+import logging
+import typing
+import pandas as pd
+from radcad import Model, Simulation, Experiment
+from radcad.core import generate_parameter_sweep
+
+from experiments.utils import get_subset_hash
+from experiments.streaming import ColumnarSink
+
+
+class SweepPlan(typing.NamedTuple):
+    """The parameter subsets of a simulation, their cache keys, and the indices of the subsets without cached results"""
+
+    param_sweep: typing.List[dict]
+    keys: typing.List[str]
+    missing: typing.List[int]
+
+
+def plan_sweep(simulation, cache, engine=None) -> SweepPlan:
+    engine = engine or simulation.engine
+    param_sweep = generate_parameter_sweep(simulation.model.params) or [simulation.model.params]
+    keys = [get_subset_hash(simulation, param_set, engine) for param_set in param_sweep]
+    missing = [subset for (subset, key) in enumerate(keys) if not cache.contains(key)]
+    return SweepPlan(param_sweep, keys, missing)
+
+
+def run_sweep(simulation, cache, simulation_index=0, engine=None) -> typing.Tuple[pd.DataFrame, list]:
+    """Run the parameter subsets of a simulation without cached results, and stitch them with the cached subsets
+
+    Returns:
+        Tuple[pd.DataFrame, list]: The results of all subsets and the exceptions of each run, like the radCAD engine
+    """
+    engine = engine or simulation.engine
+    plan = plan_sweep(simulation, cache, engine)
+    # Load each cached subset once, and run subsets whose cached results can't be loaded
+    cached = {subset: cache.get(key) for (subset, key) in enumerate(plan.keys) if subset not in plan.missing}
+    missing = sorted(plan.missing + [subset for (subset, entry) in cached.items() if entry is None])
+    plan = plan._replace(missing=missing)
+
+    dataset_engine = engine if getattr(engine, "directory", None) is not None else None
+    if dataset_engine is not None:
+        # The sweep only includes the missing subsets, so it is simulated in memory and the stitched results are written
+        engine = copy.copy(engine)
+        engine.directory = None
+
+    logging.info(
+        f"Simulation {simulation_index}: {len(plan.param_sweep) - len(plan.missing)} cached subsets, {len(plan.missing)} to run"
+    )
+
+    entries = {subset: entry for (subset, entry) in cached.items() if entry is not None}
+    if plan.missing:
+        # Simulate the missing subsets as one sweep, where each parameter list has the value of each missing subset
+        params = {
+            key: [plan.param_sweep[subset][key] for subset in plan.missing]
+            for key in plan.param_sweep[0]
+        }
+        sweep = Simulation(
+            model=Model(
+                initial_state=simulation.model.initial_state,
+                state_update_blocks=simulation.model.state_update_blocks,
+                params=params,
+            ),
+            timesteps=simulation.timesteps,
+            runs=simulation.runs,
+        )
+        sweep.engine = engine
+        sweep.run()
+
+        df = sweep.results if isinstance(sweep.results, pd.DataFrame) else pd.DataFrame(sweep.results)
+        for (local_subset, subset) in enumerate(plan.missing):
+            subset_exceptions = [exception for exception in sweep.exceptions if exception.get("subset") == local_subset]
+            subset_df = df[df["subset"] == local_subset]
+            # Partial results of failed subsets are returned, but not cached
+            if not any(exception.get("exception") for exception in subset_exceptions):
+                cache.put(plan.keys[subset], subset_df, subset_exceptions)
+            entries[subset] = (subset_df, subset_exceptions)
+
+    df, exceptions = _stitch(entries, simulation_index)
+    if dataset_engine is not None:
+        sink = ColumnarSink(directory=dataset_engine.directory, overwrite=getattr(dataset_engine, "overwrite", False))
+        sink.extend(df)
+    return df, exceptions
+
+
+def _stitch(entries: dict, simulation_index):
+    frames = []
+    exceptions = []
+    for (subset, (subset_df, subset_exceptions)) in sorted(entries.items()):
+        # Cached subsets may have had a different index in the sweep they were simulated in
+        frames.append(subset_df.assign(subset=subset))
+        exceptions.extend(
+            {**exception, "simulation": simulation_index, "subset": subset} for exception in subset_exceptions
+        )
+
+    df = pd.concat(frames, ignore_index=True).assign(simulation=simulation_index)
+    # Restore radCAD row order: by run, then subset, then timestep
+    df = df.sort_values(["run", "subset", "timestep", "substep"], kind="stable", ignore_index=True)
+    exceptions.sort(key=lambda exception: (exception.get("run"), exception.get("subset")))
+    return df, exceptions
+
+
+def run_incremental(executable, cache) -> typing.Tuple[pd.DataFrame, list]:
+    """Run an experiment or simulation, only simulating the parameter subsets without cached results
+
+    Each simulation is run with its own engine, or the experiment's engine. The experiment and simulation hooks
+    are called like the radCAD engine calls them, but the run and subset hooks are not called,
+    as cached subsets are not run and the missing subsets are run with different subset indices.
+    """
+    experiment = executable if isinstance(executable, Experiment) else None
+    simulations = executable.simulations if experiment else [executable]
+    engine = executable.engine if experiment else None
+
+    frames = []
+    exceptions = []
+    executable._before_experiment(experiment=experiment)
+    for (simulation_index, simulation) in enumerate(simulations):
+        executable._before_simulation(simulation=simulation)
+        df, simulation_exceptions = run_sweep(simulation, cache, simulation_index, engine)
+        frames.append(df)
+        exceptions.extend(simulation_exceptions)
+        executable._after_simulation(simulation=simulation)
+
+    executable.results, executable.exceptions = pd.concat(frames, ignore_index=True), exceptions
+    executable._after_experiment(experiment=experiment)
+    return executable.results, executable.exceptions
@@ -1,3 +1,5 @@
+import enum
+import datetime
 import pandas as pd
 from radcad.core import generate_parameter_sweep
 
@@ -5,14 +7,45 @@ import model.constants as constants
 from model.system_parameters import parameters, Parameters
 
 
+def _is_scalar(value):
+    return pd.api.types.is_scalar(value) or isinstance(value, (enum.Enum, datetime.datetime))
+
+
+def _label(value, index):
+    # Label non-scalar parameters such as functions by name and position in the parameter sweep list
+    name = getattr(value, "__name__", type(value).__name__)
+    return f"{name} [{index}]"
+
+
+def parameter_table(parameters: Parameters, set_params=[]) -> pd.DataFrame:
+    """Create a table of System Parameters indexed by subset
+
+    Non-scalar parameters such as environmental processes are represented by categorical labels,
+    see `_label(...)`, so that they can be grouped and filtered like scalar parameters.
+    """
+    parameter_sweep = generate_parameter_sweep(parameters)
+    table = pd.DataFrame(
+        {param: [subset[param] for subset in parameter_sweep] for param in set_params},
+        index=pd.RangeIndex(len(parameter_sweep), name="subset"),
+    )
+
+    for param in set_params:
+        values = list(parameters[param]) if isinstance(parameters[param], list) else [parameters[param]]
+        if all(_is_scalar(value) for value in values):
+            continue
+        labels = [_label(value, index) for (index, value) in enumerate(values)]
+        codes = [next(index for (index, value) in enumerate(values) if value is subset_value) for subset_value in table[param]]
+        table[param] = pd.Categorical.from_codes(codes, categories=labels)
+
+    return table
+
+
 def assign_parameters(df: pd.DataFrame, parameters: Parameters, set_params=[]):
     if set_params:
-        parameter_sweep = generate_parameter_sweep(parameters)
-        parameter_sweep = [{param: subset[param] for param in set_params} for subset in parameter_sweep]
-
-        for subset_index in df['subset'].unique():
-            for (key, value) in parameter_sweep[subset_index].items():
-                df.loc[df.eval(f'subset == {subset_index}'), key] = value
+        # Join the parameter table onto the results by subset
+        joined = parameter_table(parameters, set_params).reindex(df['subset'].to_numpy())
+        for param in set_params:
+            df[param] = joined[param].values
 
     return df
 
@@ -25,6 +58,10 @@ def post_process(df: pd.DataFrame, drop_timestep_zero=True, parameters=parameter
     ])
 
 
+    # Drop the agent population, which is updated in place and only reflects the final state of each run
+    if 'agents' in df.columns:
+        df = df.drop(columns=['agents'])
+
     # Drop the initial state for plotting
     if drop_timestep_zero:
         df = df.drop(df.query('timestep == 0').index)
@@ -0,0 +1,162 @@
+"""
+Opt-in profiling of Policies and State Update Functions
+
+A `Profiler` wraps every Policy and State Update Function of the State Update Blocks to record call counts,
+cumulative and percentile latency, and optionally memory allocations using `tracemalloc`:
+
+    with profile(experiment) as profiler:
+        experiment.run()
+    print(profiler.report())
+
+or using `experiments.run.run(profile=True)`, which logs the per-block report after the run.
+
+When profiling is disabled the State Update Blocks are not wrapped at all, so there is no overhead.
+Timings are collected in the current process, so should be used with the `Backend.SINGLE_PROCESS` backend.
+"""
+
+import time
+import logging
+import functools
+import tracemalloc
+import contextlib
+import collections
+import numpy as np
+import pandas as pd
+from radcad import Backend, Engine
+
+from model.utils import _update_from_signal
+from experiments.shared_memory import SharedMemoryEngine
+
+
+def function_name(function) -> str:
+    """A readable name of a Policy or State Update Function, e.g. `update_from_signal("stage")`"""
+    if isinstance(function, functools.partial):
+        if function.func is _update_from_signal:
+            return f'update_from_signal("{function.args[1]}")'
+        return f"partial({function_name(function.func)})"
+    return getattr(function, "__qualname__", repr(function))
+
+
+class Profiler:
+    """Records the latency and allocations of each wrapped Policy and State Update Function
+
+    Args:
+        trace_memory (bool): Record the net and peak memory allocated by each call using `tracemalloc`,
+            which is significantly slower than only recording latency
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.durations = collections.defaultdict(list)
+        self.allocations = collections.defaultdict(list)
+        self.peaks = collections.defaultdict(list)
+        self.descriptions = {}
+
+    def wrap(self, key, function):
+        """Wrap a function to record each call under the key `(block, kind, name)`"""
+        durations = self.durations[key]
+
+        if not self.trace_memory:
+            def profiled(*args):
+                start = time.perf_counter_ns()
+                result = function(*args)
+                durations.append(time.perf_counter_ns() - start)
+                return result
+            return profiled
+
+        allocations = self.allocations[key]
+        peaks = self.peaks[key]
+
+        def profiled(*args):
+            tracemalloc.reset_peak()
+            (allocated, _peak) = tracemalloc.get_traced_memory()
+            start = time.perf_counter_ns()
+            result = function(*args)
+            end = time.perf_counter_ns()
+            (current, peak) = tracemalloc.get_traced_memory()
+            durations.append(end - start)
+            allocations.append(current - allocated)
+            peaks.append(peak - allocated)
+            return result
+        return profiled
+
+    def instrument(self, state_update_blocks) -> list:
+        """A copy of the State Update Blocks with every Policy and State Update Function wrapped"""
+        instrumented = []
+        for (block, state_update_block) in enumerate(state_update_blocks):
+            self.descriptions[block] = " ".join(state_update_block.get("description", "").split())
+            instrumented.append({
+                **state_update_block,
+                "policies": {
+                    key: self.wrap((block, "policy", function_name(function)), function)
+                    for (key, function) in state_update_block["policies"].items()
+                },
+                "variables": {
+                    key: self.wrap((block, "variable", function_name(function)), function)
+                    for (key, function) in state_update_block["variables"].items()
+                },
+            })
+        return instrumented
+
+    def report(self) -> pd.DataFrame:
+        """Per-block report of call counts, latency in seconds, and allocations in bytes, sorted by cumulative latency"""
+        rows = []
+        for ((block, kind, name), durations) in self.durations.items():
+            if not durations:
+                continue
+            seconds = np.array(durations) / 1e9
+            (p50, p90, p99) = np.percentile(seconds, [50, 90, 99])
+            row = {
+                "block": block,
+                "description": self.descriptions.get(block),
+                "kind": kind,
+                "function": name,
+                "calls": len(seconds),
+                "total": seconds.sum(),
+                "mean": seconds.mean(),
+                "p50": p50,
+                "p90": p90,
+                "p99": p99,
+                "max": seconds.max(),
+            }
+            if self.trace_memory:
+                row["allocated"] = int(np.sum(self.allocations[(block, kind, name)]))
+                row["peak"] = int(np.max(self.peaks[(block, kind, name)]))
+            rows.append(row)
+        df = pd.DataFrame(rows)
+        if df.empty:
+            return df
+        df["share"] = df["total"] / df["total"].sum()
+        return df.sort_values(["block", "total"], ascending=[True, False]).reset_index(drop=True)
+
+    def block_report(self) -> pd.DataFrame:
+        """Report aggregated per State Update Block"""
+        df = self.report()
+        if df.empty:
+            return df
+        columns = ["calls", "total", "share"] + (["allocated"] if self.trace_memory else [])
+        return df.groupby(["block", "description"])[columns].sum()
+
+
+@contextlib.contextmanager
+def profile(executable, trace_memory=False):
+    """Instrument the State Update Blocks of an experiment or simulation for the duration of the context"""
+    simulations = getattr(executable, "simulations", [executable])
+    engine = executable.engine
+    if type(engine) in (Engine, SharedMemoryEngine) and engine.backend is not Backend.SINGLE_PROCESS:
+        logging.warning("Profiling only records calls made in the current process, use Backend.SINGLE_PROCESS")
+
+    profiler = Profiler(trace_memory=trace_memory)
+    original_blocks = [simulation.model.state_update_blocks for simulation in simulations]
+    tracing = trace_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    try:
+        for simulation in simulations:
+            simulation.model.state_update_blocks = profiler.instrument(simulation.model.state_update_blocks)
+        yield profiler
+    finally:
+        for (simulation, state_update_blocks) in zip(simulations, original_blocks):
+            simulation.model.state_update_blocks = state_update_blocks
+        if tracing:
+            tracemalloc.stop()
@@ -0,0 +1,181 @@
+"""
+Selective and decimated recording of State Variables
+
+A `RecordingPolicy` reduces the size of the results by recording:
+* only the chosen State Variables,
+* only every Nth timestep, in addition to the first and final timestep of each run,
+* and for the chosen State Variables, only the values that changed since the previous recorded row (delta encoding),
+  stored as sparse columns.
+
+The policy is applied while streaming results with `experiments.streaming.StreamingEngine(recording=...)`,
+or to the results of any engine with `record(df, policy)` e.g. `experiments.run.run(recording=...)`:
+
+    recording = RecordingPolicy(variables=["stage", "lbp_supply_x", "lbp_price_x_in_y"], every=24, on_change=["stage"])
+    df, exceptions = run(experiment, recording=recording)
+    df = densify(df)
+
+`densify(df)` reconstructs dense series with a row per timestep, forward-filling the delta-encoded values
+and the values at decimated timesteps from the previous recorded timestep (sample-and-hold).
+State Variables that were not recorded can't be reconstructed.
+"""
+
+import typing
+import numpy as np
+import pandas as pd
+
+
+# Columns that identify each row, always recorded
+index_columns = ["simulation", "subset", "run", "substep", "timestep"]
+run_columns = ["simulation", "subset", "run"]
+
+
+class RecordingPolicy(typing.NamedTuple):
+    """Which State Variables and timesteps are recorded
+
+    Args:
+        variables (List[str], optional): State Variables to record, or None to record all State Variables
+        every (int): Record every Nth timestep, in addition to the first and final timestep of each run
+        on_change (List[str]): State Variables only recorded when changed, with missing values otherwise
+    """
+
+    variables: typing.Optional[typing.Sequence[str]] = None
+    every: int = 1
+    on_change: typing.Sequence[str] = ()
+
+    def columns(self, columns) -> list:
+        """The recorded columns of the results, in their original order"""
+        if self.variables is None:
+            return list(columns)
+        return [column for column in columns if column in index_columns or column in self.variables]
+
+    def records_timestep(self, timestep, first_timestep, final_timestep) -> bool:
+        return timestep % self.every == 0 or timestep in (first_timestep, final_timestep)
+
+
+class Recorder:
+    """Applies a recording policy to a stream of states, in radCAD row order"""
+
+    def __init__(self, policy: RecordingPolicy):
+        self.policy = policy
+        self.columns = None
+        self.run = None
+        self.first_timestep = None
+        self.previous = {}
+
+    def record(self, state: dict, final_timestep) -> typing.Optional[dict]:
+        """The recorded values of a state, or None if the state is not recorded"""
+        if self.columns is None:
+            self.columns = self.policy.columns(state)
+
+        run = tuple(state[key] for key in run_columns)
+        if run != self.run:
+            # The first row of each run is recorded with all values
+            self.run = run
+            self.first_timestep = state["timestep"]
+            self.previous = {}
+        if not self.policy.records_timestep(state["timestep"], self.first_timestep, final_timestep):
+            return None
+        recorded = {key: state[key] for key in self.columns}
+
+        changed = False
+        for key in self.policy.on_change:
+            if key not in recorded:
+                continue
+            value = recorded[key]
+            if key in self.previous and _equal(self.previous[key], value):
+                recorded[key] = None
+            else:
+                self.previous[key] = value
+                changed = True
+
+        # Drop rows where only delta-encoded variables are recorded and none changed, except for the final timestep
+        only_on_change = all(key in index_columns or key in self.policy.on_change for key in self.columns)
+        if only_on_change and not changed and state["timestep"] != final_timestep:
+            return None
+        return recorded
+
+
+def _equal(a, b) -> bool:
+    try:
+        return bool(a == b)
+    except ValueError:
+        # e.g. Numpy arrays
+        return np.array_equal(a, b)
+
+
+def sparsify(df: pd.DataFrame, columns) -> pd.DataFrame:
+    """Store delta-encoded columns as sparse columns, where missing values take no memory"""
+    for column in columns:
+        if column not in df.columns or isinstance(df[column].dtype, pd.SparseDtype):
+            continue
+        values = df[column]
+        if values.dtype == object:
+            values = values.where(values.notna(), np.nan)
+        df[column] = pd.arrays.SparseArray(values, fill_value=np.nan)
+    return df
+
+
+def record(df: pd.DataFrame, policy: RecordingPolicy) -> pd.DataFrame:
+    """Apply a recording policy to the results of a run"""
+    df = df[policy.columns(df.columns)]
+
+    timesteps = df.groupby(run_columns, sort=False)["timestep"]
+    final_timestep = timesteps.transform("max")
+    selected = (
+        (df["timestep"] % policy.every == 0)
+        | (df["timestep"] == timesteps.transform("min"))
+        | (df["timestep"] == final_timestep)
+    )
+    df = df[selected].reset_index(drop=True)
+    final_timestep = final_timestep[selected].reset_index(drop=True)
+
+    on_change = [key for key in policy.on_change if key in df.columns]
+    if not on_change:
+        return df
+
+    first = ~df.duplicated(run_columns)
+    changed = {}
+    for key in on_change:
+        values = df[key]
+        previous = values.shift()
+        if values.dtype == object:
+            different = np.fromiter(
+                (not _equal(a, b) for (a, b) in zip(values, previous)), dtype=bool, count=len(values)
+            )
+        else:
+            different = (values != previous).to_numpy()
+        changed[key] = first.to_numpy() | different
+
+    df = df.copy()
+    for key in on_change:
+        df[key] = df[key].where(changed[key])
+
+    if all(key in index_columns or key in on_change for key in df.columns):
+        any_changed = np.logical_or.reduce(list(changed.values()))
+        df = df[any_changed | (df["timestep"] == final_timestep).to_numpy()].reset_index(drop=True)
+
+    return sparsify(df, on_change)
+
+
+def densify(df: pd.DataFrame) -> pd.DataFrame:
+    """Reconstruct dense results with a row per timestep of each run, forward-filling missing values within each run"""
+    columns = list(df.columns)
+    df = df.copy()
+    for column in columns:
+        if isinstance(df[column].dtype, pd.SparseDtype):
+            df[column] = df[column].sparse.to_dense()
+
+    # Reindex each run onto every timestep from the first to the final recorded timestep
+    runs = df.groupby(run_columns, sort=False)["timestep"].agg(["min", "max"]).reset_index()
+    counts = (runs["max"] - runs["min"] + 1).to_numpy()
+    dense = pd.DataFrame({key: np.repeat(runs[key].to_numpy(), counts) for key in run_columns})
+    dense["timestep"] = np.repeat(runs["min"].to_numpy(), counts) + (
+        np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    )
+
+    # With substeps, the final recorded substep of each timestep is kept
+    df = df.drop_duplicates(run_columns + ["timestep"], keep="last")
+    dense = dense.merge(df, on=run_columns + ["timestep"], how="left")
+    filled = [column for column in columns if column not in run_columns + ["timestep"]]
+    dense[filled] = dense.groupby(run_columns, sort=False)[filled].ffill()
+    return dense[columns]
@@ -5,6 +5,11 @@ import time
 
 from experiments.default_experiment import experiment
 from experiments.post_processing import post_process
+from experiments.cache import result_cache
+from experiments.planner import run_incremental
+from experiments.utils import get_executable_hash
+from experiments.profiling import profile as profile_blocks
+from experiments.recording import record
 
 # Configure logging framework
 # e.g. Use logging.debug(...) to log to log file
@@ -17,18 +22,67 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 
-def run(executable=experiment):
+def run(executable=experiment, cache=result_cache, profile=False, trace_memory=False, recording=None, incremental=False):
+    """Run an experiment or simulation, and post-process the results
+
+    Results are loaded from the cache if the experiment is unchanged, otherwise stored in the cache
+    unless any run failed. Set `cache=None` to always run the experiment. When the streaming engine writes
+    a Parquet dataset (see experiments.streaming), the experiment is always run, so that the dataset is written.
+
+    Set `incremental=True` to cache results per parameter subset, and only simulate the subsets without cached results,
+    see experiments.planner. The run and subset hooks are then not called.
+
+    Set `profile=True` to record the latency of each Policy and State Update Function, and `trace_memory=True`
+    to also record allocations, see experiments.profiling. The whole experiment is then run without the cache,
+    and the profiler is stored as `executable.profiler`.
+
+    Set `recording` to a RecordingPolicy to only keep the chosen State Variables and timesteps,
+    see experiments.recording. When the streaming engine aggregates runs (see experiments.aggregation),
+    the summary frame is returned and results are not cached.
+    """
     logging.info("Running experiment")
     start_time = time.time()
 
-    executable.run()
+    if profile:
+        with profile_blocks(executable, trace_memory=trace_memory) as profiler:
+            executable.run()
+        executable.profiler = profiler
+        with pd.option_context("display.max_columns", None, "display.width", None):
+            logging.info(f"Profile per State Update Block:\n{profiler.block_report()}")
+            logging.info(f"Profile per Policy and State Update Function:\n{profiler.report()}")
+    elif cache is not None and getattr(executable.engine, "aggregation", None) is None:
+        if incremental:
+            run_incremental(executable, cache)
+        elif getattr(executable.engine, "directory", None) is not None:
+            # A cache hit would return the results without writing them to the dataset
+            executable.run()
+        else:
+            key = get_executable_hash(executable)
+            cached = cache.get(key)
+            if cached is not None:
+                logging.info(f"Loaded cached results {key}")
+                executable.results, executable.exceptions = cached
+            else:
+                executable.run()
+                if not any(exception.get("exception") for exception in executable.exceptions):
+                    cache.put(key, executable.results, executable.exceptions)
+    else:
+        executable.run()
 
     experiment_duration = time.time() - start_time
     logging.info(f"Experiment complete in {experiment_duration} seconds")
 
     logging.info("Post-processing results")
 
-    df = pd.DataFrame(executable.results)
+    # The vectorized engine returns a DataFrame, the radCAD engine a list of State Variable dicts
+    if isinstance(executable.results, pd.DataFrame):
+        df = executable.results
+    else:
+        df = pd.DataFrame(executable.results)
+
+    # The streaming engine applies its recording policy while running
+    if recording is not None and recording != getattr(executable.engine, "recording", None):
+        df = record(df, recording)
 
     try:
         parameters = executable.simulations[0].model.params
@@ -0,0 +1,237 @@
+"""
+Shared-memory distribution of System Parameters to parallel workers
+
+The radCAD parallel backends pickle the System Parameters into every task, including large arrays such as
+the realizations of sampled environmental processes. The `SharedMemoryEngine` instead places each large array
+referenced by the System Parameters once in shared memory, and workers receive a lightweight handle,
+so task dispatch overhead no longer scales with the size of the arrays:
+
+    experiment.engine = SharedMemoryEngine(backend=Backend.PATHOS, deepcopy=False, drop_substeps=True)
+
+As with the radCAD Engine, the MULTIPROCESSING backend starts workers by importing the main module,
+so a script using it must run the experiment within an `if __name__ == "__main__":` block.
+
+Arrays are shared as memory-mapped `.npy` files in `/dev/shm`, which is RAM-backed on Linux
+(or the temporary directory elsewhere), and mapped read-only by the workers. Shared arrays are removed when the run
+finishes or the interpreter exits, and directories left behind by killed processes are removed by the next run.
+Large arrays are found:
+* as System Parameter values,
+* as attributes of objects, such as `model.stochastic_processes.SampledProcess` realizations,
+* and in the closure of functions, such as lambdas closing over realizations.
+
+Objects and functions referring to large arrays are shallow-copied with the arrays replaced by shared arrays,
+e.g. a `SampledProcess` is pickled into each task with a handle to its shared realizations.
+Shared arrays, like `SampledProcess` instances, are not copied by radCAD's deep copy of the System Parameters of each run.
+"""
+
+import os
+import glob
+import copy
+import uuid
+import types
+import atexit
+import shutil
+import weakref
+import tempfile
+import contextlib
+import numpy as np
+from radcad import Engine, Backend
+from radcad.core import generate_parameter_sweep
+
+
+# Arrays smaller than this are pickled into each task as usual
+min_bytes = 2**20
+
+# Prefix of the directories of shared arrays, followed by the ID of the process that created them
+directory_prefix = "radcad-shared-"
+
+# Shared arrays already mapped by the current process, reused while they are referenced
+_mapped = weakref.WeakValueDictionary()
+
+# Directories of shared arrays created by the current process, removed at exit if a run is interrupted
+_directories = set()
+
+
+def shared_directory() -> str:
+    """The directory shared arrays are stored in, RAM-backed on Linux"""
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def _process_exists(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def remove_stale_directories():
+    """Remove the shared array directories of processes that no longer exist, e.g. runs that were killed"""
+    if os.name != "posix":
+        # Signal 0 only checks the process exists on POSIX systems
+        return
+    for path in glob.glob(os.path.join(shared_directory(), f"{directory_prefix}*-*")):
+        pid = os.path.basename(path)[len(directory_prefix):].split("-")[0]
+        if pid.isdigit() and int(pid) != os.getpid() and not _process_exists(int(pid)):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+@atexit.register
+def _remove_directories():
+    for directory in list(_directories):
+        shutil.rmtree(directory, ignore_errors=True)
+    _directories.clear()
+
+
+def load_shared_array(path) -> "SharedArray":
+    """Map a shared array read-only, reusing an existing mapping of the current process"""
+    array = _mapped.get(path)
+    if array is None:
+        array = np.load(path, mmap_mode="r").view(SharedArray)
+        array.shared_path = path
+        _mapped[path] = array
+    return array
+
+
+class SharedArray(np.memmap):
+    """A read-only memory-mapped array that is pickled and deep-copied by reference to its file
+
+    Only the whole array is shared by reference, arrays derived from it e.g. by slicing are pickled by value.
+    """
+
+    def __array_finalize__(self, obj):
+        super().__array_finalize__(obj)
+        self.shared_path = None
+
+    def __reduce__(self):
+        if self.shared_path is None:
+            return np.asarray(self).__reduce__()
+        return (load_shared_array, (self.shared_path,))
+
+    def __deepcopy__(self, memo):
+        if self.shared_path is None:
+            return np.array(self)
+        return self
+
+
+def share_array(array: np.ndarray, directory) -> SharedArray:
+    path = os.path.join(directory, f"{uuid.uuid4().hex}.npy")
+    np.save(path, array)
+    return load_shared_array(path)
+
+
+def share_value(value, directory, shared: dict, min_bytes=min_bytes):
+    """A copy of a value with large arrays replaced by shared arrays, or the value itself if it has none
+
+    Args:
+        shared (dict): Arrays already shared, by id, so that an array referenced by multiple values is shared once
+    """
+    if isinstance(value, np.ndarray):
+        if isinstance(value, np.memmap) or value.dtype == object or value.nbytes < min_bytes:
+            return value
+        if id(value) not in shared:
+            # Keep a reference to the original array, so that its id is not reused
+            shared[id(value)] = (value, share_array(value, directory))
+        return shared[id(value)][1]
+
+    if isinstance(value, types.FunctionType):
+        if not value.__closure__:
+            return value
+        cells = [cell.cell_contents for cell in value.__closure__]
+        shared_cells = [share_value(contents, directory, shared, min_bytes) for contents in cells]
+        if all(shared_cell is cell for (shared_cell, cell) in zip(shared_cells, cells)):
+            return value
+        function = types.FunctionType(
+            value.__code__,
+            value.__globals__,
+            value.__name__,
+            value.__defaults__,
+            tuple(types.CellType(contents) for contents in shared_cells),
+        )
+        function.__kwdefaults__ = value.__kwdefaults__
+        function.__qualname__ = value.__qualname__
+        function.__module__ = value.__module__
+        function.__dict__.update(value.__dict__)
+        return function
+
+    if isinstance(value, (list, tuple)):
+        items = [share_value(item, directory, shared, min_bytes) for item in value]
+        if all(shared_item is item for (shared_item, item) in zip(items, value)):
+            return value
+        return type(value)(items)
+
+    if isinstance(value, dict):
+        items = {key: share_value(item, directory, shared, min_bytes) for (key, item) in value.items()}
+        if all(items[key] is item for (key, item) in value.items()):
+            return value
+        return items
+
+    if hasattr(value, "__dict__") and not isinstance(value, (type, types.ModuleType)):
+        attributes = {key: share_value(item, directory, shared, min_bytes) for (key, item) in vars(value).items()}
+        if all(attributes[key] is item for (key, item) in vars(value).items()):
+            return value
+        value = copy.copy(value)
+        value.__dict__.update(attributes)
+        return value
+
+    return value
+
+
+@contextlib.contextmanager
+def shared_parameters(executable, min_bytes=min_bytes):
+    """Replace large arrays referenced by the System Parameters of an experiment or simulation with shared arrays
+
+    The original System Parameters are restored, and the shared arrays removed, when the context exits.
+    Workers that still map a removed array keep their mapping until it is no longer referenced.
+    """
+    simulations = getattr(executable, "simulations", [executable])
+    original_params = [simulation.model.params for simulation in simulations]
+    remove_stale_directories()
+    directory = tempfile.mkdtemp(prefix=f"{directory_prefix}{os.getpid()}-", dir=shared_directory())
+    _directories.add(directory)
+    shared = {}
+    try:
+        for simulation in simulations:
+            simulation.model.params = {
+                key: share_value(values, directory, shared, min_bytes)
+                for (key, values) in simulation.model.params.items()
+            }
+        yield shared
+    finally:
+        for (simulation, params) in zip(simulations, original_params):
+            simulation.model.params = params
+        shutil.rmtree(directory, ignore_errors=True)
+        _directories.discard(directory)
+
+
+class SharedMemoryEngine(Engine):
+    """A radCAD Engine that shares large arrays referenced by the System Parameters with parallel workers
+
+    Accepts the same options as the radCAD Engine, and the following additional option:
+
+    Args:
+        **min_bytes (int): Size of the smallest array that is shared, smaller arrays are pickled into each task
+    """
+
+    def __init__(self, **kwargs):
+        self.min_bytes = kwargs.pop("min_bytes", min_bytes)
+        super().__init__(**kwargs)
+
+    def _run(self, executable=None, **kwargs):
+        if executable is None or self.backend is Backend.SINGLE_PROCESS:
+            return super()._run(executable=executable, **kwargs)
+
+        with shared_parameters(executable, self.min_bytes):
+            results = super()._run(executable=executable, **kwargs)
+
+        # Exceptions refer to the System Parameters of each run, which should not refer to the removed shared arrays
+        simulations = getattr(executable, "simulations", [executable])
+        param_sweeps = [
+            generate_parameter_sweep(simulation.model.params) or [simulation.model.params] for simulation in simulations
+        ]
+        for exception in executable.exceptions:
+            if isinstance(exception, dict) and exception.get("parameters") is not None:
+                exception["parameters"] = param_sweeps[exception["simulation"]][exception["subset"]]
+        return results
@@ -2,6 +2,8 @@
 Simulation configuration such as the number of timesteps and Monte Carlo runs
 """
 
+from radcad import Backend
+
 from model.constants import epochs_per_month, epochs_per_day
 
 
@@ -11,3 +13,5 @@ TIMESTEPS = int(
     epochs_per_day * SIMULATION_TIME_DAYS // DELTA_TIME
 )  # number of simulation timesteps
 MONTE_CARLO_RUNS = 1  # number of runs
+MASTER_SEED = 1  # master seed of all random number streams, see model.random_streams
+BACKEND = Backend.SINGLE_PROCESS  # radCAD execution backend, parallel backends share large parameter arrays, see experiments.shared_memory
@@ -0,0 +1,329 @@
+"""
+# Streaming Results Engine
+
+An alternative to the radCAD engine that streams results into a columnar sink as the simulation runs,
+rather than accumulating a list of State Variable dicts for every timestep and converting it into a DataFrame.
+
+Each state is appended to per-column buffers, which are converted into a typed DataFrame chunk when full,
+and optionally written to a Parquet dataset partitioned by simulation, subset and run, so large sweeps run in bounded memory:
+
+    simulation.engine = StreamingEngine(directory="results/sweep", drop_substeps=True)
+    df, exceptions = run(simulation)
+
+The runs are executed sequentially in the current process with the same semantics, hooks, and row order
+as the radCAD engine, except that Policies and State Update Functions receive a bounded `state_history`,
+see `StreamingEngine`.
+"""
+
+import os
+import enum
+import shutil
+import pickle
+import logging
+import traceback
+import pandas as pd
+from functools import partial
+from radcad import Engine, Experiment
+from radcad.core import reduce_signals, _update_state
+
+from experiments.recording import Recorder, sparsify
+from experiments.aggregation import AggregatingSink
+
+
+class ColumnarSink:
+    """Collects states into column buffers, flushed into typed DataFrame chunks or Parquet files when full
+
+    Each simulation is written to its own `simulation=<index>` subdirectory of the dataset, and other subdirectories
+    are left untouched, so results of other simulations can be written to the same dataset.
+
+    Args:
+        directory (str, optional): Root of a Parquet dataset partitioned by simulation, subset and run,
+            otherwise chunks are kept in memory
+        buffer_rows (int): Number of rows buffered before flushing
+        drop_columns (Iterable[str]): Columns that are not collected, such as the `agents` population
+        overwrite (bool): Whether to replace the existing results of a simulation in the dataset,
+            otherwise writing a simulation that already has results raises an exception
+    """
+
+    partition_cols = ["simulation", "subset", "run"]
+
+    def __init__(self, directory=None, buffer_rows=65_536, drop_columns=("agents",), overwrite=False):
+        self.directory = directory
+        self.buffer_rows = buffer_rows
+        self.drop_columns = set(drop_columns)
+        self.overwrite = overwrite
+        self.columns = None
+        self.buffers = None
+        self.rows = 0
+        self.chunks = []
+        self.simulations = []
+        self._enum_types = {}
+
+    def append(self, state: dict):
+        if self.columns is None:
+            self.columns = [key for key in state if key not in self.drop_columns]
+            self.buffers = {key: [] for key in self.columns}
+        for key in self.columns:
+            self.buffers[key].append(state[key])
+        self.rows += 1
+        if self.rows >= self.buffer_rows:
+            self.flush()
+
+    def extend(self, df: pd.DataFrame):
+        """Collect the rows of a DataFrame, such as results that were not streamed"""
+        self.flush()
+        df = df.drop(columns=[key for key in df.columns if key in self.drop_columns])
+        if self.columns is None:
+            self.columns = list(df.columns)
+            self.buffers = {key: [] for key in self.columns}
+        self._write(df[self.columns].copy())
+
+    def flush(self):
+        """Convert the buffered rows into a typed DataFrame chunk, and write it to the Parquet dataset if configured"""
+        if not self.rows:
+            return
+        df = pd.DataFrame(self.buffers, columns=self.columns)
+        self.buffers = {key: [] for key in self.columns}
+        self.rows = 0
+        self._write(df)
+
+    def prepare(self, simulations):
+        """Check that the simulations have no results in the dataset, or remove them if overwriting"""
+        if self.directory is None:
+            return
+        for simulation in simulations:
+            if simulation in self.simulations:
+                continue
+            path = self._simulation_directory(simulation)
+            if os.path.exists(path):
+                if not self.overwrite:
+                    raise Exception(f"Results of simulation {simulation} already exist in {path}, use overwrite=True to replace them")
+                shutil.rmtree(path)
+            self.simulations.append(simulation)
+
+    def _simulation_directory(self, simulation) -> str:
+        return os.path.join(self.directory, f"simulation={simulation}")
+
+    def _write(self, df: pd.DataFrame):
+        if self.directory is None:
+            self.chunks.append(df)
+            return
+
+        self.prepare(df["simulation"].unique())
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Parquet can't store Python objects such as Enums, so they are stored by name and restored on read
+        for key in df.columns[df.dtypes == object]:
+            values = df[key].dropna()
+            if len(values) and isinstance(values.iloc[0], enum.Enum):
+                self._enum_types[key] = type(values.iloc[0])
+                df[key] = df[key].map(lambda value: value.name if isinstance(value, enum.Enum) else value)
+
+        pq.write_to_dataset(
+            pa.Table.from_pandas(df, preserve_index=False),
+            root_path=self.directory,
+            partition_cols=self.partition_cols,
+        )
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Get all collected rows as a DataFrame, in the order they were appended"""
+        self.flush()
+        if self.directory is None:
+            if not self.chunks:
+                return pd.DataFrame()
+            return pd.concat(self.chunks, ignore_index=True)
+
+        # Only the simulations written by this sink are read, not other results in the same dataset
+        simulations = [
+            simulation for simulation in self.simulations if os.path.exists(self._simulation_directory(simulation))
+        ]
+        if not simulations:
+            return pd.DataFrame()
+
+        import pyarrow.parquet as pq
+
+        df = pd.concat(
+            [
+                pq.read_table(self._simulation_directory(simulation)).to_pandas().assign(simulation=simulation)
+                for simulation in simulations
+            ],
+            ignore_index=True,
+        )
+        for key in self.partition_cols:
+            df[key] = df[key].astype(int)
+        for (key, enum_type) in self._enum_types.items():
+            df[key] = df[key].map(lambda name: enum_type[name] if isinstance(name, str) else name)
+
+        # Restore radCAD row order, as partitions are read back in directory order
+        df = df.sort_values(["simulation", "run", "subset", "timestep", "substep"], kind="stable")
+        return df[self.columns].reset_index(drop=True)
+
+
+class StreamingEngine(Engine):
+    """A radCAD Engine replacement that streams results into a `ColumnarSink`
+
+    Accepts the same options as the radCAD Engine, with runs executed sequentially in the current process
+    whichever backend is selected, and the following additional options:
+
+    Args:
+        **directory (str, optional): Root of a Parquet dataset to write results to, see `ColumnarSink`
+        **overwrite (bool): Whether to replace existing results of the same simulations in the dataset, see `ColumnarSink`
+        **buffer_rows (int): Number of rows buffered before flushing, see `ColumnarSink`
+        **history (int, optional): Number of previous timesteps kept in the `state_history`,
+            in addition to the initial state. Defaults to 1, or None to keep the full history like radCAD.
+        **recording (RecordingPolicy, optional): Which State Variables and timesteps are recorded,
+            see `experiments.recording`. Defaults to recording every State Variable at every timestep.
+        **aggregation (OnlineAggregation, optional): Fold each run into per-(subset, timestep) statistics,
+            see `experiments.aggregation`, returning a summary frame instead of every row of every run.
+            The exceptions of successful runs then don't keep their parameters and initial state.
+    """
+
+    def __init__(self, **kwargs):
+        self.directory = kwargs.pop("directory", None)
+        self.overwrite = kwargs.pop("overwrite", False)
+        self.buffer_rows = kwargs.pop("buffer_rows", 65_536)
+        self.history = kwargs.pop("history", 1)
+        self.recording = kwargs.pop("recording", None)
+        self.aggregation = kwargs.pop("aggregation", None)
+        super().__init__(**kwargs)
+
+    def _run(self, executable=None, **kwargs):
+        if not executable:
+            raise Exception("Experiment or simulation required as Executable argument")
+        self.executable = executable
+
+        if kwargs:
+            raise Exception(f"Invalid Engine option in {kwargs}")
+
+        experiment = executable if isinstance(executable, Experiment) else None
+        simulations = executable.simulations if experiment else [executable]
+        configs = [
+            (
+                simulation.model.initial_state,
+                simulation.model.state_update_blocks,
+                simulation.model.params,
+                simulation.timesteps,
+                simulation.runs,
+            )
+            for simulation in simulations
+        ]
+
+        if self.aggregation is not None:
+            sink = AggregatingSink(self.aggregation)
+        else:
+            sink = ColumnarSink(directory=self.directory, buffer_rows=self.buffer_rows, overwrite=self.overwrite)
+            # Fail before running, rather than when the first results are written
+            sink.prepare(range(len(simulations)))
+        recorder = Recorder(self.recording) if self.recording else None
+        exceptions = []
+
+        executable._before_experiment(experiment=experiment)
+        # Reuse the radCAD run generator, which calls the simulation, run and subset hooks
+        for run_args in self._run_stream(configs):
+            try:
+                stream_run(sink, *tuple(run_args), history=self.history, recorder=recorder)
+                exception, trace = None, None
+                # With aggregation, memory should not grow with the number of runs
+                keep_arguments = self.aggregation is None
+            except Exception as error:
+                if self.raise_exceptions:
+                    raise error
+                exception, trace = error, traceback.format_exc()
+                keep_arguments = True
+                logging.warning(
+                    f"Simulation {run_args.simulation} / run {run_args.run} / subset {run_args.subset} failed! Returning partial results."
+                )
+            exceptions.append({
+                "exception": exception,
+                "traceback": trace,
+                "simulation": run_args.simulation,
+                "run": run_args.run,
+                "subset": run_args.subset,
+                "timesteps": run_args.timesteps,
+                "parameters": run_args.parameters if keep_arguments else None,
+                "initial_state": run_args.initial_state if keep_arguments else None,
+            })
+
+        executable.results = sink.to_dataframe()
+        if self.recording and self.aggregation is None:
+            sparsify(executable.results, self.recording.on_change)
+        executable.exceptions = exceptions
+        executable._after_experiment(experiment=experiment)
+
+        return executable.results
+
+
+def stream_run(
+    sink: ColumnarSink,
+    simulation: int,
+    timesteps: int,
+    run: int,
+    subset: int,
+    initial_state: dict,
+    state_update_blocks: list,
+    params: dict,
+    deepcopy: bool,
+    drop_substeps: bool,
+    history=1,
+    recorder: Recorder = None,
+):
+    """Execute a single run of a parameter subset like `radcad.core._single_run(...)`, appending each state to the sink
+
+    If a recorder is given, only the states and State Variables selected by its recording policy are appended.
+    """
+    def append(state):
+        if recorder is None:
+            sink.append(state)
+            return
+        recorded = recorder.record(state, final_timestep=timesteps)
+        if recorded is not None:
+            sink.append(recorded)
+
+    logging.info(f"Starting simulation {simulation} / run {run} / subset {subset}")
+
+    initial_state["simulation"] = simulation
+    initial_state["subset"] = subset
+    initial_state["run"] = run + 1
+    initial_state["substep"] = 0
+    if not initial_state.get("timestep", False):
+        initial_state["timestep"] = 0
+
+    # The state history passed to Policies and State Update Functions, bounded to the initial state and latest timesteps
+    result = [[initial_state]]
+    append(initial_state)
+
+    for timestep in range(0, timesteps):
+        previous_state: dict = result[-1][-1].copy()
+
+        substeps: list = []
+        substate: dict = previous_state.copy()
+
+        for (substep, psu) in enumerate(state_update_blocks):
+            substate: dict = (
+                previous_state.copy() if substep == 0 else substeps[substep - 1].copy()
+            )
+            substate_copy = pickle.loads(pickle.dumps(substate, -1)) if deepcopy else substate.copy()
+            substate["substep"] = substep + 1
+
+            signals: dict = reduce_signals(
+                params, substep, result, substate_copy, psu, deepcopy
+            )
+
+            updated_state = map(
+                partial(_update_state, initial_state, params, substep, result, substate_copy, signals),
+                psu["variables"].items()
+            )
+            substate.update(updated_state)
+            substate["timestep"] = (previous_state["timestep"] + 1) if timestep == 0 else timestep + 1
+            substeps.append(substate)
+
+        substeps = [substate] if not substeps else substeps
+        substeps = substeps if not drop_substeps else [substeps[-1]]
+        for state in substeps:
+            append(state)
+
+        result.append(substeps)
+        if history is not None and len(result) > history + 1:
+            del result[1]
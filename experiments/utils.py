@@ -1,33 +1,32 @@
+import os
+import enum
+import glob
+import hashlib
+import datetime
+import functools
 import itertools
 import types as types
-import collections
 import inspect
 import numpy as np
 
+from model.random_streams import random_streams
+
 from IPython.display import Code
 from pygments.formatters import HtmlFormatter
 from IPython.core.display import HTML
 
 
-def rng_generator(master_seed=1):
-    """Generate a sequence of Numpy RNG seeds
-
-    This method can be initialized using a master seed with `rng_generator(123)`.
-    If it isn't initialized, the first call to `rng_generator()`
-    will both initialize the seed sequence and return an RNG with the first seed of the sequence.
+def rng_generator(*key):
+    """Create a Numpy RNG for a deterministic random number stream
 
-    Every time the method is called without arguments, it generates a new seed with a reproducible sequence.
+    The stream is derived from the master seed and the key, e.g. `rng_generator("eth_price_samples")`,
+    independently of the order RNGs are created in or the process they are created in,
+    see `model.random_streams.RandomStreams`.
 
     This is useful, for example, if you wanted to have a number of stochastic processes
-    with unique seeds across different runs, but reproducible results across simulations.
+    with unique seeds, and reproducible results across simulations and radCAD backends.
     """
-    global seed_sequence
-    if 'seed_sequence' not in globals():
-        rng = np.random.default_rng(master_seed)
-        seed_sequence = rng.bit_generator._seed_seq
-        return np.random.default_rng(seed_sequence.spawn(1)[0])
-    else:
-        return np.random.default_rng(seed_sequence.spawn(1)[0])
+    return random_streams.generator(*key)
 
 
 def generate_cartesian_product(sweeps):
@@ -44,28 +43,169 @@ def generate_cartesian_product(sweeps):
     return params
 
 
-def get_simulation_hash(sim):
-    # Get inputs for hash function
-    model = sim.model
-    timesteps = sim.timesteps
-    runs = sim.runs
+# `object.__getstate__` only exists from Python 3.11, before which only classes with custom pickled state define it
+_object_getstate = getattr(object, "__getstate__", None)
 
-    # Filter out unhashable types
-    initial_state = filter(lambda x: isinstance(x, collections.Hashable), model.initial_state.items())
-    # Create a hashable frozen set from dictionary
-    initial_state = frozenset({key: value for key, value in initial_state})
 
-    param_keys = tuple(model.params.keys())
-    param_values = [value for param_list in model.params.values() for value in param_list]
-    # Convert unhashable types to code
-    param_values = [value.__code__ if isinstance(value, types.FunctionType) else None for value in param_values]
-    # Filter out unhashable types
-    param_values = tuple(filter(lambda x: isinstance(x, collections.Hashable), param_values))
+def _update_hash(hasher, value, seen):
+    """Update a hash with a stable encoding of a value, recursing into containers, objects and functions"""
 
-    # Create tuple of all hash inputs
-    to_hash = (initial_state, param_keys, param_values, timesteps, runs)
+    def update(*parts):
+        for part in parts:
+            hasher.update(part if isinstance(part, bytes) else repr(part).encode())
+            hasher.update(b"|")
 
-    return hash(to_hash)
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        update(type(value).__name__, value)
+    elif isinstance(value, enum.Enum):
+        update(type(value).__qualname__, value.name)
+    elif isinstance(value, (datetime.datetime, datetime.date, datetime.timedelta, np.generic)):
+        update(type(value).__name__, str(value))
+    elif isinstance(value, types.ModuleType):
+        # Module source is covered by the model source hash
+        update("module", value.__name__)
+    elif id(value) in seen:
+        update("cycle")
+    else:
+        # Keep a reference, so that the id of a temporary value is not reused
+        seen[id(value)] = value
+        if isinstance(value, np.ndarray):
+            update("ndarray", value.dtype.str, value.shape)
+            hasher.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else b"")
+            if value.dtype == object:
+                for item in value.flat:
+                    _update_hash(hasher, item, seen)
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            items = sorted(value, key=repr) if isinstance(value, (set, frozenset)) else value
+            update(type(value).__name__, len(items))
+            for item in items:
+                _update_hash(hasher, item, seen)
+        elif isinstance(value, dict):
+            update("dict", len(value))
+            for key in sorted(value, key=repr):
+                _update_hash(hasher, key, seen)
+                _update_hash(hasher, value[key], seen)
+        elif isinstance(value, functools.partial):
+            update("partial")
+            _update_hash(hasher, (value.func, value.args, value.keywords), seen)
+        elif isinstance(value, types.CodeType):
+            update("code", value.co_name, value.co_code, value.co_names, value.co_varnames)
+            _update_hash(hasher, value.co_consts, seen)
+        elif isinstance(value, types.FunctionType):
+            update("function", value.__module__, value.__qualname__)
+            closure = [cell.cell_contents for cell in value.__closure__ or []]
+            # Globals referenced by the function, e.g. samples captured from a notebook
+            global_names = [name for name in value.__code__.co_names if name in value.__globals__]
+            referenced_globals = {name: value.__globals__[name] for name in global_names}
+            _update_hash(hasher, (value.__code__, value.__defaults__, value.__kwdefaults__, closure, referenced_globals), seen)
+        elif isinstance(value, types.MethodType):
+            # Bound methods hash their function and the instance they are bound to, e.g. two policies of one object
+            update("method")
+            _update_hash(hasher, (value.__func__, value.__self__), seen)
+        elif isinstance(value, types.BuiltinMethodType) and not isinstance(value.__self__, (types.ModuleType, type(None))):
+            # Bound methods of builtin types, e.g. `rng.normal`, depend on the instance they are bound to
+            update("builtin_method", value.__qualname__)
+            _update_hash(hasher, value.__self__, seen)
+        elif isinstance(value, (types.BuiltinFunctionType, type)):
+            update("qualname", getattr(value, "__module__", None), value.__qualname__)
+        elif getattr(type(value), "__getstate__", _object_getstate) is not _object_getstate:
+            # Objects that define their own pickled state, e.g. RNGs or memory-mapped processes
+            update("object", type(value).__qualname__)
+            _update_hash(hasher, value.__getstate__(), seen)
+        elif hasattr(value, "__dict__"):
+            update("object", type(value).__qualname__)
+            _update_hash(hasher, vars(value), seen)
+        else:
+            update("object", type(value).__qualname__, value)
+
+
+def stable_hash(*values) -> str:
+    """A content hash of values that is stable across processes and Python sessions, unlike `hash(...)`"""
+    hasher = hashlib.sha256()
+    _update_hash(hasher, values, {})
+    return hasher.hexdigest()
+
+
+# Source code and bundled datasets the results depend on, as (directory, file patterns)
+source_files = [
+    (os.path.join(os.path.dirname(__file__), "..", "model"), ["*.py"]),
+    (os.path.join(os.path.dirname(__file__), "..", "experiments"), ["*.py"]),
+    (os.path.join(os.path.dirname(__file__), "..", "data"), ["*.py", "*.csv", "*.zip", "*.json"]),
+]
+
+
+@functools.lru_cache(maxsize=None)
+def _file_hash(path, mtime_ns, size) -> str:
+    # Keyed by modification time and size, so that each file is only read again when it changes
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def get_source_hash(source_files=source_files) -> str:
+    """A hash of the model, experiments and data source code and datasets,
+    so that results are invalidated when any module or dataset changes
+    """
+    hasher = hashlib.sha256()
+    for (directory, patterns) in source_files:
+        paths = {
+            path
+            for pattern in patterns
+            for path in glob.glob(os.path.join(directory, "**", pattern), recursive=True)
+        }
+        for path in sorted(paths):
+            stat = os.stat(path)
+            hasher.update(os.path.relpath(path, os.path.join(directory, "..")).encode())
+            hasher.update(_file_hash(path, stat.st_mtime_ns, stat.st_size).encode())
+    return hasher.hexdigest()
+
+
+def get_simulation_hash(sim):
+    """A stable content hash of a simulation's model code, State Update Blocks, System Parameters, initial state, timesteps and runs"""
+    model = sim.model
+    return stable_hash(
+        get_source_hash(),
+        model.state_update_blocks,
+        model.params,
+        model.initial_state,
+        sim.timesteps,
+        sim.runs,
+    )
+
+
+# Engine options that change the results, of the radCAD Engine and the engines in `experiments`
+# e.g. the recording policy of `experiments.streaming.StreamingEngine`, but not options such as the backend
+result_engine_options = ["drop_substeps", "deepcopy", "history", "recording", "aggregation", "run_offset"]
+
+
+def get_engine_options(engine) -> dict:
+    """The options of an engine that change the results, see `result_engine_options`"""
+    return {option: getattr(engine, option) for option in result_engine_options if hasattr(engine, option)}
+
+
+def get_executable_hash(executable):
+    """A stable content hash of an experiment or simulation, including the engine options that change the results"""
+    simulations = getattr(executable, "simulations", [executable])
+    engine = executable.engine
+    return stable_hash(
+        [get_simulation_hash(simulation) for simulation in simulations],
+        type(engine).__qualname__,
+        get_engine_options(engine),
+    )
+
+
+def get_subset_hash(simulation, param_set, engine):
+    """A stable content hash of a single parameter subset of a simulation, for all of its runs"""
+    model = simulation.model
+    return stable_hash(
+        get_source_hash(),
+        model.state_update_blocks,
+        param_set,
+        model.initial_state,
+        simulation.timesteps,
+        simulation.runs,
+        type(engine).__qualname__,
+        get_engine_options(engine),
+    )
 
 
 def display_code(code):
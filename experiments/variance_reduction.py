@@ -0,0 +1,107 @@
+"""
+Effective sample size of variance reduction techniques
+
+With common random numbers, the runs of each parameter subset share their environmental processes,
+so the difference between two subsets is estimated from paired runs. With antithetic variates,
+consecutive runs (1 and 2, 3 and 4, ...) are driven by negated random numbers, see `model.stochastic_processes`.
+
+The effective sample size (ESS) is the number of independent runs that would give the same standard error,
+so `ess / runs` is the factor of compute saved:
+
+    df, exceptions = run(simulation)
+    report = variance_reduction_report(df, final_lbp_y_usd_price, simulation.model.params, antithetic=True)
+"""
+
+import typing
+import numpy as np
+import pandas as pd
+from radcad.core import generate_parameter_sweep
+
+
+def _pair_means(values: np.ndarray) -> np.ndarray:
+    # Average each antithetic pair of runs, dropping an unpaired final run
+    pairs = len(values) // 2
+    return values[:2 * pairs].reshape(pairs, 2).mean(axis=1)
+
+
+def standard_error(values, baseline=None, antithetic=False) -> float:
+    """The standard error of the mean of the values, or of their mean difference to paired baseline values"""
+    values = np.asarray(values, dtype=np.float64)
+    if baseline is not None:
+        values = values - np.asarray(baseline, dtype=np.float64)
+    if antithetic:
+        values = _pair_means(values)
+    if len(values) < 2:
+        return np.nan
+    return np.std(values, ddof=1) / np.sqrt(len(values))
+
+
+def effective_sample_size(values, baseline=None, antithetic=False) -> float:
+    """The number of independent runs without variance reduction that would give the same standard error
+
+    Args:
+        values (np.ndarray): Metric of each run, in run order
+        baseline (np.ndarray, optional): Metric of each run of a baseline subset, when estimating the mean difference
+            with common random numbers
+        antithetic (bool): Whether consecutive runs are antithetic pairs
+    """
+    values = np.asarray(values, dtype=np.float64)
+    # The variance per run of independent sampling, where the baseline runs would be independent of the values
+    variance = np.var(values, ddof=1)
+    if baseline is not None:
+        variance += np.var(np.asarray(baseline, dtype=np.float64), ddof=1)
+    error = standard_error(values, baseline, antithetic)
+    if error == 0:
+        return np.inf
+    return variance / error**2
+
+
+def run_metrics(
+    df: pd.DataFrame, metric: typing.Callable[[pd.DataFrame, dict], float], parameters: dict
+) -> pd.DataFrame:
+    """The metric of each run, with a row per run and a column per subset
+
+    The metric is calculated from the results of a single run, and the parameter subset of the run,
+    e.g. `experiments.adaptive.final_lbp_y_usd_price`.
+    """
+    param_sweep = generate_parameter_sweep(parameters) or [parameters]
+    values = {
+        (subset, run): metric(run_df, param_sweep[subset])
+        for ((subset, run), run_df) in df.groupby(["subset", "run"], sort=True)
+    }
+    return pd.Series(values).unstack(level=0).rename_axis(index="run", columns="subset")
+
+
+def variance_reduction_report(
+    df: pd.DataFrame,
+    metric: typing.Callable[[pd.DataFrame, dict], float],
+    parameters: dict,
+    baseline_subset=0,
+    antithetic=False,
+) -> pd.DataFrame:
+    """Report the mean of a metric per subset, and its difference to a baseline subset, with standard errors and ESS"""
+    values = run_metrics(df, metric, parameters)
+    baseline = values[baseline_subset].to_numpy()
+    rows = []
+    for subset in values.columns:
+        subset_values = values[subset].to_numpy()
+        row = {
+            "subset": subset,
+            "runs": len(subset_values),
+            "mean": subset_values.mean(),
+            "standard_error": standard_error(subset_values, antithetic=antithetic),
+            "ess": effective_sample_size(subset_values, antithetic=antithetic),
+        }
+        if subset != baseline_subset:
+            row.update({
+                "difference": subset_values.mean() - baseline.mean(),
+                "difference_standard_error": standard_error(subset_values, baseline, antithetic),
+                "difference_ess": effective_sample_size(subset_values, baseline, antithetic),
+            })
+        rows.append(row)
+    report = pd.DataFrame(rows).set_index("subset")
+    # The factor of compute saved relative to independent runs
+    report["speedup"] = report["ess"] / report["runs"]
+    if "difference_ess" in report:
+        report["difference_speedup"] = report["difference_ess"] / report["runs"]
+    return report
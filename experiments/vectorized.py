@@ -0,0 +1,256 @@
+"""
+# Vectorized LBP Engine
+
+An alternative to the radCAD engine for the LBP model.
+
+Rather than dispatching every Policy and State Update Function once per substep over Python dicts,
+the LBP weight schedule, supplies and prices are evaluated as NumPy arrays of shape
+(runs, timesteps + 1) for each parameter subset of a Simulation.
+
+The engine is selected per experiment by replacing the radCAD engine:
+
+    simulation.engine = VectorizedEngine()
+    df, exceptions = run(simulation)
+
+The resulting DataFrame has the same columns and row order as the one produced by `experiments.run.run()`
+using the radCAD engine with `drop_substeps=True`, see `check_parity(...)` to cross-check both engines.
+"""
+
+import copy
+import numpy as np
+import pandas as pd
+from radcad import Engine, Experiment, Backend
+from radcad.core import generate_parameter_sweep
+
+from model.types import Stage
+from model.parts.automated_market_maker import WeightedPool, no_orders
+from model.parts.agent_system import no_agents
+from model.weight_schedules import weight_schedule, lookup_weight
+from model.stage_schedules import get_stage_schedule
+from experiments.post_processing import post_process
+
+
+# State Variables the vectorized engine knows how to evaluate
+SUPPORTED_STATE_VARIABLES = {
+    "stage",
+    "timestamp",
+    "eth_price",
+    "weight_x",
+    "lbp_supply_x",
+    "lbp_supply_y",
+    "lbp_price_x_in_y",
+    "lbp_price_y_in_x",
+    "lbp_y_usd_price",
+    "agents",
+}
+
+
+class VectorizedEngine(Engine):
+    """A radCAD Engine replacement that evaluates the LBP model as NumPy arrays
+
+    Accepts the same options as the radCAD Engine, although only the final substep of each timestep is emitted,
+    i.e. the results are equivalent to those of the radCAD Engine with `drop_substeps=True`.
+    """
+
+    def _run(self, executable=None, **kwargs):
+        if not executable:
+            raise Exception("Experiment or simulation required as Executable argument")
+        self.executable = executable
+
+        if kwargs:
+            raise Exception(f"Invalid Engine option in {kwargs}")
+
+        experiment = executable if isinstance(executable, Experiment) else None
+        simulations = executable.simulations if experiment else [executable]
+
+        executable._before_experiment(experiment=experiment)
+        executable.results = pd.concat(
+            [
+                simulate(simulation, simulation_index)
+                for simulation_index, simulation in enumerate(simulations)
+            ],
+            ignore_index=True,
+        )
+        executable.exceptions = []
+        executable._after_experiment(experiment=experiment)
+
+        return executable.results
+
+
+def simulate(simulation, simulation_index=0) -> pd.DataFrame:
+    """Evaluate all runs and parameter subsets of a radCAD Simulation
+
+    Returns a DataFrame in radCAD row order, i.e. ordered by run, then subset, then timestep.
+    """
+    initial_state = simulation.model.initial_state
+    unsupported_state_variables = set(initial_state) - SUPPORTED_STATE_VARIABLES
+    if unsupported_state_variables:
+        raise Exception(
+            f"Vectorized engine does not support State Variables {sorted(unsupported_state_variables)}"
+        )
+
+    timesteps = simulation.timesteps
+    runs = simulation.runs
+    param_sweep = generate_parameter_sweep(simulation.model.params)
+    subsets = len(param_sweep)
+
+    # Each subset evaluates to arrays of shape (runs, timesteps + 1),
+    # stacked and transposed to radCAD order of shape (runs, subsets, timesteps + 1)
+    subset_results = [
+        simulate_subset(params, initial_state, timesteps, runs) for params in param_sweep
+    ]
+    shape = (runs, subsets, timesteps + 1)
+    columns = {
+        key: np.stack([result[key] for result in subset_results], axis=1).reshape(-1)
+        for key in initial_state
+    }
+
+    substeps = np.full(timesteps + 1, len(simulation.model.state_update_blocks))
+    substeps[0] = 0
+    columns.update({
+        "simulation": np.full(np.prod(shape), simulation_index),
+        "subset": np.broadcast_to(np.arange(subsets)[None, :, None], shape).reshape(-1),
+        "run": np.broadcast_to(np.arange(1, runs + 1)[:, None, None], shape).reshape(-1),
+        "substep": np.broadcast_to(substeps, shape).reshape(-1),
+        "timestep": np.broadcast_to(np.arange(timesteps + 1), shape).reshape(-1),
+    })
+
+    return pd.DataFrame(columns)
+
+
+def simulate_subset(params, initial_state, timesteps, runs) -> dict:
+    """Evaluate the LBP model State Variables for all runs of a single parameter subset
+
+    Mirrors the State Update Blocks in `model.state_update_blocks`, where State Variables that
+    only depend on System Parameters are evaluated once per subset and broadcast across runs.
+    """
+    shape = (runs, timesteps + 1)
+
+    # Parameters
+    dt = params["dt"]
+    eth_price_process = params["eth_price_process"]
+    weight_x_start = params["weight_x_start"]
+    weight_x_end = params["weight_x_end"]
+    lbp_length = params["lbp_length"]
+    weight_curve = params["weight_curve"]
+    lbp_initial_x = params["lbp_initial_x"]
+    lbp_initial_y = params["lbp_initial_y"]
+
+    if params["lbp_order_process"] is not no_orders or params["agent_population_process"] is not no_agents:
+        raise Exception(
+            "Vectorized engine does not simulate swaps, use the radCAD engine with an `lbp_order_process` or agents"
+        )
+
+    # Ethereum system: the ETH price is sampled at the start of each timestep
+    eth_price = np.empty(shape)
+    eth_price[:, 0] = initial_state["eth_price"]
+    eth_price[:, 1:] = evaluate_process(eth_price_process, runs, timesteps, dt)
+
+    # Stages: the timestamp and stage are looked up after the first substep, i.e. from the updated timestep
+    stage_schedule = get_stage_schedule(params)
+    stage_schedule.ensure(timesteps)
+    stages = stage_schedule.stages[:timesteps + 1].copy()
+    stages[0] = initial_state["stage"]
+    timestamps = stage_schedule.timestamps[:timesteps + 1].copy()
+    timestamps[0] = np.datetime64("NaT") if initial_state["timestamp"] is None else initial_state["timestamp"]
+
+    # LBP system: outside of the LBP stage, the LBP State Variables are held constant,
+    # so each timestep takes the values of the latest timestep in the LBP stage, if any
+    lbp = np.r_[False, stages[1:] == Stage.LBP]
+    latest_lbp = np.maximum.accumulate(np.where(lbp, np.arange(timesteps + 1), 0))
+    started = latest_lbp > 0
+
+    weight_x = np.full(timesteps + 1, _float_or_nan(initial_state["weight_x"]))
+    lbp_supply_x = np.full(timesteps + 1, initial_state["lbp_supply_x"])
+    lbp_supply_y = np.full(timesteps + 1, initial_state["lbp_supply_y"])
+    lbp_price_y_in_x = np.full(shape, initial_state["lbp_price_y_in_x"], dtype=float)
+    lbp_price_x_in_y = np.full(shape, initial_state["lbp_price_x_in_y"], dtype=float)
+    lbp_y_usd_price = np.full(shape, initial_state["lbp_y_usd_price"], dtype=float)
+
+    if started.any():
+        # See `policy_adjust_weight`
+        schedule = weight_schedule(weight_x_start, weight_x_end, lbp_length, weight_curve)
+        lbp_weight_x = lookup_weight(schedule, np.arange(timesteps + 1) - stage_schedule.lbp_start_timestep)
+        weight_x[started] = lbp_weight_x[latest_lbp[started]]
+
+        # Seed the pool with liquidity on the first LBP timestep
+        if initial_state["lbp_supply_x"] == 0:
+            lbp_supply_x = np.where(started, lbp_initial_x, lbp_supply_x)
+            lbp_supply_y = np.where(started, lbp_initial_y, lbp_supply_y)
+
+        pool = WeightedPool(lbp_supply_x[started], lbp_supply_y[started], weight_x[started])
+        lbp_price_y_in_x[:, started] = pool.price_y_in_x
+        lbp_price_x_in_y[:, started] = pool.price_x_in_y
+
+        ## Assumes X is ETH
+        lbp_y_usd_price[:, started] = eth_price[:, latest_lbp[started]] * pool.price_y_in_x
+
+    return {
+        "stage": np.broadcast_to(stages, shape),
+        "timestamp": np.broadcast_to(timestamps, shape),
+        "eth_price": eth_price,
+        "weight_x": np.broadcast_to(weight_x, shape),
+        "lbp_supply_x": np.broadcast_to(lbp_supply_x, shape),
+        "lbp_supply_y": np.broadcast_to(lbp_supply_y, shape),
+        "lbp_price_x_in_y": lbp_price_x_in_y,
+        "lbp_price_y_in_x": lbp_price_y_in_x,
+        "lbp_y_usd_price": lbp_y_usd_price,
+        # Agents are dropped during post-processing
+        "agents": np.full(shape, None, dtype=object),
+    }
+
+
+def evaluate_process(process, runs, timesteps, dt) -> np.ndarray:
+    """Evaluate a `(run, timestep * dt)` environmental process for all runs and timesteps
+
+    Processes flagged with a truthy `vectorized` attribute are called once with broadcastable
+    (runs, 1) and (1, timesteps) arrays, otherwise the process is called for each run and timestep,
+    using the same arguments as the radCAD State Update Function would.
+    """
+    if getattr(process, "vectorized", False):
+        run = np.arange(1, runs + 1)[:, None]
+        time = (np.arange(timesteps) * dt)[None, :]
+        return np.broadcast_to(process(run, time), (runs, timesteps))
+    return np.array(
+        [
+            [process(run, timestep * dt) for timestep in range(timesteps)]
+            for run in range(1, runs + 1)
+        ],
+        dtype=float,
+    ).reshape(runs, timesteps)
+
+
+def check_parity(executable, rtol=1e-12):
+    """Cross-check the vectorized engine against the radCAD engine
+
+    Runs a copy of the executable with each engine, post-processes both results,
+    and raises an AssertionError if the resulting DataFrames differ.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: The radCAD and vectorized engine results
+    """
+    results = []
+    for engine in [
+        Engine(backend=Backend.SINGLE_PROCESS, deepcopy=False, drop_substeps=True),
+        VectorizedEngine(),
+    ]:
+        _executable = copy.deepcopy(executable)
+        _executable.engine = engine
+        _executable.run()
+        try:
+            parameters = _executable.simulations[0].model.params
+        except AttributeError:
+            parameters = _executable.model.params
+        df = post_process(pd.DataFrame(_executable.results), parameters=parameters)
+        results.append(df.reset_index(drop=True))
+
+    df_radcad, df_vectorized = results
+    pd.testing.assert_frame_equal(
+        df_radcad, df_vectorized, check_dtype=False, check_exact=False, rtol=rtol
+    )
+
+    return df_radcad, df_vectorized
+
+
+def _float_or_nan(value):
+    return np.nan if value is None else value
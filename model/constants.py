@@ -5,6 +5,8 @@ Constants used in the model e.g. number of epochs in a year, Gwei in 1 Ether
 gwei = 1e9
 wei = 1e18
 slots_per_epoch = 32
+seconds_per_slot = 12
+seconds_per_epoch = slots_per_epoch * seconds_per_slot
 epochs_per_day = 225
 epochs_per_month = 6750
 epochs_per_year = 82180
@@ -0,0 +1,194 @@
+"""
+# Agent System
+
+A population of heterogeneous LBP participants, such as arbitrageurs, patient bidders, sellers and bots.
+
+Agent attributes are stored as fields of a structured NumPy array (see `AGENT_DTYPE`) rather than as per-agent objects,
+and each strategy decides whether and how much to trade using vectorized operations over the whole population,
+feeding a single batch of orders per timestep into the LBP.
+
+The population is created at the start of each run by the `agent_population_process` System Parameter,
+and then updated in place to avoid copying it every timestep - the `agents` State Variable therefore always
+refers to the latest population, and is dropped from the results during post-processing.
+"""
+
+import typing
+import numpy as np
+
+import model.parts.automated_market_maker as amm
+from model.types import AgentStrategy, Run, Stage
+from model.random_streams import random_streams
+
+
+AGENT_DTYPE = np.dtype([
+    # Trading strategy, see model.types.AgentStrategy
+    ("strategy", np.int8),
+    # Token X (ETH) available to buy token Y
+    ("budget_x", np.float64),
+    # Token Y available to sell
+    ("holdings_y", np.float64),
+    # Valuation of token Y in USD, used as the reservation price
+    ("reservation_price", np.float64),
+    # Probability of the agent trading in a given timestep
+    ("activity", np.float64),
+])
+
+
+def no_agents(_run: Run) -> np.ndarray:
+    """An agent population process without any agents"""
+    return np.empty(0, dtype=AGENT_DTYPE)
+
+
+def create_agent_population(
+    agent_count: int,
+    rng: np.random.Generator,
+    strategy_distribution={
+        AgentStrategy.ARBITRAGEUR: 0.05,
+        AgentStrategy.BIDDER: 0.25,
+        AgentStrategy.SELLER: 0.5,
+        AgentStrategy.NOISE: 0.2,
+    },
+    budget_x_mean=1.0,
+    holdings_y_mean=1_000.0,
+    reservation_price_mean=5.0,
+    reservation_price_std=1.0,
+    activity=0.5,
+) -> np.ndarray:
+    """Create a population of agents with random budgets, holdings and reservation prices
+
+    Budgets and holdings are drawn from exponential distributions, and reservation prices from a normal distribution
+    truncated at zero, each with the given means.
+    """
+    strategies = np.array(list(strategy_distribution.keys()), dtype=np.int8)
+    probabilities = np.array(list(strategy_distribution.values()), dtype=float)
+
+    agents = np.empty(agent_count, dtype=AGENT_DTYPE)
+    agents["strategy"] = rng.choice(strategies, size=agent_count, p=probabilities / probabilities.sum())
+    agents["budget_x"] = rng.exponential(budget_x_mean, agent_count)
+    agents["holdings_y"] = rng.exponential(holdings_y_mean, agent_count)
+    agents["reservation_price"] = np.maximum(
+        rng.normal(reservation_price_mean, reservation_price_std, agent_count), 0
+    )
+    agents["activity"] = activity
+    return agents
+
+
+def create_agent_population_process(agent_count: int, seed=1, **kwargs) -> typing.Callable[[Run], np.ndarray]:
+    """Configure an agent population process, creating a reproducible population for each run
+
+    See `create_agent_population(...)` for the available keyword arguments.
+    """
+
+    def agent_population_process(run: Run) -> np.ndarray:
+        return create_agent_population(agent_count, random_streams.generator("agent_population", seed, run), **kwargs)
+
+    return agent_population_process
+
+
+def decide_orders(
+    agents: np.ndarray, pool: amm.WeightedPool, eth_price, rng: np.random.Generator
+) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Decide the orders of all agents for the current timestep
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The orders, and the index of the agent submitting each order
+    """
+    strategy = agents["strategy"]
+    budget_x = agents["budget_x"]
+    holdings_y = agents["holdings_y"]
+    reservation_price = agents["reservation_price"]
+
+    active = rng.random(len(agents)) < agents["activity"]
+    price_usd = eth_price * pool.price_y_in_x
+
+    buy_x = np.zeros(len(agents), dtype=np.bool_)
+    amount = np.zeros(len(agents))
+
+    # Bidders spend their whole budget once the price is at or below their reservation price
+    bidding = active & (strategy == AgentStrategy.BIDDER) & (price_usd <= reservation_price)
+    amount[bidding] = budget_x[bidding]
+
+    # Sellers sell all their holdings once the price is at or above their reservation price
+    selling = active & (strategy == AgentStrategy.SELLER) & (price_usd >= reservation_price)
+    buy_x[selling] = True
+    amount[selling] = holdings_y[selling]
+
+    # Arbitrageurs share the trade that moves the spot price to their valuation, ignoring swap fees
+    arbitraging = active & (strategy == AgentStrategy.ARBITRAGEUR) & (reservation_price > 0)
+    target_price_y_in_x = reservation_price / eth_price
+    overpriced = arbitraging & (pool.price_y_in_x > target_price_y_in_x)
+    underpriced = arbitraging & (pool.price_y_in_x < target_price_y_in_x)
+    buy_x[overpriced] = True
+    amount[overpriced] = np.minimum(
+        pool.balance_y * ((pool.price_y_in_x / target_price_y_in_x[overpriced]) ** pool.weight_x - 1)
+        / overpriced.sum(),
+        holdings_y[overpriced],
+    )
+    amount[underpriced] = np.minimum(
+        pool.balance_x * ((target_price_y_in_x[underpriced] / pool.price_y_in_x) ** pool.weight_y - 1)
+        / underpriced.sum(),
+        budget_x[underpriced],
+    )
+
+    # Bots trade a random fraction of their budget or holdings in a random direction
+    trading = active & (strategy == AgentStrategy.NOISE)
+    buy_x[trading] = rng.random(trading.sum()) < 0.5
+    fraction = rng.uniform(0, 0.1, trading.sum())
+    amount[trading] = np.where(buy_x[trading], holdings_y[trading], budget_x[trading]) * fraction
+
+    # Group orders by direction, so that sequential swaps are executed in two segments
+    index = np.flatnonzero(amount > 0)
+    index = index[np.argsort(~buy_x[index], kind="stable")]
+
+    return amm.create_orders(buy_x[index], amount[index]), index
+
+
+def settle_orders(agents: np.ndarray, index: np.ndarray, orders: np.ndarray, result: amm.SwapResult):
+    """Update the budgets and holdings of agents in place with the amounts paid and received for their orders"""
+    buy_x = orders["buy_x"]
+    agents["holdings_y"][index] += np.where(buy_x, -result.amount_in, result.amount_out)
+    agents["budget_x"][index] += np.where(buy_x, result.amount_out, -result.amount_in)
+
+
+def policy_agent_trading(params, substep, state_history, previous_state):
+    """
+    ## Agent Trading Policy Function
+
+    Each agent reacts to the LBP price, and their orders are executed against the LBP as a single batch
+    """
+
+    # Parameters
+    agent_population_process = params["agent_population_process"]
+    lbp_swap_fee = params["lbp_swap_fee"]
+    lbp_netted_swaps = params["lbp_netted_swaps"]
+
+    # State Variables
+    current_stage = previous_state["stage"]
+    run = previous_state["run"]
+    timestep = previous_state["timestep"]
+    eth_price = previous_state["eth_price"]
+    weight_x = previous_state["weight_x"]
+    lbp_supply_x = previous_state["lbp_supply_x"]
+    lbp_supply_y = previous_state["lbp_supply_y"]
+    agents = previous_state["agents"]
+
+    # Create the agent population at the start of each run
+    if agents is None:
+        agents = agent_population_process(run)
+
+    if current_stage == Stage.LBP and len(agents):
+        # Common random numbers across parameter subsets, see model.random_streams
+        rng = random_streams.generator("agent_trading", run, timestep)
+        pool = amm.get_pool(lbp_supply_x, lbp_supply_y, weight_x)
+        orders, index = decide_orders(agents, pool, eth_price, rng)
+        if len(orders):
+            pool, result = pool.swap(orders, lbp_swap_fee, lbp_netted_swaps)
+            settle_orders(agents, index, orders, result)
+            lbp_supply_x = pool.balance_x
+            lbp_supply_y = pool.balance_y
+
+    return {
+        "agents": agents,
+        "lbp_supply_x": lbp_supply_x,
+        "lbp_supply_y": lbp_supply_y,
+    }
@@ -0,0 +1,313 @@
+"""
+# Automated Market Maker
+
+Constant-product and weighted-product pool mechanisms, as used by Balancer Liquidity Bootstrapping Pools.
+
+Pools are immutable: operations that change the balances or weights return a new pool,
+so that derived quantities such as weighted balances, spot prices and the invariant
+are computed at most once per pool, and `get_pool(...)` shares the same pool between Policies
+that query the same pool state within a timestep.
+
+Swaps are executed as batches of orders stored in a structured NumPy array (see `ORDER_DTYPE`),
+so that a whole timestep of orders is applied to the pool balances in a single call.
+"""
+
+import typing
+import numpy as np
+from functools import cached_property, lru_cache
+
+from model.types import Percentage
+
+
+ORDER_DTYPE = np.dtype([
+    # True if the order buys token X with token Y, False if it sells token X for token Y
+    ("buy_x", np.bool_),
+    # Amount of the token paid into the pool, or received from the pool if `exact_out` is True
+    ("amount", np.float64),
+    # True if the amount is the exact amount to receive (in-given-out), else the exact amount to pay (out-given-in)
+    ("exact_out", np.bool_),
+])
+
+
+class SwapResult(typing.NamedTuple):
+    """Pool balances after a batch of swaps, and the amounts paid and received by each order"""
+
+    balance_x: float
+    balance_y: float
+    amount_in: np.ndarray
+    amount_out: np.ndarray
+
+
+class WeightedPool:
+    """A two-token weighted-product pool with invariant `balance_x ** weight_x * balance_y ** weight_y`
+
+    Balances and weights may also be NumPy arrays, to evaluate many pools at once.
+    """
+
+    def __init__(self, balance_x, balance_y, weight_x: Percentage):
+        self.balance_x = balance_x
+        self.balance_y = balance_y
+        self.weight_x = weight_x
+
+    def __repr__(self):
+        return f"{type(self).__name__}(balance_x={self.balance_x}, balance_y={self.balance_y}, weight_x={self.weight_x})"
+
+    @cached_property
+    def weight_y(self) -> Percentage:
+        return 1 - self.weight_x
+
+    @cached_property
+    def weighted_balance_x(self):
+        return self.balance_x / self.weight_x
+
+    @cached_property
+    def weighted_balance_y(self):
+        return self.balance_y / self.weight_y
+
+    @cached_property
+    def price_y_in_x(self):
+        """The spot price of token Y denominated in token X, excluding swap fees"""
+        return self.weighted_balance_x / self.weighted_balance_y
+
+    @cached_property
+    def price_x_in_y(self):
+        """The spot price of token X denominated in token Y, excluding swap fees"""
+        return self.weighted_balance_y / self.weighted_balance_x
+
+    @cached_property
+    def invariant(self):
+        return self.balance_x ** self.weight_x * self.balance_y ** self.weight_y
+
+    def _balances(self, buy_x):
+        """Balances and weights ordered as (token in, token out) for the direction of a swap"""
+        if buy_x:
+            return self.balance_y, self.weight_y, self.balance_x, self.weight_x
+        return self.balance_x, self.weight_x, self.balance_y, self.weight_y
+
+    def out_given_in(self, amount_in, buy_x=True, swap_fee: Percentage = 0.0):
+        """The amount received for paying `amount_in`, where `buy_x` pays token Y to receive token X"""
+        return out_given_in(*self._balances(buy_x), amount_in, swap_fee)
+
+    def in_given_out(self, amount_out, buy_x=True, swap_fee: Percentage = 0.0):
+        """The amount to pay for receiving `amount_out`, where `buy_x` pays token Y to receive token X"""
+        return in_given_out(*self._balances(buy_x), amount_out, swap_fee)
+
+    def price_impact(self, amount_in, buy_x=True, swap_fee: Percentage = 0.0):
+        """The relative difference between the effective price of a swap and the spot price"""
+        spot = self.price_x_in_y if buy_x else self.price_y_in_x
+        return amount_in / self.out_given_in(amount_in, buy_x, swap_fee) / spot - 1
+
+    def swap(
+        self, orders: np.ndarray, swap_fee: Percentage = 0.0, netted=False
+    ) -> typing.Tuple["WeightedPool", "SwapResult"]:
+        """Execute a batch of orders, see `execute_swaps`
+
+        Returns:
+            Tuple[WeightedPool, SwapResult]: The pool after the swaps, and the result of each order
+        """
+        result = execute_swaps(
+            self.balance_x, self.balance_y, self.weight_x, orders, swap_fee, netted
+        )
+        return self.with_balances(result.balance_x, result.balance_y), result
+
+    def add_liquidity(self, amount_x, amount_y) -> "WeightedPool":
+        """Add liquidity, which only preserves the spot price if added in proportion to the balances"""
+        return self.with_balances(self.balance_x + amount_x, self.balance_y + amount_y)
+
+    def remove_liquidity(self, share: Percentage) -> typing.Tuple["WeightedPool", typing.Any, typing.Any]:
+        """Remove a share of the liquidity in proportion to the balances
+
+        Returns:
+            Tuple[WeightedPool, float, float]: The pool after removal, and the amounts of token X and Y removed
+        """
+        amount_x = self.balance_x * share
+        amount_y = self.balance_y * share
+        return self.with_balances(self.balance_x - amount_x, self.balance_y - amount_y), amount_x, amount_y
+
+    def with_balances(self, balance_x, balance_y) -> "WeightedPool":
+        return WeightedPool(balance_x, balance_y, self.weight_x)
+
+    def with_weight(self, weight_x: Percentage) -> "WeightedPool":
+        return WeightedPool(self.balance_x, self.balance_y, weight_x)
+
+
+class ConstantProductPool(WeightedPool):
+    """A two-token constant-product pool with invariant `balance_x * balance_y`, i.e. equal weights"""
+
+    def __init__(self, balance_x, balance_y):
+        super().__init__(balance_x, balance_y, 0.5)
+
+    @cached_property
+    def invariant(self):
+        return self.balance_x * self.balance_y
+
+    def with_balances(self, balance_x, balance_y) -> "ConstantProductPool":
+        return ConstantProductPool(balance_x, balance_y)
+
+
+@lru_cache(maxsize=1024)
+def get_pool(balance_x, balance_y, weight_x: Percentage) -> WeightedPool:
+    """Get the shared pool for the given balances and weight of token X"""
+    return WeightedPool(balance_x, balance_y, weight_x)
+
+
+def create_orders(buy_x, amount, exact_out=False) -> np.ndarray:
+    """Create a batch of orders from broadcastable arrays of order attributes"""
+    buy_x, amount, exact_out = np.broadcast_arrays(buy_x, amount, exact_out)
+    orders = np.empty(amount.shape, dtype=ORDER_DTYPE)
+    orders["buy_x"] = buy_x
+    orders["amount"] = amount
+    orders["exact_out"] = exact_out
+    return orders.reshape(-1)
+
+
+def no_orders(_run, _timestep) -> np.ndarray:
+    """An order process that never submits any orders"""
+    return np.empty(0, dtype=ORDER_DTYPE)
+
+
+def spot_price(balance_in, weight_in, balance_out, weight_out):
+    """The price of the token out, denominated in the token in, excluding swap fees"""
+    return (balance_in / weight_in) / (balance_out / weight_out)
+
+
+def out_given_in(balance_in, weight_in, balance_out, weight_out, amount_in, swap_fee: Percentage = 0.0):
+    """The amount of the token out received for paying `amount_in` of the token in"""
+    return balance_out * (
+        1 - (balance_in / (balance_in + amount_in * (1 - swap_fee))) ** (weight_in / weight_out)
+    )
+
+
+def in_given_out(balance_in, weight_in, balance_out, weight_out, amount_out, swap_fee: Percentage = 0.0):
+    """The amount of the token in to pay for receiving `amount_out` of the token out"""
+    return balance_in * (
+        (balance_out / (balance_out - amount_out)) ** (weight_out / weight_in) - 1
+    ) / (1 - swap_fee)
+
+
+def execute_swaps(
+    balance_x, balance_y, weight_x, orders: np.ndarray, swap_fee: Percentage = 0.0, netted=False
+) -> SwapResult:
+    """Execute a batch of orders against a two-token weighted pool
+
+    Args:
+        balance_x (float): Pool balance of token X
+        balance_y (float): Pool balance of token Y
+        weight_x (Percentage): Weight of token X, where the weight of token Y is `1 - weight_x`
+        orders (np.ndarray): Orders with `ORDER_DTYPE`
+        swap_fee (Percentage): Fee charged on the amount paid into the pool, retained by the pool
+        netted (bool): Whether to net opposing orders before trading against the pool, see `_execute_netted`,
+            otherwise orders are executed sequentially in the order given, see `_execute_sequential`
+
+    Returns:
+        SwapResult: Pool balances after the batch, and the amounts paid and received by each order
+    """
+    if len(orders) == 0:
+        return SwapResult(balance_x, balance_y, np.zeros(0), np.zeros(0))
+    if netted:
+        return _execute_netted(balance_x, balance_y, weight_x, orders, swap_fee)
+    return _execute_sequential(balance_x, balance_y, weight_x, orders, swap_fee)
+
+
+def _execute_sequential(balance_x, balance_y, weight_x, orders, swap_fee) -> SwapResult:
+    """Execute orders one after the other, each against the pool balances left by the previous order
+
+    Consecutive orders of the same direction and kind form a segment, whose balances follow
+    in closed form from cumulative sums and products, so the Python loop is over segments rather than orders.
+    """
+    weights = {True: (1 - weight_x, weight_x), False: (weight_x, 1 - weight_x)}
+    amount_in = np.zeros(len(orders))
+    amount_out = np.zeros(len(orders))
+
+    key = orders["buy_x"].astype(np.int8) * 2 + orders["exact_out"]
+    boundaries = np.flatnonzero(np.diff(key)) + 1
+    for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(orders)]):
+        buy_x = bool(orders["buy_x"][start])
+        exact_out = bool(orders["exact_out"][start])
+        amounts = orders["amount"][start:end]
+        weight_in, weight_out = weights[buy_x]
+        balance_in, balance_out = (balance_y, balance_x) if buy_x else (balance_x, balance_y)
+
+        segment = _swap_segment_given_out if exact_out else _swap_segment_given_in
+        balance_in, balance_out, amount_in[start:end], amount_out[start:end] = segment(
+            balance_in, weight_in, balance_out, weight_out, amounts, swap_fee
+        )
+        balance_x, balance_y = (balance_out, balance_in) if buy_x else (balance_in, balance_out)
+
+    return SwapResult(balance_x, balance_y, amount_in, amount_out)
+
+
+def _swap_segment_given_in(balance_in, weight_in, balance_out, weight_out, amounts_in, swap_fee):
+    balances_in = balance_in + np.cumsum(amounts_in)
+    previous_balances_in = np.r_[balance_in, balances_in[:-1]]
+    ratios = (
+        previous_balances_in / (previous_balances_in + amounts_in * (1 - swap_fee))
+    ) ** (weight_in / weight_out)
+    balances_out = balance_out * np.cumprod(ratios)
+    amounts_out = -np.diff(np.r_[balance_out, balances_out])
+    return balances_in[-1], balances_out[-1], amounts_in, amounts_out
+
+
+def _swap_segment_given_out(balance_in, weight_in, balance_out, weight_out, amounts_out, swap_fee):
+    # Orders that would drain the pool are rejected, along with the rest of the segment
+    filled = np.logical_and.accumulate(balance_out - np.cumsum(amounts_out) > 0)
+    amounts_out = np.where(filled, amounts_out, 0.0)
+    balances_out = balance_out - np.cumsum(amounts_out)
+    previous_balances_out = np.r_[balance_out, balances_out[:-1]]
+    growth = 1 + (
+        (previous_balances_out / balances_out) ** (weight_out / weight_in) - 1
+    ) / (1 - swap_fee)
+    balances_in = balance_in * np.cumprod(growth)
+    amounts_in = np.diff(np.r_[balance_in, balances_in])
+    return balances_in[-1], balances_out[-1], amounts_in, amounts_out
+
+
+def _execute_netted(balance_x, balance_y, weight_x, orders, swap_fee) -> SwapResult:
+    """Net opposing orders against each other, and only trade the residual against the pool
+
+    All orders are valued in token Y at the spot price, and the swap fee is charged on every order.
+    The smaller side is matched against the larger side at the spot price,
+    and the residual of the larger side is executed against the pool as a single swap.
+    Each order on the larger side receives a pro-rata share of the matched and swapped amounts,
+    so in-given-out orders receive approximately, rather than exactly, their requested amount.
+    """
+    weight_y = 1 - weight_x
+    price_x = spot_price(balance_y, weight_y, balance_x, weight_x)
+    buy_x = orders["buy_x"]
+    exact_out = orders["exact_out"]
+    amount = orders["amount"]
+
+    # Order value in token Y at the spot price
+    value = np.where(buy_x == exact_out, amount * price_x, amount)
+    value_buy = value[buy_x].sum()
+    value_sell = value[~buy_x].sum()
+    matched = min(value_buy, value_sell) * (1 - swap_fee)
+
+    # Fees are retained by the pool in the token paid in
+    balance_y += value_buy * swap_fee
+    balance_x += value_sell / price_x * swap_fee
+
+    if value_buy >= value_sell:
+        residual_in = value_buy * (1 - swap_fee) - matched
+        residual_out = out_given_in(balance_y, weight_y, balance_x, weight_x, residual_in)
+        balance_y += residual_in
+        balance_x -= residual_out
+        total_out_buy = matched / price_x + residual_out
+        total_out_sell = matched
+    else:
+        residual_in = (value_sell * (1 - swap_fee) - matched) / price_x
+        residual_out = out_given_in(balance_x, weight_x, balance_y, weight_y, residual_in)
+        balance_x += residual_in
+        balance_y -= residual_out
+        total_out_buy = matched / price_x
+        total_out_sell = matched + residual_out
+
+    amount_in = np.where(buy_x, value, value / price_x)
+    share = np.where(
+        buy_x,
+        value / (value_buy if value_buy else 1),
+        value / (value_sell if value_sell else 1),
+    )
+    amount_out = np.where(buy_x, total_out_buy, total_out_sell) * share
+
+    return SwapResult(balance_x, balance_y, amount_in, amount_out)
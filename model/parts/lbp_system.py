@@ -8,74 +8,51 @@ import typing
 import datetime
 
 from model import constants as constants
+import model.parts.automated_market_maker as amm
 from model.types import ETH, USD_per_ETH, Gwei, Stage
+from model.weight_schedules import weight_schedule, lookup_weight
+from model.stage_schedules import get_stage_schedule
 
 
 def policy_upgrade_stages(params, substep, state_history, previous_state):
     """
     ## Upgrade Stages Policy
-    """
-    # Parameters
-    dt = params["dt"]
-    stage: Stage = params["stage"]
-    date_start = params["date_start"]
 
+    Looks up the timestamp and stage of the current timestep from the precomputed stage schedule,
+    transitioning through the LBP stages at the LBP start and end dates.
+    """
     # State Variables
-    current_stage = previous_state["stage"]
     timestep = previous_state["timestep"]
 
-
-    # Calculate current timestamp from timestep
-    timestamp = date_start + datetime.timedelta(
-        days=(timestep * dt / constants.epochs_per_day)
-    )
-
-    # Initialize stage State Variable at start of simulation
-    if current_stage is None:
-        current_stage = stage
-    else:
-        # Convert Stage enum value (int) to Stage enum
-        current_stage = Stage(current_stage)
+    schedule = get_stage_schedule(params)
 
     return {
-        "stage": current_stage,
-        "timestamp": timestamp,
+        "stage": schedule.stage_at(timestep),
+        "timestamp": schedule.timestamp(timestep),
     }
 
 def policy_adjust_weight(params, substep, state_history, previous_state):
     """
     ## Adjust Weight Policy Function
 
-    Adjust the weight of the LBP
+    Adjust the weight of the LBP, following the precomputed weight schedule
     """
 
     # Parameters
     weight_x_start = params["weight_x_start"]
     weight_x_end = params["weight_x_end"]
     lbp_length = params["lbp_length"]
+    weight_curve = params["weight_curve"]
 
     # State Variables
     current_weight = previous_state["weight_x"]
     current_stage = previous_state["stage"]
-    lbp_supply_x = previous_state['lbp_supply_x']
-
+    timestep = previous_state["timestep"]
 
     if current_stage == Stage.LBP:
-        # Do not adjust weight on initialization
-        if current_weight is None:
-            current_weight = weight_x_start
-            # Determine new weight
-        else:
-            if weight_x_start > weight_x_end:
-                adjustment_weight = (weight_x_start - weight_x_end) / lbp_length
-                current_weight -= adjustment_weight
-                if current_weight < weight_x_end:
-                    current_weight = weight_x_end
-            else:
-                adjustment_weight = (weight_x_end - weight_x_start) / lbp_length
-                current_weight += adjustment_weight
-                if current_weight > weight_x_end:
-                    current_weight = weight_x_end
+        schedule = weight_schedule(weight_x_start, weight_x_end, lbp_length, weight_curve)
+        lbp_timestep = get_stage_schedule(params).lbp_timestep(timestep)
+        current_weight = float(lookup_weight(schedule, lbp_timestep))
     # else:
     #     # Else, raise exception if invalid Stage
     #     raise Exception("Invalid Stage selected")
@@ -106,8 +83,11 @@ def policy_add_liquidity(params, substep, state_history, previous_state):
     # Stage finite-state machine
     if current_stage == Stage.LBP:
         if lbp_supply_x == 0:
-            lbp_supply_x = lbp_initial_x
-            lbp_supply_y = lbp_initial_y
+            pool = amm.get_pool(lbp_supply_x, lbp_supply_y, weight_x).add_liquidity(
+                lbp_initial_x, lbp_initial_y
+            )
+            lbp_supply_x = pool.balance_x
+            lbp_supply_y = pool.balance_y
     return {
         "lbp_supply_x": lbp_supply_x,
         "lbp_supply_y": lbp_supply_y,
@@ -131,18 +111,15 @@ def policy_calc_pricing(params, substep, state_history, previous_state):
     lbp_supply_x = previous_state['lbp_supply_x']
     lbp_supply_y = previous_state['lbp_supply_y']
     eth_price = previous_state['eth_price']
+    lbp_price_y_in_x = previous_state['lbp_price_y_in_x']
+    lbp_price_x_in_y = previous_state['lbp_price_x_in_y']
+    lbp_y_usd_price = previous_state['lbp_y_usd_price']
 
     # Stage finite-state machine
     if current_stage == Stage.LBP:
-        if lbp_supply_x == 0:
-            lbp_supply_x = lbp_initial_x
-            lbp_supply_y = lbp_initial_y
-
-        weight_y = 1 - weight_x
-        x_weighted = lbp_supply_x / weight_x
-        y_weighted = lbp_supply_y / weight_y
-        lbp_price_y_in_x = x_weighted / y_weighted
-        lbp_price_x_in_y = y_weighted / x_weighted
+        pool = amm.get_pool(lbp_supply_x, lbp_supply_y, weight_x)
+        lbp_price_y_in_x = pool.price_y_in_x
+        lbp_price_x_in_y = pool.price_x_in_y
 
         ## Assumes X is ETH
         lbp_y_usd_price = eth_price * lbp_price_y_in_x
@@ -153,24 +130,38 @@ def policy_calc_pricing(params, substep, state_history, previous_state):
         "lbp_y_usd_price": lbp_y_usd_price
     }
 
-# def policy_buy_x(
-#     params, substep, state_history, previous_state
-# ) -> typing.Dict[str, ETH]:
-#     """
-#     ## Buy X Policy Function
-#
-#     Calculate the new X and Y balance of the pool
-#     """
-#     return {}
-#
-#
-#
-# def policy_sell_x(
-#     params, substep, state_history, previous_state
-# ) -> typing.Dict[str, ETH]:
-#     """
-#     ## Buy X Policy Function
-#
-#     Calculate the new X and Y balance of the pool
-#     """
-#     return {}
+def policy_swap(params, substep, state_history, previous_state):
+    """
+    ## Swap Policy Function
+
+    Executes the batch of orders submitted to the LBP during the timestep,
+    and calculates the new X and Y balance of the pool
+    """
+
+    # Parameters
+    dt = params["dt"]
+    lbp_order_process = params["lbp_order_process"]
+    lbp_swap_fee = params["lbp_swap_fee"]
+    lbp_netted_swaps = params["lbp_netted_swaps"]
+
+    # State Variables
+    current_stage = previous_state["stage"]
+    run = previous_state["run"]
+    timestep = previous_state["timestep"]
+    weight_x = previous_state["weight_x"]
+    lbp_supply_x = previous_state['lbp_supply_x']
+    lbp_supply_y = previous_state['lbp_supply_y']
+
+    if current_stage == Stage.LBP:
+        orders = lbp_order_process(run, timestep * dt)
+        if len(orders):
+            pool, _result = amm.get_pool(lbp_supply_x, lbp_supply_y, weight_x).swap(
+                orders, lbp_swap_fee, lbp_netted_swaps
+            )
+            lbp_supply_x = pool.balance_x
+            lbp_supply_y = pool.balance_y
+
+    return {
+        "lbp_supply_x": lbp_supply_x,
+        "lbp_supply_y": lbp_supply_y,
+    }
@@ -0,0 +1,61 @@
+"""
+Deterministic random number streams
+
+Each stream is derived from the master seed `MASTER_SEED` (see `experiments/simulation_configuration.py`)
+and a key, such as the name of a process and the run, using Numpy `SeedSequence` spawn keys:
+
+    rng = random_streams.generator("agent_trading", run, timestep)
+
+A stream only depends on the master seed and its key, not on the order streams are created in,
+or the process or machine they are created in, so results are bit-identical across radCAD backends.
+Streams with different keys are statistically independent.
+
+Keys are chosen by the caller: e.g. omitting the subset from a key gives every parameter subset
+the same random numbers (common random numbers), while including it gives each subset independent random numbers.
+"""
+
+import hashlib
+import numpy as np
+from functools import lru_cache
+
+from experiments.simulation_configuration import MASTER_SEED
+
+
+@lru_cache(maxsize=None)
+def _encode_name(name: str) -> int:
+    # A stable 32-bit integer for a string key, unlike `hash(...)` which is salted per Python process
+    return int.from_bytes(hashlib.sha256(name.encode()).digest()[:4], "little")
+
+
+def encode_key(key) -> tuple:
+    """Encode a stream key of strings and non-negative integers as a `SeedSequence` spawn key"""
+    encoded = []
+    for part in key:
+        if isinstance(part, str):
+            encoded.append(_encode_name(part))
+        elif isinstance(part, (int, np.integer)) and part >= 0:
+            encoded.append(int(part))
+        else:
+            raise Exception(f"Invalid random stream key {part!r}, expected a string or non-negative integer")
+    return tuple(encoded)
+
+
+class RandomStreams:
+    """Allocates deterministic random number streams from a master seed, see module documentation
+
+    Args:
+        master_seed (int): Entropy of every stream
+    """
+
+    def __init__(self, master_seed=MASTER_SEED):
+        self.master_seed = master_seed
+
+    def seed_sequence(self, *key) -> np.random.SeedSequence:
+        return np.random.SeedSequence(self.master_seed, spawn_key=encode_key(key))
+
+    def generator(self, *key) -> np.random.Generator:
+        """A Numpy RNG for the stream with the given key"""
+        return np.random.Generator(np.random.PCG64(self.seed_sequence(*key)))
+
+
+random_streams = RandomStreams()
@@ -0,0 +1,96 @@
+"""
+Precomputed timestamp and stage schedules
+
+The timestamp and stage of each timestep only depend on System Parameters, so they are computed once
+per parameter subset as `datetime64` and `Stage` arrays, shared by all runs, and looked up by timestep.
+"""
+
+import numpy as np
+from datetime import datetime
+from functools import lru_cache
+
+import model.constants as constants
+from model.types import Stage
+
+
+microseconds_per_day = 24 * 60 * 60 * 1e6
+
+
+class StageSchedule:
+    """Timestamps and stages indexed by timestep, grown on demand as later timesteps are looked up
+
+    `lbp_start_timestep` is the first timestep in the LBP stage, or None if the LBP has not started within the schedule.
+    """
+
+    def __init__(self, stage: Stage, date_start: datetime, dt, date_lbp_start=None, date_lbp_end=None, size=1024):
+        self.stage = stage
+        self.date_start = np.datetime64(date_start, "us")
+        self.dt = dt
+        self.date_lbp_start = None if date_lbp_start is None else np.datetime64(date_lbp_start, "us")
+        self.date_lbp_end = None if date_lbp_end is None else np.datetime64(date_lbp_end, "us")
+        self._grow(size)
+
+    def _grow(self, size):
+        # Calculate timestamps from timesteps, rounded to the nearest microsecond like `datetime.timedelta`
+        days = np.arange(size) * self.dt / constants.epochs_per_day
+        self.timestamps = self.date_start + np.round(days * microseconds_per_day).astype("timedelta64[us]")
+        self.timestamps.setflags(write=False)
+
+        # Stage finite-state machine
+        if self.stage == Stage.ALL:
+            # If Stage ALL selected, transition through all stages at the LBP start and end dates
+            started = (
+                np.full(size, True) if self.date_lbp_start is None else self.timestamps >= self.date_lbp_start
+            )
+            ended = (
+                np.full(size, False) if self.date_lbp_end is None else self.timestamps >= self.date_lbp_end
+            )
+            self.stages = np.full(size, Stage.PRE_LBP, dtype=object)
+            self.stages[started] = Stage.LBP
+            self.stages[started & ended] = Stage.POST_LBP
+        elif isinstance(self.stage, Stage):
+            # Otherwise, only execute single stage
+            self.stages = np.full(size, self.stage, dtype=object)
+        else:
+            # Else, raise exception if invalid Stage
+            raise Exception("Invalid Stage selected")
+        self.stages.setflags(write=False)
+
+        # Timestep 0 is the initial state, so the LBP starts at the earliest on timestep 1
+        lbp_timesteps = np.flatnonzero(self.stages[1:] == Stage.LBP)
+        self.lbp_start_timestep = lbp_timesteps[0] + 1 if len(lbp_timesteps) else None
+
+    def ensure(self, timesteps):
+        """Ensure the schedule covers timesteps 0 to `timesteps` inclusive"""
+        if timesteps >= len(self.timestamps):
+            self._grow(max(2 * len(self.timestamps), timesteps + 1))
+
+    def timestamp(self, timestep) -> np.datetime64:
+        self.ensure(timestep)
+        return self.timestamps[timestep]
+
+    def stage_at(self, timestep) -> Stage:
+        self.ensure(timestep)
+        return self.stages[timestep]
+
+    def lbp_timestep(self, timestep):
+        """The number of timesteps since the LBP started, for a timestep in the LBP stage"""
+        self.ensure(timestep)
+        return timestep - self.lbp_start_timestep
+
+
+@lru_cache(maxsize=None)
+def stage_schedule(stage: Stage, date_start: datetime, dt, date_lbp_start=None, date_lbp_end=None) -> StageSchedule:
+    """Get the shared stage schedule for the given System Parameters"""
+    return StageSchedule(stage, date_start, dt, date_lbp_start, date_lbp_end)
+
+
+def get_stage_schedule(params) -> StageSchedule:
+    """Get the shared stage schedule for a parameter subset"""
+    return stage_schedule(
+        params["stage"],
+        params["date_start"],
+        params["dt"],
+        params["date_lbp_start"],
+        params["date_lbp_end"],
+    )
@@ -4,8 +4,9 @@ cadCAD model State Update Block structure, composed of Policy and State Update F
 
 import model.parts.ethereum_system as ethereum
 import model.parts.lbp_system as lbp
+import model.parts.agent_system as agents
 from model.system_parameters import parameters
-from model.utils import update_from_signal
+from model.utils import update_from_signal, fuse_state_update_blocks
 
 
 
@@ -68,6 +69,41 @@ _state_update_blocks = [
             ),
         },
     },
+    {
+        "description": """
+            Execute LBP Swaps
+        """,
+        "policies": {
+            "policy_swap": lbp.policy_swap,
+        },
+        "variables": {
+            "lbp_supply_x": update_from_signal(
+                "lbp_supply_x"
+            ),
+            "lbp_supply_y": update_from_signal(
+                "lbp_supply_y"
+            ),
+        },
+    },
+    {
+        "description": """
+            Agent Trading
+        """,
+        "policies": {
+            "policy_agent_trading": agents.policy_agent_trading,
+        },
+        "variables": {
+            "agents": update_from_signal(
+                "agents"
+            ),
+            "lbp_supply_x": update_from_signal(
+                "lbp_supply_x"
+            ),
+            "lbp_supply_y": update_from_signal(
+                "lbp_supply_y"
+            ),
+        },
+    },
     {
         "description": """
             Calc LBP Price
@@ -117,3 +153,7 @@ state_update_blocks = [
 post_processing_blocks = [
     block for block in _state_update_blocks if block.get("post_processing", False)
 ]
+
+# Optional fused build of the State Update Blocks, combining consecutive blocks into a single radCAD substep,
+# with identical results when using `drop_substeps=True` (see model.utils.fuse_state_update_blocks and check_fusion)
+state_update_blocks_fused = fuse_state_update_blocks(state_update_blocks)
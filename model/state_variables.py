@@ -3,9 +3,8 @@ from dataclasses import dataclass
 from datetime import datetime
 
 import model.constants as constants
-import data.api.beaconchain as beaconchain
-import data.api.etherscan as etherscan
 import model.system_parameters as system_parameters
+from data.initial_state import initial_state_provider
 
 # from model.system_parameters import validator_environments
 from model.types import (
@@ -19,8 +18,14 @@ from model.types import (
 )
 from data.historical_values import eth_price_mean, eth_price_min, eth_price_max
 
-# Initial state from external live data source, setting a default in case API call fails
-eth_supply: ETH = etherscan.get_eth_supply(default=116_250_000e18) / constants.wei
+# Initial state from external live data source, fetched on first access and falling back to a bundled snapshot,
+# see data.initial_state - `eth_supply: ETH` is resolved on first access
+
+
+def __getattr__(name):
+    if name == "eth_supply":
+        return initial_state_provider.get("eth_supply") / constants.wei
+    raise AttributeError(f"module {__name__} has no attribute {name}")
 
 
 @dataclass
@@ -33,14 +38,16 @@ class StateVariables:
     # Time state variables
     stage: Stage = None
     """
-    The stage of the network upgrade process.
+    The stage of the LBP process.
 
     See "stage" System Parameter in model.system_parameters
     & model.types.Stage Enum for further documentation.
     """
-    timestamp: datetime = None
+    timestamp: np.datetime64 = None
     """
-    The timestamp for each timestep as a Python `datetime` object, starting from `date_start` Parameter.
+    The timestamp for each timestep as a NumPy `datetime64` value, starting from `date_start` Parameter.
+
+    See model.stage_schedules for further documentation.
     """
 
     # Ethereum state variables
@@ -65,6 +72,13 @@ class StateVariables:
     lbp_price_y_in_x: float = 0
     lbp_y_usd_price: float = 0
 
+    # Agent state Variables
+    agents: np.ndarray = None
+    """
+    The population of LBP participants as a structured array with dtype `model.parts.agent_system.AGENT_DTYPE`,
+    created at the start of each run by the `agent_population_process` System Parameter.
+    """
+
 
 
 
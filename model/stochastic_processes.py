@@ -1,18 +1,303 @@
 """
 Helper functions to generate stochastic environmental processes
+
+Each `*_paths(...)` generator samples a batch of realizations in a single vectorized call,
+returning a float array of shape (runs, samples), where `samples = timesteps * dt + 1` i.e. one sample per epoch,
+including the initial sample at epoch 0 (see `sample_count(...)`).
+
+The realizations can be used as an environmental process System Parameter using `create_sampled_process(...)`.
+Unless an RNG is given, each generator draws from its own deterministic random number stream, see `model.random_streams`.
+
+Variance reduction:
+* Common random numbers: a sampled process used by every subset of a parameter sweep (i.e. a single-value parameter list)
+  returns the same realization for the same run in every subset, so differences between subsets are not masked by
+  independent price paths. When the process itself is swept, `create_common_processes(...)` draws the realizations
+  of every set of process parameters from the same random numbers.
+* Antithetic variates: the generators driven by normal increments take `antithetic=True`, in which case each even run
+  (run 2, 4, ...) is driven by the negated increments of the previous run, see `standard_normal(...)`.
+
+See `experiments.variance_reduction` for the effective sample size achieved.
 """
 
+import typing
 import numpy as np
-from stochastic import processes
 
 import experiments.simulation_configuration as simulation
+import model.constants as constants
+from model.types import Run
 from experiments.utils import rng_generator
+from data.historical_prices import load_eth_hourly_prices
+
+
+def sample_count(timesteps=simulation.TIMESTEPS, dt=simulation.DELTA_TIME) -> int:
+    """The number of samples in a realization, one per epoch from epoch 0 to `timesteps * dt` inclusive"""
+    return int(round(timesteps * dt)) + 1
+
+
+def standard_normal(rng, size, antithetic=False) -> np.ndarray:
+    """Sample standard normal variates of shape (runs, ...)
+
+    With antithetic variates, runs are sampled in pairs where the second run is the negation of the first,
+    i.e. run index 1 is the negation of run index 0, 3 of 2, and so on. An odd final run is unpaired.
+    """
+    if not antithetic:
+        return rng.standard_normal(size)
+    (runs, *shape) = size
+    half = rng.standard_normal(((runs + 1) // 2, *shape))
+    return np.stack([half, -half], axis=1).reshape((-1, *shape))[:runs]
+
+
+def brownian_motion_paths(runs, samples, t=1.0, rng=None, antithetic=False) -> np.ndarray:
+    """Sample standard Brownian motion starting at 0 on the interval [0, t]"""
+    rng = rng_generator("brownian_motion_paths") if rng is None else rng
+    increments = max(samples - 1, 1)
+    paths = np.zeros((runs, samples))
+    paths[:, 1:] = np.cumsum(
+        np.sqrt(t / increments) * standard_normal(rng, (runs, samples - 1), antithetic), axis=1
+    )
+    return paths
+
+
+def brownian_excursion_paths(runs, samples, t=1.0, rng=None, antithetic=False) -> np.ndarray:
+    """Sample Brownian excursions on the interval [0, t]
+
+    > A Brownian excursion is a Brownian bridge from (0, 0) to (t, 0) which is conditioned to be non-negative on the interval [0, t].
+
+    Uses the Vervaat transform of a Brownian bridge, like `stochastic.processes.continuous.BrownianExcursion`,
+    i.e. the bridge is rotated to start and end at its minimum.
+    """
+    rng = rng_generator("brownian_excursion_paths") if rng is None else rng
+    increments = max(samples - 1, 1)
+    times = np.linspace(0, t, samples)
+    paths = brownian_motion_paths(runs, samples, t, rng, antithetic)
+    bridges = paths - times / t * paths[:, -1:]
+
+    index_minimum = np.argmin(bridges, axis=1)[:, None]
+    index = (index_minimum + np.arange(samples)) % increments
+    return np.take_along_axis(bridges, index, axis=1) - np.take_along_axis(bridges, index_minimum, axis=1)
+
+
+def geometric_brownian_motion_paths(
+    runs, samples, t=1.0, drift=0.0, volatility=1.0, initial=1.0, rng=None, antithetic=False
+) -> np.ndarray:
+    """Sample geometric Brownian motion on the interval [0, t], using the exact solution
+
+    The drift and volatility are expressed in the same unit of time as `t`.
+    """
+    rng = rng_generator("geometric_brownian_motion_paths") if rng is None else rng
+    times = np.linspace(0, t, samples)
+    paths = brownian_motion_paths(runs, samples, t, rng, antithetic)
+    return initial * np.exp((drift - volatility**2 / 2) * times + volatility * paths)
+
+
+def jump_diffusion_paths(
+    runs,
+    samples,
+    t=1.0,
+    drift=0.0,
+    volatility=1.0,
+    jump_rate=1.0,
+    jump_mean=0.0,
+    jump_std=0.1,
+    initial=1.0,
+    rng=None,
+    antithetic=False,
+) -> np.ndarray:
+    """Sample Merton jump-diffusion on the interval [0, t]
+
+    Geometric Brownian motion with log-normally distributed jumps arriving as a Poisson process,
+    compensated so that the expected return is the drift.
+    The drift, volatility and jump rate are expressed in the same unit of time as `t`.
+
+    With antithetic variates, both runs of a pair have the same jump arrivals, and negated normal variates.
+    """
+    rng = rng_generator("jump_diffusion_paths") if rng is None else rng
+    increments = max(samples - 1, 1)
+    step = t / increments
+    compensation = jump_rate * np.expm1(jump_mean + jump_std**2 / 2)
+
+    # The sum of a Poisson number of normally distributed jumps within each increment
+    if antithetic:
+        jumps = np.repeat(rng.poisson(jump_rate * step, size=((runs + 1) // 2, samples - 1)), 2, axis=0)[:runs]
+    else:
+        jumps = rng.poisson(jump_rate * step, size=(runs, samples - 1))
+    jump_sizes = jumps * jump_mean + np.sqrt(jumps) * jump_std * standard_normal(rng, (runs, samples - 1), antithetic)
+
+    log_returns = np.zeros((runs, samples))
+    log_returns[:, 1:] = np.cumsum(
+        (drift - volatility**2 / 2 - compensation) * step
+        + volatility * np.sqrt(step) * standard_normal(rng, (runs, samples - 1), antithetic)
+        + jump_sizes,
+        axis=1,
+    )
+    return initial * np.exp(log_returns)
+
+
+def mean_reverting_paths(
+    runs, samples, t=1.0, speed=1.0, mean=0.0, volatility=1.0, initial=0.0, rng=None, antithetic=False
+) -> np.ndarray:
+    """Sample an Ornstein-Uhlenbeck process reverting to `mean` on the interval [0, t], using the exact discretization
+
+    The speed of reversion and volatility are expressed in the same unit of time as `t`.
+    """
+    rng = rng_generator("mean_reverting_paths") if rng is None else rng
+    increments = max(samples - 1, 1)
+    step = t / increments
+    decay = np.exp(-speed * step)
+    scale = volatility * np.sqrt(-np.expm1(-2 * speed * step) / (2 * speed)) if speed else volatility * np.sqrt(step)
+    noise = scale * standard_normal(rng, (runs, samples - 1), antithetic)
+
+    paths = np.empty((runs, samples))
+    paths[:, 0] = initial
+    for index in range(1, samples):
+        paths[:, index] = mean + (paths[:, index - 1] - mean) * decay + noise[:, index - 1]
+    return paths
+
+
+def _rescale_excursions(excursions, minimum):
+    # Scale each excursion to range from `minimum` to twice the minimum
+    maximum = excursions.max(axis=1, keepdims=True)
+    return minimum + excursions / maximum * minimum
+
+
+def create_eth_price_paths(
+    runs=1,
+    timesteps=simulation.TIMESTEPS,
+    dt=simulation.DELTA_TIME,
+    rng=None,
+    minimum_eth_price=1500,
+    antithetic=False,
+) -> np.ndarray:
+    """Configure environmental ETH price realizations, as Brownian excursions between the minimum price and twice the minimum price"""
+    rng = rng_generator("create_eth_price_paths") if rng is None else rng
+    excursions = brownian_excursion_paths(runs, sample_count(timesteps, dt), t=(timesteps * dt), rng=rng, antithetic=antithetic)
+    return _rescale_excursions(excursions, minimum_eth_price)
+
+
+def create_floor_price_paths(
+    runs=1,
+    timesteps=simulation.TIMESTEPS,
+    dt=simulation.DELTA_TIME,
+    rng=None,
+    minimum_floor_price=3,
+    antithetic=False,
+) -> np.ndarray:
+    """Configure environmental floor price realizations, as Brownian excursions between the minimum price and twice the minimum price"""
+    rng = rng_generator("create_floor_price_paths") if rng is None else rng
+    excursions = brownian_excursion_paths(runs, sample_count(timesteps, dt), t=(timesteps * dt), rng=rng, antithetic=antithetic)
+    return _rescale_excursions(excursions, minimum_floor_price)
+
+
+def create_validator_paths(
+    runs=1,
+    timesteps=simulation.TIMESTEPS,
+    dt=simulation.DELTA_TIME,
+    rng=None,
+    validator_adoption_rate=4,
+) -> np.ndarray:
+    """Configure environmental validator staking realizations
+
+    > A Poisson process with rate lambda is a count of occurrences of i.i.d. exponential random variables with mean 1/lambda.
+
+    Each sample is the whole number of epochs between consecutive occurrences,
+    i.e. an exponentially distributed inter-arrival time with mean `validator_adoption_rate`.
+    """
+    rng = rng_generator("create_validator_paths") if rng is None else rng
+    return np.floor(rng.exponential(validator_adoption_rate, (runs, sample_count(timesteps, dt))))
+
+
+def create_historical_eth_price_paths(
+    runs=1,
+    timesteps=simulation.TIMESTEPS,
+    dt=simulation.DELTA_TIME,
+    rng=None,
+    method="bootstrap",
+    block_length=24,
+    initial_eth_price=None,
+) -> np.ndarray:
+    """Configure environmental ETH price realizations from the historical hourly ETH price series
+
+    Methods:
+        "replay": Each run replays a randomly selected window of the historical series
+        "bootstrap": Each run concatenates randomly selected blocks of `block_length` consecutive historical hourly returns,
+            preserving short-term autocorrelation and volatility clustering within each block
+
+    Unless `initial_eth_price` is given, bootstrapped paths start from the price at the start of their first block,
+    otherwise all paths are scaled to start from the initial price.
+
+    Returns:
+        np.ndarray: Hourly prices of shape (runs, hours + 1), see `hour_count(...)`
+    """
+    rng = rng_generator("create_historical_eth_price_paths") if rng is None else rng
+    close = load_eth_hourly_prices().close
+    hours = hour_count(timesteps, dt)
+
+    if method == "replay":
+        if hours >= len(close):
+            raise Exception(f"Historical series of {len(close)} hours is too short to replay {hours} hours")
+        offsets = rng.integers(0, len(close) - hours, runs)
+        paths = close[offsets[:, None] + np.arange(hours + 1)]
+    elif method == "bootstrap":
+        log_returns = np.diff(np.log(close))
+        blocks = -(-hours // block_length)
+        starts = rng.integers(0, len(log_returns) - block_length + 1, (runs, blocks))
+        index = (starts[:, :, None] + np.arange(block_length)).reshape(runs, -1)[:, :hours]
+        paths = np.empty((runs, hours + 1))
+        paths[:, 0] = close[starts[:, 0]]
+        paths[:, 1:] = paths[:, :1] * np.exp(np.cumsum(log_returns[index], axis=1))
+    else:
+        raise Exception(f"Invalid method {method}, expected one of ['replay', 'bootstrap']")
+
+    if initial_eth_price is not None:
+        paths = paths / paths[:, :1] * initial_eth_price
+
+    return paths
+
+
+def hour_count(timesteps=simulation.TIMESTEPS, dt=simulation.DELTA_TIME) -> int:
+    """The number of whole or partial hours spanned by `timesteps * dt` epochs"""
+    return int(np.ceil(timesteps * dt * constants.seconds_per_epoch / 3600))
+
+
+def resample_per_epoch(
+    realizations: np.ndarray,
+    seconds_per_sample,
+    timesteps=simulation.TIMESTEPS,
+    dt=simulation.DELTA_TIME,
+) -> np.ndarray:
+    """Resample realizations with one sample every `seconds_per_sample` to one sample per epoch
+
+    Each epoch takes the sample of the period containing it, as `SampledProcess(realizations, seconds_per_sample)` does.
+
+    Returns:
+        np.ndarray: Realizations of shape (runs, timesteps * dt + 1), see `sample_count(...)`
+    """
+    epochs = np.arange(sample_count(timesteps, dt))
+    return realizations[:, epochs * constants.seconds_per_epoch // seconds_per_sample]
+
+
+def create_historical_eth_price_process(
+    runs=1,
+    timesteps=simulation.TIMESTEPS,
+    dt=simulation.DELTA_TIME,
+    rng=None,
+    **kwargs,
+) -> typing.Callable[[Run, float], float]:
+    """Configure an environmental ETH price process replaying or bootstrapping historical hourly ETH prices
+
+    The hourly paths of all runs are generated once, and the process returns the price of the hour containing the epoch,
+    so each `(run, timestep * dt)` lookup is O(1).
+    See `create_historical_eth_price_paths(...)` for the available keyword arguments.
+    """
+    rng = rng_generator("create_historical_eth_price_process") if rng is None else rng
+    paths = create_historical_eth_price_paths(runs, timesteps, dt, rng, **kwargs)
+    return SampledProcess(paths, seconds_per_sample=3600)
 
 
 def create_eth_price_process(
     timesteps=simulation.TIMESTEPS,
     dt=simulation.DELTA_TIME,
-    rng=np.random.default_rng(1),
+    rng=None,
     minimum_eth_price=1500,
 ):
     """Configure environmental ETH price process
@@ -21,41 +306,30 @@ def create_eth_price_process(
 
     See https://stochastic.readthedocs.io/en/latest/continuous.html
     """
-    process = processes.continuous.BrownianExcursion(t=(timesteps * dt), rng=rng)
-    samples = process.sample(timesteps * dt + 1)
-    maximum_eth_price = max(samples)
-    samples = [
-        minimum_eth_price + eth_price_sample / maximum_eth_price * minimum_eth_price
-        for eth_price_sample in samples
-    ]
-    return samples
+    rng = rng_generator("create_eth_price_process") if rng is None else rng
+    return create_eth_price_paths(1, timesteps, dt, rng, minimum_eth_price)[0]
+
 
 def create_floor_price_process(
     timesteps=simulation.TIMESTEPS,
     dt=simulation.DELTA_TIME,
-    rng=np.random.default_rng(1),
+    rng=None,
     minimum_floor_price=3,
 ):
-    """Configure environmental ETH price process
+    """Configure environmental floor price process
 
     > A Brownian excursion is a Brownian bridge from (0, 0) to (t, 0) which is conditioned to be non-negative on the interval [0, t].
 
     See https://stochastic.readthedocs.io/en/latest/continuous.html
     """
-    process = processes.continuous.BrownianExcursion(t=(timesteps * dt), rng=rng)
-    samples = process.sample(timesteps * dt + 1)
-    maximum_floor_price = max(samples)
-    samples = [
-        minimum_floor_price + floor_price_sample / maximum_floor_price * minimum_floor_price
-        for floor_price_sample in samples
-    ]
-    return samples
+    rng = rng_generator("create_floor_price_process") if rng is None else rng
+    return create_floor_price_paths(1, timesteps, dt, rng, minimum_floor_price)[0]
 
 
 def create_validator_process(
     timesteps=simulation.TIMESTEPS,
     dt=simulation.DELTA_TIME,
-    rng=np.random.default_rng(1),
+    rng=None,
     validator_adoption_rate=4,
 ):
     """Configure environmental validator staking process
@@ -64,13 +338,8 @@ def create_validator_process(
 
     See https://stochastic.readthedocs.io/en/latest/continuous.html
     """
-    process = processes.continuous.PoissonProcess(
-        rate=1 / validator_adoption_rate, rng=rng
-    )
-    samples = process.sample(timesteps * dt + 1)
-    samples = np.diff(samples)
-    samples = [int(sample) for sample in samples]
-    return samples
+    rng = rng_generator("create_validator_process") if rng is None else rng
+    return create_validator_paths(1, timesteps, dt, rng, validator_adoption_rate)[0].astype(int)
 
 
 def create_stochastic_process_realizations(
@@ -78,29 +347,119 @@ def create_stochastic_process_realizations(
     timesteps=simulation.TIMESTEPS,
     dt=simulation.DELTA_TIME,
     runs=5,
-):
+    rng=None,
+    stream=None,
+    **kwargs,
+) -> np.ndarray:
     """Create stochastic process realizations
 
-    Using the stochastic processes defined in `processes` module, create random number generator (RNG) seeds,
-    and use RNG to pre-generate samples for number of simulation timesteps.
+    Using the batch generators defined in this module, pre-generate samples of all runs for the number of simulation timesteps.
+    Only the requested process is generated.
+
+    Unless an RNG is given, the random numbers are drawn from the deterministic stream named `stream`,
+    by default the name of the process (see `model.random_streams`). Realizations of the same process
+    with the same stream therefore use common random numbers, while independent realizations need distinct streams,
+    e.g. `stream="eth_price_samples/subset=1"`.
+
+    The price processes "gbm_price_samples", "jump_diffusion_price_samples" and "mean_reverting_price_samples"
+    take annualized parameters as keyword arguments, see the corresponding `*_paths(...)` generator.
+    The price processes other than "historical_eth_price_samples" take `antithetic=True` for antithetic variates.
+
+    The historical hourly ETH prices of "historical_eth_price_samples" are resampled to one sample per epoch,
+    see `resample_per_epoch(...)`, so that all realizations can be sampled by `create_sampled_process(...)`.
+
+    Returns:
+        np.ndarray: Realizations of shape (runs, timesteps * dt + 1)
     """
+    samples = sample_count(timesteps, dt)
+    years = (samples - 1) / constants.epochs_per_year
 
     switcher = {
-        "eth_price_samples": [
-            create_eth_price_process(timesteps=timesteps, dt=dt, rng=rng_generator())
-            for _ in range(runs)
-        ],
-        "floor_price_samples": [
-            create_floor_price_process(timesteps=timesteps, dt=dt, rng=rng_generator())
-            for _ in range(runs)
-        ],
-        "validator_samples": [
-            create_validator_process(timesteps=timesteps, dt=dt, rng=rng_generator())
-            for _ in range(runs)
-        ],
-        "validator_uptime_samples": [
-            rng_generator().uniform(0.96, 0.99, timesteps * dt + 1) for _ in range(runs)
-        ],
+        "eth_price_samples": lambda rng: create_eth_price_paths(runs, timesteps, dt, rng, **kwargs),
+        "floor_price_samples": lambda rng: create_floor_price_paths(runs, timesteps, dt, rng, **kwargs),
+        "validator_samples": lambda rng: create_validator_paths(runs, timesteps, dt, rng, **kwargs),
+        "validator_uptime_samples": lambda rng: rng.uniform(0.96, 0.99, (runs, samples)),
+        "gbm_price_samples": lambda rng: geometric_brownian_motion_paths(runs, samples, years, rng=rng, **kwargs),
+        "jump_diffusion_price_samples": lambda rng: jump_diffusion_paths(runs, samples, years, rng=rng, **kwargs),
+        "mean_reverting_price_samples": lambda rng: mean_reverting_paths(runs, samples, years, rng=rng, **kwargs),
+        "historical_eth_price_samples": lambda rng: resample_per_epoch(
+            create_historical_eth_price_paths(runs, timesteps, dt, rng, **kwargs), 3600, timesteps, dt
+        ),
     }
 
-    return switcher.get(process, "Invalid Process")
+    if process not in switcher:
+        raise Exception(f"Invalid process {process}, expected one of {list(switcher)}")
+
+    return switcher[process](rng_generator(stream or process) if rng is None else rng)
+
+
+class SampledProcess:
+    """An environmental process sampling realizations of shape (runs, samples), see `create_sampled_process(...)`
+
+    A class rather than a closure, so that the process can be pickled by parallel workers,
+    and its realizations shared with them (see `experiments.shared_memory`).
+    The realizations are read-only, and deep copies of the process share them, as radCAD deep-copies
+    the System Parameters of every run.
+
+    Args:
+        realizations (np.ndarray): Realizations of shape (runs, samples)
+        seconds_per_sample (int): Time between samples, by default one sample per epoch
+    """
+
+    vectorized = True
+
+    def __init__(self, realizations: np.ndarray, seconds_per_sample=constants.seconds_per_epoch):
+        if realizations.flags.writeable:
+            realizations.flags.writeable = False
+        self.realizations = realizations
+        self.seconds_per_sample = seconds_per_sample
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __call__(self, run, epoch):
+        if self.seconds_per_sample == constants.seconds_per_epoch:
+            index = np.asarray(epoch).astype(int)
+        else:
+            index = (np.asarray(epoch) * constants.seconds_per_epoch // self.seconds_per_sample).astype(int)
+        return self.realizations[np.asarray(run) - 1, index]
+
+
+def create_sampled_process(realizations: np.ndarray) -> typing.Callable[[Run, float], float]:
+    """Create an environmental process System Parameter from realizations of shape (runs, samples)
+
+    The process is called as `process(run, timestep * dt)`, and returns the sample of the run at that epoch.
+    It is flagged as `vectorized`, so that the vectorized engine can look up all runs and timesteps at once.
+    """
+    return SampledProcess(np.asarray(realizations, dtype=float))
+
+
+def create_common_processes(
+    process,
+    parameter_sets: typing.List[dict],
+    timesteps=simulation.TIMESTEPS,
+    dt=simulation.DELTA_TIME,
+    runs=5,
+    seed=1,
+    **kwargs,
+) -> typing.List[typing.Callable[[Run, float], float]]:
+    """Create a sampled process for each set of process parameters, using common random numbers
+
+    The realizations of every parameter set are drawn from the same random numbers, e.g. when sweeping the volatility:
+
+        eth_price_process = create_common_processes(
+            "gbm_price_samples", [{"volatility": 0.5}, {"volatility": 1.0}], runs=MONTE_CARLO_RUNS, initial=2000,
+        )
+
+    The random numbers are drawn from the deterministic stream of the process and `seed` (see `model.random_streams`),
+    so different seeds give independent realizations.
+    See `create_stochastic_process_realizations(...)` for the available processes and keyword arguments.
+    """
+    return [
+        create_sampled_process(
+            create_stochastic_process_realizations(
+                process, timesteps, dt, runs, rng=rng_generator(process, seed), **kwargs, **parameters
+            )
+        )
+        for parameters in parameter_sets
+    ]
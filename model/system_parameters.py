@@ -12,7 +12,7 @@ By using a dataclass to represent the System Parameters:
 import logging
 import numpy as np
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, date
 
 import model.constants as constants
 import experiments.simulation_configuration as simulation
@@ -25,6 +25,7 @@ from model.types import (
     Gwei_per_Gas,
     ETH,
     USD_per_epoch,
+    USD_per_ETH,
     Percentage_per_epoch,
     ValidatorEnvironment,
     List,
@@ -33,6 +34,8 @@ from model.types import (
     Stage,
 )
 from model.utils import default
+from model.parts.automated_market_maker import no_orders
+from model.parts.agent_system import no_agents
 from data.historical_values import (
     eth_price_mean,
     eth_block_rewards_mean,
@@ -87,6 +90,10 @@ from data.historical_values import (
 # ]
 
 
+def mean_eth_price_process(_run, _timestep) -> USD_per_ETH:
+    """The average ETH price over the last 12 months at every epoch, a module-level function so that it can be pickled"""
+    return eth_price_mean
+
 
 @dataclass
 class Parameters:
@@ -113,20 +120,36 @@ class Parameters:
 
     stage: List[Stage] = default([Stage.ALL])
     """
-    Which stage or stages of the network upgrade process to simulate.
+    Which stage or stages of the LBP process to simulate.
 
     By default set to ALL stage, which for time-domain analyses simulates
-    the transition from the current network network upgrade stage at today's date onwards
-    (i.e. the transition from the Beacon Chain Stage,
-    to the EIP-1559 Stage, to the Proof-of-Stake Stage),
-    whereas phase-space analyses simulate the current network upgrade stage
-    providing a "snapshot" of the system state at this time.
+    the transition from before the LBP, to the LBP, to after the LBP,
+    at the `date_lbp_start` and `date_lbp_end` dates,
+    whereas selecting a single stage simulates that stage for the whole simulation.
 
-    See model.types.Stage Enum for further documentation.
+    See model.types.Stage Enum and model.stage_schedules for further documentation.
     """
     #
-    date_start: List[datetime] = default([datetime.now()])
-    """Start date for simulation as Python datetime"""
+    date_start: List[datetime] = default([datetime.combine(date.today(), datetime.min.time())])
+    """
+    Start date for simulation as Python datetime.
+
+    By default the start of the current day, so that simulations and their cached results are reproducible within a day.
+    """
+
+    date_lbp_start: List[datetime] = default([None])
+    """
+    LBP start date as Python datetime, before which the ALL stage is in the PRE_LBP stage.
+
+    By default None, i.e. the LBP starts on the first timestep.
+    """
+
+    date_lbp_end: List[datetime] = default([None])
+    """
+    LBP end date as Python datetime, after which the ALL stage is in the POST_LBP stage.
+
+    By default None, i.e. the LBP does not end within the simulation.
+    """
 
     # date_eip1559: List[datetime] = default(
     #     [datetime.strptime("2021/08/04", "%Y/%m/%d")]
@@ -142,7 +165,7 @@ class Parameters:
 
     # Environmental processes
     eth_price_process: List[Callable[[Run, Timestep], ETH]] = default(
-        [lambda _run, _timestep: eth_price_mean]
+        [mean_eth_price_process]
     )
     """
     A process that returns the ETH spot price at each epoch.
@@ -150,11 +173,43 @@ class Parameters:
     By default set to average ETH price over the last 12 months from Etherscan.
     """
 
-    weight_x_start: List[Percentage] = default(0.95)
-    weight_x_end: List[Percentage] = default(0.30)
-    lbp_length: List[int]      = default(100)
-    lbp_initial_x: List[float] = default(100)
-    lbp_initial_y: List[float] = default(10000)
+    weight_x_start: List[Percentage] = default([0.95])
+    weight_x_end: List[Percentage] = default([0.30])
+    lbp_length: List[int]      = default([100])
+    weight_curve: List[str] = default(["linear"])
+    """
+    The decay curve the weight of token X follows from `weight_x_start` to `weight_x_end` over `lbp_length` timesteps.
+
+    Either the name of a curve ("linear", "exponential", "stepped"), or a custom curve
+    such as `model.weight_schedules.exponential_curve(rate=2)`, see model.weight_schedules for further documentation.
+    """
+    lbp_initial_x: List[float] = default([100])
+    lbp_initial_y: List[float] = default([10000])
+
+    lbp_order_process: List[Callable[[Run, Timestep], np.ndarray]] = default([no_orders])
+    """
+    A process that returns the batch of orders submitted to the LBP at each epoch,
+    as a structured array with dtype `model.parts.automated_market_maker.ORDER_DTYPE`.
+
+    By default no orders are submitted.
+    """
+    lbp_swap_fee: List[Percentage] = default([0.01])
+    """The fee charged on the amount paid into the LBP by each swap, retained by the pool"""
+    lbp_netted_swaps: List[bool] = default([False])
+    """
+    Whether to net opposing orders of a batch against each other and only swap the residual against the pool,
+    rather than executing each order sequentially.
+    """
+
+    agent_population_process: List[Callable[[Run], np.ndarray]] = default([no_agents])
+    """
+    A process that returns the population of LBP participants for each run,
+    as a structured array with dtype `model.parts.agent_system.AGENT_DTYPE`.
+
+    For example `model.parts.agent_system.create_agent_population_process(agent_count=100_000)`.
+
+    By default there are no agents.
+    """
 
 
 
@@ -7,7 +7,7 @@ import sys
 
 # See https://docs.python.org/3/library/dataclasses.html
 from dataclasses import dataclass, field
-from enum import Enum
+from enum import Enum, IntEnum
 
 # If Python version is greater than equal to 3.8, import from typing module
 # Else also import from typing_extensions module
@@ -38,6 +38,23 @@ class Stage(Enum):
     """Transition through all stages"""
     LBP = 2
     """LBP enabled, seeded with liquidity and active"""
+    PRE_LBP = 3
+    """Before the LBP start date"""
+    POST_LBP = 4
+    """After the LBP end date, the LBP weights, supply and prices are held constant"""
+
+
+class AgentStrategy(IntEnum):
+    """Trading strategies of LBP participants, see model.parts.agent_system"""
+
+    ARBITRAGEUR = 0
+    """Trades the LBP towards the agent's valuation of token Y"""
+    BIDDER = 1
+    """Patiently waits to buy token Y at or below the agent's reservation price"""
+    SELLER = 2
+    """Sells token Y holdings at or above the agent's reservation price"""
+    NOISE = 3
+    """Bots trading a random direction and amount"""
 
 # US Dollar types
 USD = float
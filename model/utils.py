@@ -34,6 +34,115 @@ def update_from_signal(state_variable, signal_key=None):
     return partial(_update_from_signal, state_variable, signal_key)
 
 
+def _compile_block(block):
+    """Split the State Update Functions of a block into those updating directly from a Policy Signal, and the rest"""
+    signal_variables = []
+    functions = []
+    for (key, function) in block["variables"].items():
+        if isinstance(function, partial) and function.func is _update_from_signal:
+            signal_variables.append((key, function.args[1]))
+        else:
+            functions.append(function)
+    return list(block["policies"].values()), signal_variables, functions
+
+
+def _fused_policy(compiled_blocks, substeps, variables, params, substep, state_history, previous_state):
+    state = previous_state.copy()
+    for ((policies, signal_variables, functions), block_substep) in zip(compiled_blocks, substeps):
+        if len(policies) == 1:
+            signals = policies[0](params, block_substep, state_history, state)
+        else:
+            signals = {}
+            for policy in policies:
+                for (key, value) in policy(params, block_substep, state_history, state).items():
+                    signals[key] = signals[key] + value if signals.get(key, None) else value
+
+        # State Update Functions of a block all receive the state before the block is applied
+        updates = [function(params, block_substep, state_history, state, signals) for function in functions]
+        for (key, signal_key) in signal_variables:
+            state[key] = signals[signal_key]
+        state.update(updates)
+
+        # radCAD advances the timestep after the first substep of each timestep
+        if substep == 0:
+            state["timestep"] = previous_state["timestep"] + 1
+    return {key: state[key] for key in variables}
+
+
+def fuse_state_update_blocks(state_update_blocks):
+    """Fuse consecutive State Update Blocks into a single block, i.e. a single radCAD substep
+
+    Each fused block has one Policy that applies the original blocks in order to a copy of the state,
+    and one State Update Function per State Variable updated from its final value,
+    saving most of the per-substep overhead of radCAD.
+
+    The results are identical for the final substep of each timestep, i.e. with `drop_substeps=True`,
+    apart from the `substep` column. Policies and State Update Functions receive the substep of the original block,
+    but the `state_history` of the fused substeps, so blocks that depend on intermediate substeps
+    in `state_history` should set `"fusible": False` to be left unfused.
+    """
+    fused_blocks = []
+    group = []
+    for (substep, block) in enumerate(state_update_blocks + [None]):
+        if block is not None and block.get("fusible", True):
+            group.append((substep, block))
+            continue
+
+        if len(group) == 1:
+            fused_blocks.append(group[0][1])
+        elif group:
+            substeps, blocks = zip(*group)
+            variables = list(dict.fromkeys(key for block in blocks for key in block["variables"]))
+            fused_blocks.append({
+                "description": "Fused: " + "; ".join(" ".join(block.get("description", "").split()) for block in blocks),
+                "policies": {
+                    "policy_fused": partial(
+                        _fused_policy, [_compile_block(block) for block in blocks], substeps, variables
+                    ),
+                },
+                "variables": {
+                    key: update_from_signal(key) for key in variables
+                },
+            })
+        group = []
+        if block is not None:
+            fused_blocks.append(block)
+
+    return fused_blocks
+
+
+def check_fusion(executable, rtol=0):
+    """Cross-check the fused State Update Blocks against the original State Update Blocks
+
+    Runs a copy of the executable with the State Update Blocks of each simulation as-is and fused,
+    using the radCAD engine with `drop_substeps=True`, and raises an AssertionError if the results differ
+    in any column other than `substep`, exactly unless a relative tolerance `rtol` is given.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: The original and fused results
+    """
+    import pandas as pd
+    from radcad import Engine, Backend
+
+    results = []
+    for fused in [False, True]:
+        _executable = copy.deepcopy(executable)
+        _executable.engine = Engine(backend=Backend.SINGLE_PROCESS, deepcopy=False, drop_substeps=True)
+        simulations = getattr(_executable, "simulations", [_executable])
+        for simulation in simulations:
+            if fused:
+                simulation.model.state_update_blocks = fuse_state_update_blocks(
+                    simulation.model.state_update_blocks
+                )
+        _executable.run()
+        results.append(pd.DataFrame(_executable.results).drop(columns=["substep"]))
+
+    df, df_fused = results
+    pd.testing.assert_frame_equal(df, df_fused, check_exact=(rtol == 0), rtol=(rtol or 1e-5))
+
+    return df, df_fused
+
+
 def local_variables(_locals):
     return {
         key: _locals[key]
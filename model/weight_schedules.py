@@ -0,0 +1,82 @@
+"""
+Precomputed LBP weight schedules
+
+The weight of token X shifts from `weight_x_start` to `weight_x_end` over `lbp_length` timesteps,
+following a decay curve. Each trajectory is computed once in closed form and cached,
+so that all runs of a parameter subset share the same read-only table, looked up by LBP timestep.
+
+A decay curve maps the progress of the LBP (from 0 to 1) to the fraction (from 0 to 1)
+of the total weight shift that has been applied.
+"""
+
+import numpy as np
+from functools import lru_cache
+
+
+def linear_curve(progress):
+    """Shift the weight by the same amount each timestep"""
+    return progress
+
+
+def exponential_curve(rate=5.0):
+    """Create an exponential decay curve
+
+    A positive rate front-loads the weight shift, a negative rate back-loads it.
+    """
+    if rate == 0:
+        return linear_curve
+
+    def curve(progress):
+        return np.expm1(-rate * progress) / np.expm1(-rate)
+
+    return curve
+
+
+def stepped_curve(steps=10):
+    """Create a curve that shifts the weight in a number of discrete, equally sized steps"""
+
+    def curve(progress):
+        return np.floor(progress * steps) / steps
+
+    return curve
+
+
+# Decay curves that can be selected by name using the `weight_curve` System Parameter
+curves = {
+    "linear": linear_curve,
+    "exponential": exponential_curve(),
+    "stepped": stepped_curve(),
+}
+
+
+@lru_cache(maxsize=None)
+def weight_schedule(weight_x_start, weight_x_end, lbp_length, curve="linear") -> np.ndarray:
+    """Get the weight of token X for each LBP timestep
+
+    Args:
+        weight_x_start (Percentage): Weight of token X at the start of the LBP
+        weight_x_end (Percentage): Weight of token X at the end of the LBP
+        lbp_length (int): Number of timesteps over which the weight is shifted
+        curve (str | Callable): Name of a curve in `curves`, or a custom curve
+
+    Returns:
+        np.ndarray: A read-only array of length `lbp_length + 1`, indexed by the number of timesteps since the LBP started
+    """
+    if isinstance(curve, str):
+        if curve not in curves:
+            raise Exception(f"Invalid weight curve {curve}, expected one of {list(curves)}")
+        curve = curves[curve]
+
+    progress = np.arange(lbp_length + 1) / max(lbp_length, 1)
+    fraction = np.clip(np.asarray(curve(progress), dtype=float), 0, 1)
+    schedule = weight_x_start + (weight_x_end - weight_x_start) * fraction
+    schedule[0] = weight_x_start
+    schedule[-1] = weight_x_end
+    schedule.setflags(write=False)
+
+    return schedule
+
+
+def lookup_weight(schedule: np.ndarray, lbp_timestep):
+    """Look up the weight of token X for one or more LBP timesteps, holding the final weight after the LBP"""
+    return schedule[np.clip(lbp_timestep, 0, len(schedule) - 1)]
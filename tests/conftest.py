@@ -0,0 +1,4 @@
+import os
+
+# Tests never wait on external APIs for the initial state, see data.initial_state
+os.environ.setdefault("MODEL_OFFLINE", "1")
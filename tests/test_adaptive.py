@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from radcad import Backend, Engine, Model, Simulation
+
+from model.system_parameters import parameters
+from model.state_variables import initial_state
+from model.state_update_blocks import state_update_blocks
+from experiments.adaptive import StoppingRule, run_adaptive
+
+
+MAX_RUNS = 60
+# An ETH price per run, where the run is numbered from 1 across batches
+PRICES = 2_000 + 250 * np.random.default_rng(1).standard_normal(MAX_RUNS + 1)
+
+
+def constant_eth_price(run, epoch):
+    return 2_000.0
+
+
+def noisy_eth_price(run, epoch):
+    return PRICES[run]
+
+
+def failing_eth_price(run, epoch):
+    if run % 4 == 0:
+        raise Exception(f"Run {run} failed")
+    return PRICES[run]
+
+
+def final_eth_price(df, params) -> float:
+    return df["eth_price"].iloc[-1]
+
+
+def create_simulation(eth_price_processes) -> Simulation:
+    model = Model(
+        initial_state=initial_state,
+        state_update_blocks=state_update_blocks,
+        params={**parameters, "eth_price_process": eth_price_processes},
+    )
+    simulation = Simulation(model=model, timesteps=4, runs=1)
+    simulation.engine = Engine(backend=Backend.SINGLE_PROCESS, drop_substeps=True)
+    return simulation
+
+
+def test_stopping_rule():
+    rule = StoppingRule(relative_precision=0.01, min_runs=10, max_runs=100)
+    assert rule.half_width(np.ones(1)) == np.inf
+    assert rule.half_width(np.array([1.0, 3.0])) == pytest.approx(1.959964, rel=1e-6)
+    # Constant metrics converge once the minimum number of runs is reached
+    assert not rule.converged(np.ones(9))
+    assert rule.converged(np.ones(10))
+    # Noisy metrics converge once the half-width is within the relative or absolute precision of the mean
+    values = 100 + 10 * np.random.default_rng(1).standard_normal(1_000)
+    assert not rule.converged(values[:10])
+    assert rule.converged(values)
+    assert StoppingRule(absolute_precision=1.0, min_runs=10).converged(values[:10])
+
+
+def test_noisy_subsets_run_until_converged():
+    simulation = create_simulation([constant_eth_price, noisy_eth_price])
+    rule = StoppingRule(relative_precision=0.05, min_runs=10, batch_size=5, max_runs=MAX_RUNS)
+    df, exceptions, summary = run_adaptive(simulation, {"final_eth_price": final_eth_price}, rule)
+
+    # The constant subset stops after the first batch, the noisy subset runs in further batches
+    assert summary.loc[0, "runs"] == 10 and summary.loc[0, "converged"]
+    assert summary.loc[1, "runs"] > 10 and summary.loc[1, "converged"]
+    noisy = PRICES[1:summary.loc[1, "runs"] + 1]
+    assert summary.loc[1, "final_eth_price_mean"] == pytest.approx(noisy.mean())
+    assert summary.loc[1, "final_eth_price_half_width"] == pytest.approx(rule.half_width(noisy))
+    assert summary.loc[1, "final_eth_price_half_width"] <= 0.05 * noisy.mean()
+
+    # Runs are numbered consecutively across batches, each exactly once per subset
+    for subset in [0, 1]:
+        runs = df.loc[df["subset"] == subset, "run"].unique()
+        np.testing.assert_array_equal(runs, np.arange(1, summary.loc[subset, "runs"] + 1))
+    assert len(exceptions) == summary["runs"].sum()
+
+
+def test_failed_runs_are_counted_but_excluded():
+    simulation = create_simulation([failing_eth_price])
+    rule = StoppingRule(relative_precision=0.0, min_runs=10, batch_size=5, max_runs=20)
+    df, exceptions, summary = run_adaptive(simulation, {"final_eth_price": final_eth_price}, rule)
+
+    failed = [exception["run"] + 1 for exception in exceptions if exception["exception"] is not None]
+    assert failed == [4, 8, 12, 16, 20]
+    # Every attempted run is counted, and the next batch continues after the failed runs
+    assert summary.loc[0, "runs"] == 20
+    assert [exception["run"] + 1 for exception in exceptions] == list(range(1, 21))
+    succeeded = [run for run in range(1, 21) if run % 4]
+    assert summary.loc[0, "final_eth_price_mean"] == pytest.approx(PRICES[succeeded].mean())
+    assert not summary.loc[0, "converged"]
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+import model.parts.automated_market_maker as amm
+from model.parts.agent_system import (
+    AGENT_DTYPE,
+    create_agent_population,
+    create_agent_population_process,
+    decide_orders,
+    policy_agent_trading,
+    settle_orders,
+)
+from model.types import AgentStrategy, Stage
+
+
+ETH_PRICE = 2_000.0
+POOL = amm.WeightedPool(balance_x=100.0, balance_y=50_000.0, weight_x=0.5)
+# The LBP price of token Y in USD
+PRICE_USD = ETH_PRICE * POOL.price_y_in_x
+
+
+def create_agents(strategy, reservation_price, count=10) -> np.ndarray:
+    agents = np.empty(count, dtype=AGENT_DTYPE)
+    agents["strategy"] = strategy
+    agents["budget_x"] = np.linspace(0.1, 1.0, count)
+    agents["holdings_y"] = np.linspace(10.0, 100.0, count)
+    agents["reservation_price"] = reservation_price
+    agents["activity"] = 1.0
+    return agents
+
+
+def test_strategies_order_direction():
+    rng = np.random.default_rng(1)
+
+    # Bidders pay their whole budget of token X for token Y at or below their reservation price, but not above it
+    agents = create_agents(AgentStrategy.BIDDER, PRICE_USD * 1.1)
+    orders, index = decide_orders(agents, POOL, ETH_PRICE, rng)
+    assert not orders["buy_x"].any()
+    np.testing.assert_array_equal(orders["amount"], agents["budget_x"][index])
+    assert len(decide_orders(create_agents(AgentStrategy.BIDDER, PRICE_USD * 0.9), POOL, ETH_PRICE, rng)[0]) == 0
+
+    # Sellers sell all their token Y for token X at or above their reservation price
+    agents = create_agents(AgentStrategy.SELLER, PRICE_USD * 0.9)
+    orders, index = decide_orders(agents, POOL, ETH_PRICE, rng)
+    assert orders["buy_x"].all()
+    np.testing.assert_array_equal(orders["amount"], agents["holdings_y"][index])
+    assert len(decide_orders(create_agents(AgentStrategy.SELLER, PRICE_USD * 1.1), POOL, ETH_PRICE, rng)[0]) == 0
+
+    # Arbitrageurs buy token Y when it is underpriced and sell it when it is overpriced, moving the price to their valuation
+    for valuation, buy_x in [(PRICE_USD * 1.2, False), (PRICE_USD * 0.8, True)]:
+        agents = create_agents(AgentStrategy.ARBITRAGEUR, valuation, count=1)
+        agents["budget_x"] = agents["holdings_y"] = 1e9
+        orders, _ = decide_orders(agents, POOL, ETH_PRICE, rng)
+        assert orders["buy_x"].tolist() == [buy_x]
+        pool, _ = POOL.swap(orders)
+        assert ETH_PRICE * pool.price_y_in_x == pytest.approx(valuation)
+
+    # Bots trade at most a tenth of their budget or holdings, in both directions
+    agents = create_agents(AgentStrategy.NOISE, PRICE_USD, count=1_000)
+    orders, index = decide_orders(agents, POOL, ETH_PRICE, rng)
+    assert 0 < orders["buy_x"].mean() < 1
+    limit = np.where(orders["buy_x"], agents["holdings_y"][index], agents["budget_x"][index]) * 0.1
+    assert np.all(orders["amount"] <= limit)
+
+    # Inactive agents never trade
+    agents = create_agents(AgentStrategy.SELLER, 0.0)
+    agents["activity"] = 0.0
+    assert len(decide_orders(agents, POOL, ETH_PRICE, rng)[0]) == 0
+
+
+@pytest.mark.parametrize("netted", [False, True])
+def test_settlement_conserves_tokens(netted):
+    agents = create_agent_population(5_000, np.random.default_rng(1), reservation_price_mean=PRICE_USD)
+    orders, index = decide_orders(agents, POOL, ETH_PRICE, np.random.default_rng(2))
+    assert orders["buy_x"].any() and not orders["buy_x"].all()
+
+    pool, result = POOL.swap(orders, 0.01, netted)
+    total_x, total_y = agents["budget_x"].sum() + POOL.balance_x, agents["holdings_y"].sum() + POOL.balance_y
+    settle_orders(agents, index, orders, result)
+    assert agents["budget_x"].sum() + pool.balance_x == pytest.approx(total_x, rel=1e-12)
+    assert agents["holdings_y"].sum() + pool.balance_y == pytest.approx(total_y, rel=1e-12)
+    assert np.all(agents["budget_x"] >= -1e-9) and np.all(agents["holdings_y"] >= -1e-9)
+
+
+def test_policy_conserves_tokens():
+    params = {
+        "agent_population_process": create_agent_population_process(2_000, reservation_price_mean=PRICE_USD),
+        "lbp_swap_fee": 0.01,
+        "lbp_netted_swaps": False,
+    }
+    state = {
+        "stage": Stage.LBP,
+        "run": 1,
+        "timestep": 1,
+        "eth_price": ETH_PRICE,
+        "weight_x": POOL.weight_x,
+        "lbp_supply_x": POOL.balance_x,
+        "lbp_supply_y": POOL.balance_y,
+        "agents": None,
+    }
+    agents = params["agent_population_process"](1)
+    total_x, total_y = agents["budget_x"].sum() + POOL.balance_x, agents["holdings_y"].sum() + POOL.balance_y
+
+    for timestep in range(1, 4):
+        state.update(policy_agent_trading(params, 0, [], {**state, "timestep": timestep}))
+        agents = state["agents"]
+        assert agents["budget_x"].sum() + state["lbp_supply_x"] == pytest.approx(total_x, rel=1e-12)
+        assert agents["holdings_y"].sum() + state["lbp_supply_y"] == pytest.approx(total_y, rel=1e-12)
+    assert state["lbp_supply_x"] != POOL.balance_x
@@ -0,0 +1,115 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+from radcad import Backend, Engine, Model, Simulation
+
+from model.system_parameters import parameters
+from model.state_variables import initial_state
+from model.state_update_blocks import state_update_blocks
+from model.stochastic_processes import create_eth_price_paths, create_sampled_process
+from experiments.aggregation import OnlineAggregation, P2Quantiles, Welford, aggregate
+from experiments.simulation_configuration import DELTA_TIME
+from experiments.streaming import StreamingEngine
+
+
+QUANTILES = [0.05, 0.5, 0.95]
+
+
+def sample(size=5_000, series=3) -> np.ndarray:
+    """Normal, lognormal and uniform samples of shape (size, series)"""
+    rng = np.random.default_rng(1)
+    return np.column_stack([
+        rng.normal(10, 2, size), rng.lognormal(0, 1, size), rng.uniform(-1, 1, size)
+    ])[:, :series]
+
+
+def test_welford_matches_numpy():
+    values = sample()
+    welford = Welford(size=3)
+    index = np.arange(3)
+    for row in values:
+        welford.update(index, row)
+
+    np.testing.assert_array_equal(welford.count, len(values))
+    np.testing.assert_allclose(welford.mean, values.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(welford.variance(), values.var(axis=0, ddof=1), rtol=1e-10)
+    np.testing.assert_array_equal(welford.min, values.min(axis=0))
+    np.testing.assert_array_equal(welford.max, values.max(axis=0))
+
+
+def test_welford_partial_series():
+    welford = Welford()
+    welford.grow(3)
+    welford.update(np.array([0, 2]), np.array([1.0, 5.0]))
+    welford.update(np.array([0]), np.array([3.0]))
+    np.testing.assert_array_equal(welford.count, [2, 0, 1])
+    np.testing.assert_array_equal(welford.mean[[0, 2]], [2.0, 5.0])
+    np.testing.assert_array_equal(np.isnan(welford.variance()), [False, True, True])
+
+
+def test_p2_quantiles_match_numpy():
+    values = sample()
+    quantiles = P2Quantiles(QUANTILES, size=3)
+    index = np.arange(3)
+    for row in values:
+        quantiles.update(index, row)
+
+    estimates = quantiles.estimates()
+    assert estimates.shape == (3, len(QUANTILES))
+    for series in range(3):
+        # The estimate's rank in the sample is within a percentile of the quantile
+        ranks = np.searchsorted(np.sort(values[:, series]), estimates[series]) / len(values)
+        np.testing.assert_allclose(ranks, QUANTILES, atol=0.01)
+        np.testing.assert_allclose(
+            estimates[series], np.quantile(values[:, series], QUANTILES), rtol=0.05, atol=0.05
+        )
+
+
+def test_p2_quantiles_exact_for_few_values():
+    quantiles = P2Quantiles(QUANTILES, size=2)
+    values = np.array([3.0, 1.0, 2.0, 5.0])
+    for value in values:
+        quantiles.update(np.array([0]), np.array([value]))
+    np.testing.assert_array_equal(quantiles.estimates()[0], np.quantile(values, QUANTILES))
+    assert np.isnan(quantiles.estimates()[1]).all()
+
+
+def create_simulation(runs=40, timesteps=48) -> Simulation:
+    realizations = create_eth_price_paths(runs, timesteps, DELTA_TIME, rng=np.random.default_rng(1))
+    model = Model(
+        initial_state=initial_state,
+        state_update_blocks=state_update_blocks,
+        params={**parameters, "eth_price_process": [create_sampled_process(realizations)], "lbp_length": [24, 48]},
+    )
+    simulation = Simulation(model=model, timesteps=timesteps, runs=runs)
+    simulation.engine = Engine(backend=Backend.SINGLE_PROCESS, drop_substeps=True)
+    return simulation
+
+
+def test_aggregate_matches_pandas():
+    aggregation = OnlineAggregation(variables=["lbp_y_usd_price", "eth_price"], quantiles=QUANTILES)
+    simulation = create_simulation()
+    streamed = copy.deepcopy(simulation)
+    simulation.run()
+    df = pd.DataFrame(simulation.results)
+    summary = aggregate(df, aggregation)
+
+    grouped = df.groupby(["simulation", "subset", "timestep"])
+    assert len(summary) == grouped.ngroups
+    np.testing.assert_array_equal(summary["runs"], grouped.size())
+    for variable in aggregation.variables:
+        np.testing.assert_allclose(summary[f"{variable}_mean"], grouped[variable].mean(), rtol=1e-12)
+        np.testing.assert_allclose(summary[f"{variable}_std"], grouped[variable].std(), rtol=1e-9, atol=1e-12)
+        np.testing.assert_array_equal(summary[f"{variable}_min"], grouped[variable].min())
+        np.testing.assert_array_equal(summary[f"{variable}_max"], grouped[variable].max())
+        median = grouped[variable].quantile(0.5).to_numpy()
+        spread = (grouped[variable].max() - grouped[variable].min()).to_numpy()
+        assert np.all(np.abs(summary[f"{variable}_p50"] - median) <= 0.1 * spread + 1e-9)
+    assert (summary["eth_price_std"] > 0).mean() > 0.9
+
+    # The streaming engine folds each run into the same summary as it runs
+    streamed.engine = StreamingEngine(drop_substeps=True, aggregation=aggregation)
+    streamed.run()
+    pd.testing.assert_frame_equal(streamed.results, summary)
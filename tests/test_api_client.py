@@ -0,0 +1,101 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import data.api.etherscan as etherscan
+from data.api.client import APIClient, APIError, run_sync
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves the responses queued for each path, in order, and records every request"""
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.path)
+        responses = server.responses.get(self.path.split("?")[0], [])
+        (status, body, delay) = responses.pop(0) if len(responses) > 1 else responses[0]
+        time.sleep(delay)
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.responses = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def stub_client(server, **kwargs) -> APIClient:
+    return APIClient(f"http://127.0.0.1:{server.server_address[1]}", expire=None, backoff=0, **kwargs)
+
+
+def test_get_many_in_order(stub_server):
+    for epoch in range(20):
+        stub_server.responses[f"/epoch/{epoch}"] = [(200, {"data": epoch}, 0.01)]
+    client = stub_client(stub_server, max_concurrency=4)
+
+    responses = run_sync(client.get_many([f"/epoch/{epoch}" for epoch in range(20)]))
+
+    assert [response["data"] for response in responses] == list(range(20))
+
+
+def test_retries_server_errors(stub_server):
+    stub_server.responses["/flaky"] = [(503, {}, 0), (500, {}, 0), (200, {"ok": True}, 0)]
+    client = stub_client(stub_server, retries=3)
+
+    assert run_sync(client.get_json("/flaky")) == {"ok": True}
+    assert len(stub_server.requests) == 3
+
+
+def test_client_errors_are_not_retried(stub_server):
+    stub_server.responses["/missing"] = [(404, {}, 0)]
+    client = stub_client(stub_server, retries=3)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        run_sync(client.get_json("/missing"))
+    assert len(stub_server.requests) == 1
+
+
+def test_timeout(stub_server):
+    stub_server.responses["/slow"] = [(200, {}, 0.5)]
+    client = stub_client(stub_server, timeout=0.05, retries=3)
+
+    with pytest.raises(requests.exceptions.Timeout):
+        run_sync(client.get_json("/slow", retries=1))
+    assert len(stub_server.requests) == 2
+
+
+def test_api_errors_are_not_retried(stub_server, monkeypatch):
+    stub_server.responses["/api"] = [(200, {"status": "0", "result": "Invalid API Key"}, 0)]
+    monkeypatch.setattr(etherscan, "client", stub_client(stub_server, retries=3))
+
+    with pytest.raises(APIError):
+        run_sync(etherscan.fetch_eth_supply())
+    assert etherscan.get_eth_supply(default=-1) == -1
+    assert len(stub_server.requests) == 2
+
+
+def test_get_eth_supply(stub_server, monkeypatch):
+    stub_server.responses["/api"] = [(200, {"status": "1", "result": "120000000000000000000000000"}, 0)]
+    monkeypatch.setattr(etherscan, "client", stub_client(stub_server))
+
+    assert etherscan.get_eth_supply() == 120_000_000 * 10**18
+    assert stub_server.requests == ["/api?action=ethsupply&module=stats"]
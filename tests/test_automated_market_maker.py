@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+
+from model.parts.automated_market_maker import (
+    WeightedPool,
+    ConstantProductPool,
+    create_orders,
+    execute_swaps,
+)
+
+
+SWAP_FEE = 0.003
+
+
+def conserved(pool: WeightedPool, orders, result) -> bool:
+    """Whether the pool balances changed by exactly the amounts paid in less the amounts paid out"""
+    buy_x = orders["buy_x"]
+    change_x = result.amount_in[~buy_x].sum() - result.amount_out[buy_x].sum()
+    change_y = result.amount_in[buy_x].sum() - result.amount_out[~buy_x].sum()
+    return np.isclose(result.balance_x, pool.balance_x + change_x, rtol=1e-12) and np.isclose(
+        result.balance_y, pool.balance_y + change_y, rtol=1e-12
+    )
+
+
+def test_spot_price_matches_weights():
+    # A pool whose value is split in proportion to the weights prices both tokens equally
+    pool = WeightedPool(balance_x=800.0, balance_y=200.0, weight_x=0.8)
+    assert pool.price_x_in_y == pytest.approx(1.0)
+    assert pool.price_y_in_x == pytest.approx(1.0)
+
+    # The price of token X is the ratio of the value of token Y to the balance of token X
+    pool = WeightedPool(balance_x=1_000.0, balance_y=50_000.0, weight_x=0.2)
+    assert pool.price_x_in_y == pytest.approx((50_000.0 / 0.8) / (1_000.0 / 0.2))
+    assert ConstantProductPool(1_000.0, 50_000.0).price_x_in_y == pytest.approx(50.0)
+
+    # Small swaps execute at the spot price
+    amount_in = 1e-6
+    assert amount_in / pool.out_given_in(amount_in) == pytest.approx(pool.price_x_in_y, rel=1e-6)
+    assert pool.price_impact(amount_in) == pytest.approx(0.0, abs=1e-6)
+
+
+@pytest.mark.parametrize("weight_x", [0.5, 0.2, 0.96])
+@pytest.mark.parametrize("swap_fee", [0.0, SWAP_FEE])
+def test_in_given_out_inverts_out_given_in(weight_x, swap_fee):
+    pool = WeightedPool(balance_x=1_000.0, balance_y=25_000.0, weight_x=weight_x)
+    for buy_x in [True, False]:
+        for amount_in in [1e-3, 10.0, 900.0]:
+            amount_out = pool.out_given_in(amount_in, buy_x, swap_fee)
+            assert 0 < amount_out < (pool.balance_x if buy_x else pool.balance_y)
+            # Relative rounding errors grow as the amount gets small compared to the balances
+            assert pool.in_given_out(amount_out, buy_x, swap_fee) == pytest.approx(amount_in, rel=1e-6)
+
+
+def test_batch_conserves_balances_and_retains_fees():
+    pool = WeightedPool(balance_x=1_000.0, balance_y=50_000.0, weight_x=0.6)
+    orders = create_orders(
+        buy_x=[True, True, False, True, False, False],
+        amount=[500.0, 1.0, 3.0, 20.0, 2.0, 0.5],
+        exact_out=[False, True, False, True, True, False],
+    )
+
+    new_pool, result = pool.swap(orders)
+    assert conserved(pool, orders, result)
+    assert new_pool.invariant == pytest.approx(pool.invariant, rel=1e-12)
+
+    # Fees are paid into the pool, so the invariant grows while the balances are still conserved
+    new_pool, result = pool.swap(orders, swap_fee=SWAP_FEE)
+    assert conserved(pool, orders, result)
+    assert new_pool.invariant > pool.invariant
+
+    # The batch matches executing each order against the balances left by the previous order
+    (balance_x, balance_y) = (pool.balance_x, pool.balance_y)
+    for order, amount_in, amount_out in zip(orders, result.amount_in, result.amount_out):
+        sequential_pool = WeightedPool(balance_x, balance_y, pool.weight_x)
+        if order["exact_out"]:
+            expected = (sequential_pool.in_given_out(order["amount"], order["buy_x"], SWAP_FEE), order["amount"])
+        else:
+            expected = (order["amount"], sequential_pool.out_given_in(order["amount"], order["buy_x"], SWAP_FEE))
+        assert (amount_in, amount_out) == pytest.approx(expected, rel=1e-9)
+        if order["buy_x"]:
+            (balance_x, balance_y) = (balance_x - amount_out, balance_y + amount_in)
+        else:
+            (balance_x, balance_y) = (balance_x + amount_in, balance_y - amount_out)
+    assert (result.balance_x, result.balance_y) == pytest.approx((balance_x, balance_y), rel=1e-12)
+
+
+def test_orders_draining_a_balance_are_rejected():
+    pool = WeightedPool(balance_x=1_000.0, balance_y=50_000.0, weight_x=0.6)
+    orders = create_orders(buy_x=True, amount=[400.0, 700.0, 1.0], exact_out=True)
+    _, result = pool.swap(orders, swap_fee=SWAP_FEE)
+
+    # The second order would receive more token X than the pool holds, and is rejected with the rest of its segment
+    assert result.amount_out[0] == 400.0 and result.amount_in[0] > 0
+    np.testing.assert_array_equal(result.amount_out[1:], 0.0)
+    np.testing.assert_array_equal(result.amount_in[1:], 0.0)
+    assert result.balance_x == pytest.approx(600.0)
+    assert conserved(pool, orders, result)
+
+    _, result = pool.swap(create_orders(buy_x=False, amount=pool.balance_y, exact_out=True))
+    assert (result.amount_in[0], result.amount_out[0]) == (0.0, 0.0)
+    assert (result.balance_x, result.balance_y) == (pool.balance_x, pool.balance_y)
+
+
+def test_no_orders():
+    result = execute_swaps(1_000.0, 50_000.0, 0.6, create_orders(True, []))
+    assert (result.balance_x, result.balance_y) == (1_000.0, 50_000.0)
+    assert len(result.amount_in) == len(result.amount_out) == 0
+
+
+@pytest.mark.parametrize("netted", [False, True])
+def test_netted_and_sequential_conserve_balances(netted):
+    pool = WeightedPool(balance_x=1_000.0, balance_y=50_000.0, weight_x=0.6)
+    orders = create_orders(
+        buy_x=[True, False, True, False, False],
+        amount=[800.0, 4.0, 10.0, 300.0, 1.5],
+        exact_out=[False, False, True, True, False],
+    )
+    for swap_fee in [0.0, SWAP_FEE]:
+        _, result = pool.swap(orders, swap_fee=swap_fee, netted=netted)
+        assert conserved(pool, orders, result)
+        assert np.all(result.amount_in >= 0) and np.all(result.amount_out >= 0)
+
+
+def test_netted_swaps_differ_only_as_documented():
+    pool = WeightedPool(balance_x=1_000.0, balance_y=50_000.0, weight_x=0.6)
+
+    # Without opposing orders or fees, netting trades the total against the pool, as sequential swaps do
+    orders = create_orders(buy_x=True, amount=[100.0, 250.0, 40.0])
+    _, sequential = pool.swap(orders)
+    _, netted = pool.swap(orders, netted=True)
+    assert (netted.balance_x, netted.balance_y) == pytest.approx((sequential.balance_x, sequential.balance_y), rel=1e-12)
+    assert netted.amount_out.sum() == pytest.approx(sequential.amount_out.sum(), rel=1e-12)
+    # Each order receives a pro-rata share of the total, rather than the price left by the previous order
+    np.testing.assert_allclose(netted.amount_out / netted.amount_out.sum(), orders["amount"] / orders["amount"].sum())
+
+    # Opposing orders of equal value are matched at the spot price, leaving the pool with only the fees
+    price_x = pool.price_x_in_y
+    orders = create_orders(buy_x=[True, False], amount=[100.0 * price_x, 100.0])
+    _, result = pool.swap(orders, swap_fee=SWAP_FEE, netted=True)
+    np.testing.assert_allclose(result.amount_out, [100.0 * (1 - SWAP_FEE), 100.0 * price_x * (1 - SWAP_FEE)])
+    assert result.balance_x == pytest.approx(pool.balance_x + 100.0 * SWAP_FEE)
+    assert result.balance_y == pytest.approx(pool.balance_y + 100.0 * price_x * SWAP_FEE)
+
+    # In-given-out orders on the larger side receive approximately their requested amount
+    orders = create_orders(buy_x=[True, False], amount=[50.0, 10.0], exact_out=[True, False])
+    _, result = pool.swap(orders, netted=True)
+    assert result.amount_out[0] == pytest.approx(50.0, rel=0.05)
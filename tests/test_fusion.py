@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from radcad import Model, Simulation
+
+from model.system_parameters import parameters
+from model.state_variables import initial_state
+from model.state_update_blocks import state_update_blocks
+from model.parts.agent_system import create_agent_population_process
+from model.parts.automated_market_maker import create_orders
+from model.utils import check_fusion
+
+
+TIMESTEPS = 48
+RUNS = 2
+
+
+def create_simulation(**params) -> Simulation:
+    model = Model(
+        initial_state=initial_state,
+        state_update_blocks=state_update_blocks,
+        params={**parameters, **params},
+    )
+    return Simulation(model=model, timesteps=TIMESTEPS, runs=RUNS)
+
+
+def alternating_orders(run, timestep):
+    """Buy and sell token X on alternate timesteps"""
+    return create_orders(buy_x=[int(timestep) % 2 == 0], amount=[1.0 + run])
+
+
+def test_fusion_default():
+    df, df_fused = check_fusion(create_simulation())
+    assert len(df) == len(df_fused) == RUNS * (TIMESTEPS + 1)
+
+
+def test_fusion_sweep_and_stages():
+    date_start = parameters["date_start"][0]
+    check_fusion(create_simulation(
+        lbp_length=[12, 24],
+        weight_curve=["linear", "exponential"],
+        date_lbp_start=[date_start + timedelta(hours=6)],
+        date_lbp_end=[date_start + timedelta(hours=30)],
+    ))
+
+
+def test_fusion_orders():
+    check_fusion(create_simulation(lbp_order_process=[alternating_orders], lbp_netted_swaps=[False, True]))
+
+
+def test_fusion_agents():
+    df, _ = check_fusion(create_simulation(agent_population_process=[create_agent_population_process(agent_count=50)]))
+    assert df["lbp_supply_x"].nunique() > 1
@@ -0,0 +1,66 @@
+import numpy as np
+
+from experiments.utils import stable_hash
+
+
+class Policies:
+    def __init__(self, rate):
+        self.rate = rate
+
+    def buy(self, params, substep, state_history, previous_state):
+        return {"rate": self.rate}
+
+    def sell(self, params, substep, state_history, previous_state):
+        return {"rate": -self.rate}
+
+
+def test_bound_methods():
+    policies = Policies(rate=1)
+    assert stable_hash(policies.buy) != stable_hash(policies.sell)
+    assert stable_hash(policies.buy) != stable_hash(Policies(rate=2).buy)
+    assert stable_hash(policies.buy) == stable_hash(Policies(rate=1).buy)
+
+
+def test_builtin_bound_methods():
+    assert stable_hash(np.random.default_rng(1).normal) != stable_hash(np.random.default_rng(2).normal)
+    assert stable_hash(np.random.default_rng(1).normal) == stable_hash(np.random.default_rng(1).normal)
+
+
+def test_arrays_and_containers():
+    assert stable_hash({"a": np.arange(3)}) == stable_hash({"a": np.arange(3)})
+    assert stable_hash({"a": np.arange(3)}) != stable_hash({"a": np.arange(4)})
+
+
+def test_engine_options_change_executable_hash(tmp_path):
+    from radcad import Model, Simulation
+
+    from model.system_parameters import parameters
+    from model.state_variables import initial_state
+    from model.state_update_blocks import state_update_blocks
+    from experiments.cache import ResultCache
+    from experiments.recording import RecordingPolicy
+    from experiments.run import run
+    from experiments.streaming import StreamingEngine
+    from experiments.utils import get_executable_hash, get_subset_hash
+
+    simulation = Simulation(
+        model=Model(initial_state=initial_state, state_update_blocks=state_update_blocks, params=parameters),
+        timesteps=48,
+        runs=1,
+    )
+    cache = ResultCache(directory=str(tmp_path))
+    rows = {}
+    hashes = set()
+    for recording in [RecordingPolicy(every=24), RecordingPolicy(every=4), None]:
+        simulation.engine = StreamingEngine(drop_substeps=True, recording=recording)
+        hashes.add(get_executable_hash(simulation))
+        hashes.add(get_subset_hash(simulation, parameters, simulation.engine))
+        # Results recorded with another policy are not loaded from the cache
+        df, _ = run(simulation, cache=cache)
+        rows[recording] = len(df)
+    assert len(hashes) == 6
+    # Post-processing drops the initial state
+    assert rows == {RecordingPolicy(every=24): 2, RecordingPolicy(every=4): 12, None: 48}
+
+    simulation.engine = StreamingEngine(drop_substeps=True, history=None)
+    assert get_executable_hash(simulation) not in hashes
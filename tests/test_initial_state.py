@@ -0,0 +1,120 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+import data.historical_values as historical_values
+import model.constants as constants
+from data.initial_state import InitialStateProvider, file_initial_state_snapshot
+
+
+# Imports the model with every socket connection recorded, and prints the connections and background threads
+IMPORT_MODEL = """
+import socket, sys, threading, json
+connections = []
+connect = socket.socket.connect
+socket.socket.connect = lambda self, address: connections.append(address) or connect(self, address)
+import model.state_variables
+print(json.dumps({
+    "connections": connections,
+    "threads": [thread.name for thread in threading.enumerate() if thread is not threading.main_thread()],
+    "api_client": "data.api.client" in sys.modules,
+}))
+"""
+
+
+@pytest.mark.parametrize("offline", [True, False])
+def test_import_performs_no_network_io(offline):
+    environment = {key: value for (key, value) in os.environ.items() if key != "MODEL_OFFLINE"}
+    if offline:
+        environment["MODEL_OFFLINE"] = "1"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_MODEL], cwd=root, env=environment, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.splitlines()[-1])
+    assert result == {"connections": [], "threads": [], "api_client": False}
+
+
+def test_eth_supply_falls_back_to_snapshot_offline():
+    import model.state_variables as state_variables
+
+    with open(file_initial_state_snapshot) as file:
+        snapshot = json.load(file)
+    assert state_variables.eth_supply == snapshot["eth_supply"] / constants.wei
+
+
+def test_provider_fetches_on_first_access(tmp_path, monkeypatch):
+    monkeypatch.delenv("MODEL_OFFLINE")
+    snapshot_path = tmp_path / "snapshot.json"
+    snapshot_path.write_text(json.dumps({"resolved": 1, "failed": 2, "slow": 3}))
+    calls = []
+
+    def fetcher(key, value, delay=0.0):
+        def fetch():
+            calls.append(key)
+            time.sleep(delay)
+            if isinstance(value, Exception):
+                raise value
+            return value
+        return fetch
+
+    provider = InitialStateProvider(
+        {
+            "resolved": fetcher("resolved", 10),
+            "failed": fetcher("failed", Exception("Request failed")),
+            "slow": fetcher("slow", 30, delay=5.0),
+        },
+        snapshot_path=str(snapshot_path),
+        timeout=0.5,
+    )
+    assert calls == [] and provider._thread is None
+
+    start = time.monotonic()
+    assert provider.get("resolved") == 10
+    # Failed and slow values fall back to the snapshot, without waiting past the timeout
+    assert provider.get("failed") == 2
+    assert provider.get("slow") == 3
+    assert time.monotonic() - start < 2.0
+    assert calls == ["resolved", "failed", "slow"]
+
+
+def test_provider_offline_uses_snapshot(tmp_path):
+    snapshot_path = tmp_path / "snapshot.json"
+    snapshot_path.write_text(json.dumps({"value": 1}))
+    provider = InitialStateProvider({"value": lambda: pytest.fail("Fetched while offline")}, snapshot_path=str(snapshot_path))
+    assert provider.get("value") == 1
+    assert provider._thread is None
+
+
+def test_historical_values_computed_on_first_access(monkeypatch):
+    for name in historical_values._lazy_attributes:
+        monkeypatch.delitem(vars(historical_values), name, raising=False)
+    calls = []
+    getter = historical_values._lazy_attributes["eth_price_mean"]
+    monkeypatch.setitem(historical_values._lazy_attributes, "eth_price_mean", lambda: calls.append(1) or getter())
+
+    assert "eth_price_mean" not in vars(historical_values)
+    window = historical_values.ether_price().window()
+    assert historical_values.eth_price_mean == pytest.approx(window.values.mean())
+    assert historical_values.eth_price_mean == historical_values.get_eth_price_mean()
+    # Cached as a module attribute after the first access
+    assert vars(historical_values)["eth_price_mean"] == historical_values.eth_price_mean
+    assert calls == [1]
+
+    assert window.dates.min() >= historical_values.window_start and window.dates.max() <= historical_values.window_end
+    assert historical_values.eth_price_min == window.values.min()
+    assert historical_values.eth_price_max == window.values.max()
+    assert historical_values.eth_gas_price_median == pytest.approx(
+        np.median(historical_values.ether_avg_gas_price().window().values) / constants.gwei
+    )
+    df = historical_values.df_ether_price
+    assert len(df) == len(window.values)
+    np.testing.assert_array_equal(df["Value"], window.values)
+
+    with pytest.raises(AttributeError):
+        historical_values.eth_price_median
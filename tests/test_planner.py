@@ -0,0 +1,76 @@
+import copy
+
+import pandas as pd
+from radcad import Backend, Engine, Experiment, Model, Simulation
+
+from model.system_parameters import parameters
+from model.state_variables import initial_state
+from model.state_update_blocks import state_update_blocks
+from experiments.cache import ResultCache
+from experiments.planner import plan_sweep, run_incremental
+
+
+TIMESTEPS = 48
+RUNS = 2
+
+
+def create_simulation(**params) -> Simulation:
+    model = Model(
+        initial_state=initial_state,
+        state_update_blocks=state_update_blocks,
+        params={**parameters, **params},
+    )
+    simulation = Simulation(model=model, timesteps=TIMESTEPS, runs=RUNS)
+    simulation.engine = Engine(backend=Backend.SINGLE_PROCESS, drop_substeps=True)
+    return simulation
+
+
+def run_full(executable) -> pd.DataFrame:
+    executable = copy.deepcopy(executable)
+    executable.run()
+    return pd.DataFrame(executable.results), executable.exceptions
+
+
+def assert_results_equal(df, df_expected):
+    # The default agent population is empty, and arrays can't be compared by assert_frame_equal
+    pd.testing.assert_frame_equal(df.drop(columns=["agents"]), df_expected.drop(columns=["agents"]))
+
+
+def exception_indices(exceptions) -> list:
+    return [(exception["simulation"], exception["subset"], exception["run"]) for exception in exceptions]
+
+
+def test_incremental_run_matches_full_run(tmp_path):
+    cache = ResultCache(directory=str(tmp_path))
+    run_incremental(create_simulation(lbp_length=[24]), cache)
+
+    # The cached subset is the second subset of the extended sweep
+    simulation = create_simulation(lbp_length=[12, 24])
+    assert plan_sweep(simulation, cache).missing == [0]
+    df, exceptions = run_incremental(copy.deepcopy(simulation), cache)
+
+    df_expected, exceptions_expected = run_full(simulation)
+    assert_results_equal(df, df_expected)
+    assert exception_indices(exceptions) == exception_indices(exceptions_expected)
+    assert [exception["parameters"]["lbp_length"] for exception in exceptions] == [
+        exception["parameters"]["lbp_length"] for exception in exceptions_expected
+    ]
+
+    # Both subsets are now cached
+    assert plan_sweep(simulation, cache).missing == []
+    df_cached, _ = run_incremental(copy.deepcopy(simulation), cache)
+    assert_results_equal(df_cached, df_expected)
+
+
+def test_incremental_experiment_renumbers_simulations(tmp_path):
+    cache = ResultCache(directory=str(tmp_path))
+    run_incremental(create_simulation(lbp_length=[36]), cache)
+
+    experiment = Experiment([create_simulation(lbp_length=[12]), create_simulation(lbp_length=[36, 24])])
+    experiment.engine = Engine(backend=Backend.SINGLE_PROCESS, drop_substeps=True)
+    df, exceptions = run_incremental(copy.deepcopy(experiment), cache)
+
+    df_expected, exceptions_expected = run_full(experiment)
+    assert_results_equal(df, df_expected)
+    assert exception_indices(exceptions) == exception_indices(exceptions_expected)
+    assert df.groupby("simulation")["subset"].nunique().tolist() == [1, 2]
@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from experiments.recording import Recorder, RecordingPolicy, densify, record, sparsify
+
+
+TIMESTEPS = 10
+
+
+def create_results(runs=2) -> pd.DataFrame:
+    """Results with a State Variable that changes every timestep, and one that changes every fourth timestep"""
+    return pd.DataFrame([
+        {
+            "simulation": 0,
+            "subset": 0,
+            "run": run,
+            "substep": 0 if timestep == 0 else 1,
+            "timestep": timestep,
+            "price": run * 100.0 + timestep,
+            "stage": ["PRE_LBP", "LBP", "POST_LBP"][min(timestep // 4, 2)],
+            "supply": float(timestep // 4),
+        }
+        for run in range(1, runs + 1)
+        for timestep in range(TIMESTEPS + 1)
+    ])
+
+
+def stream(df, policy) -> pd.DataFrame:
+    recorder = Recorder(policy)
+    states = (recorder.record(state, final_timestep=TIMESTEPS) for state in df.to_dict("records"))
+    return pd.DataFrame([state for state in states if state is not None])
+
+
+def test_densify_sparsify_round_trip():
+    df = create_results()
+    sparse = sparsify(df.copy(), ["supply", "stage"])
+    assert isinstance(sparse["supply"].dtype, pd.SparseDtype)
+    assert isinstance(sparse["stage"].dtype, pd.SparseDtype)
+    pd.testing.assert_frame_equal(densify(sparse), df, check_dtype=False)
+
+    # Delta-encoded values are reconstructed by forward-filling within each run
+    recorded = record(df, RecordingPolicy(on_change=["stage", "supply"]))
+    assert recorded["supply"].sparse.npoints == 2 * 3
+    pd.testing.assert_frame_equal(densify(recorded), df, check_dtype=False)
+
+
+def test_every_keeps_first_final_and_nth_timesteps():
+    df = create_results()
+    recorded = record(df, RecordingPolicy(every=4))
+    assert recorded["timestep"].tolist() == [0, 4, 8, 10] * 2
+    pd.testing.assert_frame_equal(recorded, df[df["timestep"].isin([0, 4, 8, 10])].reset_index(drop=True))
+
+    # Decimated timesteps are reconstructed from the previous recorded timestep
+    dense = densify(recorded)
+    assert len(dense) == len(df)
+    assert dense.loc[dense["timestep"] == 7, "price"].tolist() == [104.0, 204.0]
+
+
+def test_on_change_keeps_changed_values():
+    df = create_results()
+    policy = RecordingPolicy(variables=["stage"], on_change=["stage"])
+    recorded = record(df, policy)
+    # Only rows where the stage changed are kept, and the final timestep of each run
+    assert recorded["timestep"].tolist() == [0, 4, 8, 10] * 2
+    assert list(recorded.columns) == ["simulation", "subset", "run", "substep", "timestep", "stage"]
+    stages = recorded["stage"].sparse.to_dense()
+    assert stages[recorded["timestep"] < 10].tolist() == ["PRE_LBP", "LBP", "POST_LBP"] * 2
+    assert stages[recorded["timestep"] == 10].isna().all()
+
+    # With other variables recorded, every row is kept and unchanged values are missing
+    recorded = record(df, RecordingPolicy(variables=["price", "stage"], on_change=["stage"]))
+    assert len(recorded) == len(df)
+    assert recorded["stage"].notna().sum() == 6
+
+
+@pytest.mark.parametrize("policy", [
+    RecordingPolicy(every=4),
+    RecordingPolicy(variables=["price", "supply"], every=3, on_change=["supply"]),
+    RecordingPolicy(variables=["stage"], on_change=["stage"]),
+])
+def test_streamed_recording_matches_record(policy):
+    df = create_results()
+    pd.testing.assert_frame_equal(
+        densify(sparsify(stream(df, policy), policy.on_change)), densify(record(df, policy)), check_dtype=False
+    )
@@ -0,0 +1,106 @@
+import os
+import copy
+import pickle
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+from radcad import Backend, Engine, Model, Simulation
+
+import experiments.shared_memory as shared_memory
+from experiments.shared_memory import SharedArray, SharedMemoryEngine, shared_parameters
+from model.system_parameters import parameters
+from model.state_variables import initial_state
+from model.state_update_blocks import state_update_blocks
+from model.stochastic_processes import SampledProcess, create_sampled_process
+
+
+def create_simulation(**params) -> Simulation:
+    model = Model(initial_state={}, state_update_blocks=[], params=params)
+    return Simulation(model=model, timesteps=1, runs=1)
+
+
+def test_shared_parameters_removes_directory():
+    array = np.arange(1000, dtype=float)
+    simulation = create_simulation(prices=[array])
+    params = simulation.model.params
+    with shared_parameters(simulation, min_bytes=1):
+        shared = simulation.model.params["prices"][0]
+        assert isinstance(shared, SharedArray)
+        np.testing.assert_array_equal(shared, array)
+        directory = os.path.dirname(shared.shared_path)
+        assert os.path.basename(directory).startswith(f"{shared_memory.directory_prefix}{os.getpid()}-")
+        assert directory in shared_memory._directories
+    assert simulation.model.params is params
+    assert not os.path.exists(directory)
+    assert directory not in shared_memory._directories
+
+
+def run_python(code, **kwargs) -> str:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True, **kwargs).stdout
+
+
+def test_interrupted_directories_removed_at_exit():
+    code = (
+        "import os, numpy as np\n"
+        "from experiments.shared_memory import shared_parameters\n"
+        "from tests.test_shared_memory import create_simulation\n"
+        "context = shared_parameters(create_simulation(prices=[np.ones(1000)]), min_bytes=1)\n"
+        "shared = context.__enter__()\n"
+        "print(os.path.dirname(next(iter(shared.values()))[1].shared_path))\n"
+        "os._exit(0) if os.environ.get('KILL') else None\n"
+    )
+    # Exits without leaving the context, e.g. an interrupted notebook kernel being shut down
+    assert not os.path.exists(run_python(code).strip())
+
+    # Killed, the directory is left behind until the next run removes it
+    stale_directory = run_python(code, env={**os.environ, "KILL": "1"}).strip()
+    assert os.path.exists(stale_directory)
+
+    live_directory = os.path.join(shared_memory.shared_directory(), f"{shared_memory.directory_prefix}{os.getppid()}-test")
+    os.makedirs(live_directory, exist_ok=True)
+    try:
+        with shared_parameters(create_simulation(prices=[np.ones(1000)]), min_bytes=1):
+            pass
+        assert not os.path.exists(stale_directory)
+        # Directories of running processes are kept
+        assert os.path.exists(live_directory)
+    finally:
+        os.rmdir(live_directory)
+
+
+def test_sampled_processes_are_shared():
+    realizations = 2_000 + np.random.default_rng(1).standard_normal((100, 2_000)).cumsum(axis=1)
+    process = create_sampled_process(realizations)
+    model = Model(
+        initial_state=initial_state,
+        state_update_blocks=state_update_blocks,
+        params={**parameters, "eth_price_process": [process]},
+    )
+    simulation = Simulation(model=model, timesteps=24, runs=4)
+
+    with shared_parameters(simulation) as shared:
+        shared_process = simulation.model.params["eth_price_process"][0]
+        assert isinstance(shared_process, SampledProcess) and shared_process is not process
+        assert isinstance(shared_process.realizations, SharedArray)
+        assert [original for (original, _shared) in shared.values()] == [process.realizations]
+        # Workers receive a handle to the realizations rather than a copy, and radCAD's per-run deep copy shares them
+        assert len(pickle.dumps(process)) > realizations.nbytes
+        assert len(pickle.dumps(shared_process)) < 1_000
+        assert copy.deepcopy(shared_process).realizations is shared_process.realizations
+    assert simulation.model.params["eth_price_process"][0] is process
+
+    results = []
+    for engine in [
+        Engine(backend=Backend.SINGLE_PROCESS, drop_substeps=True, raise_exceptions=False),
+        SharedMemoryEngine(backend=Backend.PATHOS, processes=2, drop_substeps=True, raise_exceptions=False),
+    ]:
+        executable = copy.deepcopy(simulation)
+        executable.engine = engine
+        executable.run()
+        results.append(pd.DataFrame(executable.results).drop(columns=["agents"]))
+        # Exceptions refer to the original process, not to the removed shared realizations
+        assert all(exception["parameters"]["eth_price_process"] is process for exception in executable.exceptions)
+    pd.testing.assert_frame_equal(*results)
@@ -0,0 +1,68 @@
+import copy
+
+import numpy as np
+import pytest
+
+from model.random_streams import random_streams
+from model.stochastic_processes import (
+    create_common_processes,
+    create_historical_eth_price_process,
+    create_sampled_process,
+    create_stochastic_process_realizations,
+    sample_count,
+)
+from experiments.cache import RealizationCache
+
+
+TIMESTEPS = 100
+DT = 3
+
+
+def test_historical_eth_price_samples_per_epoch():
+    realizations = create_stochastic_process_realizations(
+        "historical_eth_price_samples", timesteps=TIMESTEPS, dt=DT, runs=3, rng=np.random.default_rng(1)
+    )
+    assert realizations.shape == (3, sample_count(TIMESTEPS, DT))
+
+    # Sampled per epoch, the realizations match the hourly process
+    hourly = create_historical_eth_price_process(3, TIMESTEPS, DT, rng=np.random.default_rng(1))
+    sampled = create_sampled_process(realizations)
+    epochs = np.arange(0, TIMESTEPS * DT + 1, DT)
+    for run in [1, 2, 3]:
+        np.testing.assert_array_equal(sampled(run, epochs), hourly(run, epochs))
+
+    # Neither process is copied with the System Parameters of each run
+    for process in [hourly, sampled]:
+        assert copy.deepcopy(process).realizations is process.realizations
+        assert not process.realizations.flags.writeable
+
+
+def test_cached_historical_eth_price_samples(tmp_path):
+    cache = RealizationCache(directory=str(tmp_path))
+    process = cache.get_process("historical_eth_price_samples", runs=2, timesteps=TIMESTEPS, dt=DT)
+    assert process.realizations.shape == (2, sample_count(TIMESTEPS, DT))
+    assert process(2, TIMESTEPS * DT) == process.realizations[1, -1]
+
+
+def test_seeds_derive_from_random_streams(tmp_path, monkeypatch):
+    expected = create_stochastic_process_realizations(
+        "eth_price_samples", timesteps=TIMESTEPS, dt=DT, runs=2, rng=random_streams.generator("eth_price_samples", 7)
+    )
+    cache = RealizationCache(directory=str(tmp_path))
+    np.testing.assert_array_equal(cache.get("eth_price_samples", runs=2, timesteps=TIMESTEPS, dt=DT, seed=7), expected)
+    (process,) = create_common_processes("eth_price_samples", [{}], timesteps=TIMESTEPS, dt=DT, runs=2, seed=7)
+    np.testing.assert_array_equal(process.realizations, expected)
+
+    # Changing the master seed changes the cache key, rather than reusing realizations drawn from another master seed
+    key = cache.key("eth_price_samples", 2, TIMESTEPS, DT, 7)
+    monkeypatch.setattr(random_streams, "master_seed", random_streams.master_seed + 1)
+    assert cache.key("eth_price_samples", 2, TIMESTEPS, DT, 7) != key
+
+
+def test_sampled_process_deepcopy_shares_realizations():
+    process = create_sampled_process(np.random.default_rng(1).random((4, 10)))
+    assert copy.deepcopy(process).realizations is process.realizations
+    assert copy.deepcopy({"eth_price_process": [process]})["eth_price_process"][0] is process
+    assert not process.realizations.flags.writeable
+    with pytest.raises(ValueError):
+        process.realizations[0, 0] = 0.0
@@ -0,0 +1,128 @@
+import os
+import copy
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from radcad import Backend, Engine, Experiment, Model, Simulation
+
+from model.system_parameters import parameters
+from model.state_variables import initial_state
+from model.state_update_blocks import state_update_blocks
+from model.parts.agent_system import create_agent_population_process
+from model.types import AgentStrategy, Stage
+from experiments.cache import ResultCache
+from experiments.run import run
+from experiments.streaming import ColumnarSink, StreamingEngine
+
+
+TIMESTEPS = 48
+RUNS = 2
+
+
+def create_simulation(**params) -> Simulation:
+    date_start = parameters["date_start"][0]
+    model = Model(
+        initial_state=initial_state,
+        state_update_blocks=state_update_blocks,
+        params={
+            **parameters,
+            "date_lbp_start": [date_start + timedelta(hours=6)],
+            "date_lbp_end": [date_start + timedelta(hours=30)],
+            "agent_population_process": [create_agent_population_process(agent_count=50)],
+            **params,
+        },
+    )
+    return Simulation(model=model, timesteps=TIMESTEPS, runs=RUNS)
+
+
+def run_results(executable, engine) -> pd.DataFrame:
+    executable = copy.deepcopy(executable)
+    executable.engine = engine
+    executable.run()
+    assert not any(exception["exception"] for exception in executable.exceptions)
+    return pd.DataFrame(executable.results)
+
+
+@pytest.mark.parametrize("drop_substeps", [True, False])
+def test_streaming_matches_radcad(drop_substeps):
+    simulation = create_simulation(lbp_length=[12, 24], lbp_netted_swaps=[False, True])
+    df = run_results(simulation, Engine(backend=Backend.SINGLE_PROCESS, drop_substeps=drop_substeps))
+    df_streamed = run_results(simulation, StreamingEngine(drop_substeps=drop_substeps))
+
+    # The agent population is not collected by the streaming engine
+    pd.testing.assert_frame_equal(df.drop(columns=["agents"]), df_streamed)
+    assert df_streamed["stage"].nunique() == 3
+    assert df_streamed["subset"].nunique() == 2
+
+
+def test_streaming_full_history_matches_bounded_history():
+    simulation = create_simulation()
+    df = run_results(simulation, StreamingEngine(drop_substeps=True))
+    pd.testing.assert_frame_equal(df, run_results(simulation, StreamingEngine(drop_substeps=True, history=None)))
+
+
+def test_parquet_dataset_matches_in_memory_results(tmp_path):
+    experiment = Experiment([create_simulation(), create_simulation(lbp_length=[12, 24])])
+    df = run_results(experiment, StreamingEngine(drop_substeps=True))
+    df_parquet = run_results(experiment, StreamingEngine(drop_substeps=True, directory=str(tmp_path), buffer_rows=50))
+
+    pd.testing.assert_frame_equal(df, df_parquet)
+    assert all(isinstance(stage, Stage) for stage in df_parquet["stage"][df_parquet["timestep"] > 0])
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["simulation=0", "simulation=1"]
+
+    # Existing results are never replaced unless overwriting
+    with pytest.raises(Exception, match="already exist"):
+        run_results(experiment, StreamingEngine(drop_substeps=True, directory=str(tmp_path)))
+    df_overwritten = run_results(experiment, StreamingEngine(drop_substeps=True, directory=str(tmp_path), overwrite=True))
+    pd.testing.assert_frame_equal(df, df_overwritten)
+
+
+def test_columnar_sink_round_trips_enums(tmp_path):
+    strategies = list(AgentStrategy)
+    states = [
+        {
+            "simulation": 0,
+            "subset": run % 2,
+            "run": run,
+            "substep": 0,
+            "timestep": timestep,
+            "stage": None if timestep == 0 else [Stage.PRE_LBP, Stage.LBP, Stage.POST_LBP][timestep % 3],
+            "strategy": strategies[(run + timestep) % len(strategies)],
+            "price": np.float64(timestep) / 3,
+            "agents": np.zeros(3),
+        }
+        for run in range(1, 5)
+        for timestep in range(10)
+    ]
+
+    sinks = [ColumnarSink(buffer_rows=7), ColumnarSink(directory=str(tmp_path), buffer_rows=7)]
+    for sink in sinks:
+        for state in states:
+            sink.append(state)
+    df, df_parquet = [sink.to_dataframe() for sink in sinks]
+
+    assert list(df.columns) == [key for key in states[0] if key != "agents"]
+    pd.testing.assert_frame_equal(df, df_parquet)
+    initial = df_parquet["timestep"] == 0
+    assert df_parquet["stage"][initial].isna().all()
+    assert all(isinstance(stage, Stage) for stage in df_parquet["stage"][~initial])
+    # Integer enums are stored as integers, as when radCAD results are converted into a DataFrame
+    expected = pd.DataFrame([{"strategy": state["strategy"]} for state in states])["strategy"]
+    pd.testing.assert_series_equal(df_parquet["strategy"], expected)
+
+
+def test_run_writes_dataset_despite_cached_results(tmp_path):
+    cache = ResultCache(directory=str(tmp_path / "cache"))
+    simulation = create_simulation()
+    simulation.engine = StreamingEngine(drop_substeps=True)
+    df, _ = run(copy.deepcopy(simulation), cache=cache)
+    assert os.listdir(cache.directory)
+
+    # The results of the same simulation are cached, but the dataset is only written by running it
+    for directory in [tmp_path / "results", tmp_path / "other_results"]:
+        simulation.engine = StreamingEngine(drop_substeps=True, directory=str(directory))
+        df_streamed, _ = run(copy.deepcopy(simulation), cache=cache)
+        assert (directory / "simulation=0").exists()
+        pd.testing.assert_frame_equal(df, df_streamed)
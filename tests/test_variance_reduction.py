@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from model.stochastic_processes import brownian_motion_paths, standard_normal
+from experiments.variance_reduction import effective_sample_size, standard_error, variance_reduction_report
+
+
+RUNS = 100
+
+
+def final_value(df, params) -> float:
+    return df["value"].iloc[-1]
+
+
+def create_results(paths_by_subset) -> pd.DataFrame:
+    """Results with the paths of each subset as the `value` State Variable"""
+    return pd.DataFrame([
+        {"subset": subset, "run": run + 1, "timestep": timestep, "value": value}
+        for (subset, paths) in enumerate(paths_by_subset)
+        for (run, path) in enumerate(paths)
+        for (timestep, value) in enumerate(path)
+    ])
+
+
+def test_antithetic_pairs_cancel_on_linear_process():
+    variates = standard_normal(np.random.default_rng(1), (4, 3), antithetic=True)
+    np.testing.assert_array_equal(variates[1::2], -variates[::2])
+
+    # A linear function of a Brownian motion has the same mean in each antithetic pair
+    paths = brownian_motion_paths(RUNS, 11, rng=np.random.default_rng(1), antithetic=True)
+    values = 3.0 + 2.0 * paths[:, -1]
+    assert standard_error(values) > 0.1
+    assert standard_error(values, antithetic=True) == pytest.approx(0.0, abs=1e-12)
+    assert effective_sample_size(values, antithetic=True) > 1e6 * RUNS
+
+    # Independent runs are not improved by pairing
+    independent = 3.0 + 2.0 * brownian_motion_paths(RUNS, 11, rng=np.random.default_rng(1))[:, -1]
+    assert effective_sample_size(independent, antithetic=True) < 2 * RUNS
+
+
+def test_effective_sample_size_closed_form():
+    values = np.random.default_rng(1).standard_normal(RUNS)
+    # Without variance reduction, the effective sample size is the number of runs
+    assert effective_sample_size(values) == pytest.approx(RUNS, rel=1e-12)
+
+    # With common random numbers where each run is twice its baseline run, the difference has the variance
+    # of a single run, while independent runs would have the variance of both: (4 + 1) / 1 times the runs
+    assert effective_sample_size(2 * values, baseline=values) == pytest.approx(5 * RUNS, rel=1e-12)
+    assert standard_error(2 * values, baseline=values) == pytest.approx(standard_error(values), rel=1e-12)
+
+
+def test_variance_reduction_report():
+    paths = 1.0 + brownian_motion_paths(RUNS, 5, rng=np.random.default_rng(1), antithetic=True)
+    df = create_results([paths, 2 * paths])
+    report = variance_reduction_report(df, final_value, {"scale": [1, 2]}, antithetic=True)
+
+    assert report["runs"].tolist() == [RUNS, RUNS]
+    assert report.loc[1, "mean"] == pytest.approx(2 * report.loc[0, "mean"])
+    assert report.loc[1, "difference"] == pytest.approx(report.loc[0, "mean"])
+    assert report["standard_error"].max() == pytest.approx(0.0, abs=1e-12)
+    assert (report["speedup"] > 1e6).all()
+    assert report.loc[1, "difference_speedup"] > 1e6
@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+import numpy as np
+import pytest
+from radcad import Model, Simulation
+
+from model.system_parameters import parameters
+from model.state_variables import initial_state
+from model.state_update_blocks import state_update_blocks
+from model.parts.agent_system import create_agent_population_process
+from model.stochastic_processes import create_eth_price_paths, create_sampled_process
+from experiments.simulation_configuration import DELTA_TIME
+from experiments.vectorized import VectorizedEngine, check_parity
+
+
+TIMESTEPS = 48
+RUNS = 3
+
+
+def create_simulation(**params) -> Simulation:
+    """A short simulation of the default model, including the `agents` State Variable"""
+    model = Model(
+        initial_state=initial_state,
+        state_update_blocks=state_update_blocks,
+        params={**parameters, **params},
+    )
+    return Simulation(model=model, timesteps=TIMESTEPS, runs=RUNS)
+
+
+def test_parity_default():
+    df, _ = check_parity(create_simulation())
+    assert len(df) == RUNS * TIMESTEPS
+
+
+def test_parity_sweep():
+    simulation = create_simulation(
+        lbp_length=[12, 24, 100],
+        weight_x_end=[0.3, 0.5, 0.5],
+        weight_curve=["linear", "exponential", "stepped"],
+    )
+    df, _ = check_parity(simulation)
+    assert df["subset"].nunique() == 3
+
+
+def test_parity_lbp_stages():
+    date_start = parameters["date_start"][0]
+    simulation = create_simulation(
+        date_lbp_start=[date_start + timedelta(hours=6)],
+        date_lbp_end=[date_start + timedelta(hours=30)],
+        lbp_length=[24],
+    )
+    df, _ = check_parity(simulation)
+    assert df["stage"].nunique() == 3
+
+
+def test_parity_stochastic_eth_price():
+    realizations = create_eth_price_paths(RUNS, TIMESTEPS, DELTA_TIME, rng=np.random.default_rng(1))
+    sampled_process = create_sampled_process(realizations)
+    simulation = create_simulation(
+        # A vectorized process, and the same process called per run and timestep
+        eth_price_process=[sampled_process, lambda run, epoch: realizations[run - 1, int(epoch)]],
+        lbp_length=[TIMESTEPS, TIMESTEPS],
+    )
+    df, _ = check_parity(simulation)
+    assert df["eth_price"].nunique() > RUNS
+
+
+def test_agents_are_not_simulated():
+    simulation = create_simulation(agent_population_process=[create_agent_population_process(agent_count=10)])
+    simulation.engine = VectorizedEngine()
+    with pytest.raises(Exception, match="does not simulate swaps"):
+        simulation.run()